@@ -1 +1,3 @@
 from . import models
+from . import controllers
+from . import cli
\ No newline at end of file
@@ -22,6 +22,8 @@
         
         # Data
     'data/sequences.xml',
+    'data/cron.xml',
+    'data/reminder_templates.xml',
     'data/dashboard_data.xml',
     'data/specialities.xml',
     'data/sample_data.xml',
@@ -35,8 +37,17 @@
         'views/appointment_views.xml',
         'views/medical_record_views.xml',
         'views/prescription_views.xml',
+    'views/drug_interaction_views.xml',
         'views/medical_dashboard_views.xml',
     'views/dashboard_views.xml',
+    'views/export_views.xml',
+    'views/state_transition_views.xml',
+    'views/archive_views.xml',
+    'views/perf_views.xml',
+    'views/job_views.xml',
+    'views/reminder_views.xml',
+    'views/vitals_views.xml',
+    'views/capacity_views.xml',
         
         # Menu items that reference actions (load last)
         'views/menu_views.xml',
@@ -0,0 +1 @@
+from . import medical_commands
@@ -0,0 +1,122 @@
+import json
+import optparse
+import sys
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+
+def _environment(cmdargs, options):
+    """Parse the server options plus ``options`` and return the database name."""
+    parser = config.parser
+    group = optparse.OptionGroup(parser, "Medical Practice")
+    for args, kwargs in options:
+        group.add_option(*args, **kwargs)
+    parser.add_option_group(group)
+    opt = config.parse_config(cmdargs)
+    if not config['db_name']:
+        sys.exit("A database must be given with -d/--database")
+    return opt, config['db_name'].split(',')[0]
+
+
+class MedicalSeed(Command):
+    """Generate a synthetic medical_practice dataset (COPY-based bulk load)"""
+    name = 'medical_seed'
+
+    def run(self, cmdargs):
+        opt, dbname = _environment(cmdargs, [
+            (('--patients',), {'dest': 'patients', 'type': 'int', 'default': 1000}),
+            (('--doctors',), {'dest': 'doctors', 'type': 'int', 'default': 20}),
+            (('--appointments',), {'dest': 'appointments', 'type': 'int', 'default': 10000}),
+            (('--records',), {'dest': 'records', 'type': 'int', 'default': 2000}),
+            (('--prescriptions',), {'dest': 'prescriptions', 'type': 'int', 'default': 5000}),
+            (('--lines-per-prescription',), {'dest': 'lines', 'type': 'float', 'default': 1}),
+            (('--years',), {'dest': 'years', 'type': 'int', 'default': 3}),
+            (('--future-days',), {'dest': 'future_days', 'type': 'int', 'default': 60}),
+            (('--future-share',), {'dest': 'future_share', 'type': 'float', 'default': 0.15}),
+            (('--seed',), {'dest': 'seed', 'type': 'int', 'default': 42}),
+            (('--chunk-size',), {'dest': 'chunk_size', 'type': 'int', 'default': 50000}),
+        ])
+        registry = odoo.registry(dbname)
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            counts = env['medical.data.generator'].generate(
+                patients=opt.patients, doctors=opt.doctors, appointments=opt.appointments,
+                records=opt.records, prescriptions=opt.prescriptions, lines_per_prescription=opt.lines,
+                years=opt.years, future_days=opt.future_days, future_share=opt.future_share,
+                seed=opt.seed, chunk_size=opt.chunk_size,
+            )
+        print(json.dumps(counts, indent=2))
+
+
+class MedicalBench(Command):
+    """Run the medical_practice load benchmark against stored baselines"""
+    name = 'medical_bench'
+
+    def run(self, cmdargs):
+        opt, dbname = _environment(cmdargs, [
+            (('--case',), {'dest': 'cases', 'action': 'append', 'default': []}),
+            (('--repeat',), {'dest': 'repeat', 'type': 'int', 'default': 5}),
+            (('--tolerance',), {'dest': 'tolerance', 'type': 'float', 'default': 0.25}),
+            (('--save-baseline',), {'dest': 'save_baseline', 'action': 'store_true', 'default': False}),
+            (('--explain',), {'dest': 'explain', 'action': 'store_true', 'default': False}),
+        ])
+        registry = odoo.registry(dbname)
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            Benchmark = env['medical.benchmark']
+            results = Benchmark.run(cases=opt.cases or None, repeat=opt.repeat, tolerance=opt.tolerance)
+            plans = Benchmark.explain_index_plan() if opt.explain else None
+            # Only the baselines are kept, everything else is rolled back
+            cr.rollback()
+            if opt.save_baseline:
+                baselines = Benchmark.get_baselines()
+                baselines.update({result['case']: result['median_ms'] for result in results})
+                Benchmark.set_baselines(baselines)
+                cr.commit()
+
+        print(f"{'case':<24}{'median ms':>12}{'max ms':>10}{'queries':>9}{'baseline':>10}")
+        for result in results:
+            print(f"{result['case']:<24}{result['median_ms']:>12.2f}{result['max_ms']:>10.2f}"
+                  f"{result['queries']:>9}{result['baseline_ms'] or '-':>10}"
+                  f"{'  REGRESSION' if result['regression'] else ''}")
+        if plans:
+            for name, plan in plans.items():
+                print(f"\n== {name} (without indexes)\n{plan['without_indexes']}")
+                print(f"\n== {name} (with indexes)\n{plan['with_indexes']}")
+        if any(result['regression'] for result in results):
+            sys.exit(1)
+
+
+class MedicalInteractions(Command):
+    """Import a drug interaction table (CSV: code_a, code_b, severity, description)"""
+    name = 'medical_interactions'
+
+    def run(self, cmdargs):
+        opt, dbname = _environment(cmdargs, [
+            (('--file',), {'dest': 'file', 'help': "CSV file with a header line"}),
+        ])
+        if not opt.file:
+            sys.exit("An interaction file must be given with --file")
+        registry = odoo.registry(dbname)
+        with registry.cursor() as cr, open(opt.file, encoding='utf-8-sig', newline='') as csv_file:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            result = env['medical.drug.interaction'].import_csv(csv_file)
+        print(json.dumps(result, indent=2))
+
+
+class MedicalJobs(Command):
+    """Run the pending medical_practice background jobs"""
+    name = 'medical_jobs'
+
+    def run(self, cmdargs):
+        opt, dbname = _environment(cmdargs, [
+            (('--time-budget',), {'dest': 'time_budget', 'type': 'int', 'default': 0,
+                                  'help': "Stop after this many seconds (0: until the queue is empty)"}),
+        ])
+        registry = odoo.registry(dbname)
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            count = env['medical.job'].run_pending(time_budget=opt.time_budget or None)
+        print(json.dumps({'jobs': count}, indent=2))
@@ -0,0 +1,61 @@
+from odoo import http
+from odoo.http import request
+from werkzeug.exceptions import BadRequest, NotFound
+
+from ..models.medical_export import DATASETS
+
+
+class MedicalExportController(http.Controller):
+
+    @http.route('/medical_practice/export/<string:dataset>', type='http', auth='user', methods=['GET'])
+    def export(self, dataset, format='csv', date_from=None, date_to=None, incremental=None, **kwargs):
+        if dataset not in DATASETS or format not in ('csv', 'parquet'):
+            raise NotFound()
+        if incremental and (date_from or date_to):
+            raise BadRequest("An incremental export cannot have a date range.")
+        Export = request.env['medical.export']
+        options = {
+            'date_from': date_from or None,
+            'date_to': date_to or None,
+            'incremental': bool(incremental),
+        }
+        if format == 'parquet':
+            body = Export.stream_parquet(dataset, **options)
+            mimetype = 'application/vnd.apache.parquet'
+        else:
+            body = Export.stream_csv(dataset, **options)
+            mimetype = 'text/csv'
+        # Start the generator now so access errors are raised within the request
+        first_chunk = next(body, b'')
+
+        def content():
+            yield first_chunk
+            yield from body
+
+        response = request.make_response(content(), headers=[
+            ('Content-Type', mimetype),
+            ('Content-Disposition', http.content_disposition(f'{dataset}.{format}')),
+        ])
+        response.direct_passthrough = True
+        return response
+
+
+class MedicalPatientController(http.Controller):
+
+    @http.route('/medical_practice/patient/<int:patient_id>/timeline', type='json', auth='user')
+    def timeline(self, patient_id, limit=20, cursor=None):
+        patient = request.env['medical.patient'].browse(patient_id).exists()
+        if not patient:
+            raise NotFound()
+        patient.check_access_rights('read')
+        patient.check_access_rule('read')
+        return patient.get_timeline(limit=max(1, min(int(limit), 200)), cursor=cursor or None)
+
+
+class MedicalDashboardController(http.Controller):
+
+    @http.route('/medical_practice/dashboard/series', type='json', auth='user')
+    def series(self, date_from=None, date_to=None, bucket='month'):
+        Dashboard = request.env['medical.dashboard']
+        Dashboard.check_access_rights('read')
+        return Dashboard.get_series(date_from=date_from, date_to=date_to, bucket=bucket)
@@ -1,7 +1,21 @@
+from . import ir_sequence
+from . import medical_perf
+from . import medical_cache_version
+from . import medical_dashboard_stat
+from . import medical_state_transition
 from . import patient
 from . import appointment
 from . import medical_record
 from . import prescription
 from . import medical_dashboard
 from . import medical_doctor
-from . import medical_drug
\ No newline at end of file
+from . import medical_capacity
+from . import medical_drug
+from . import medical_drug_interaction
+from . import medical_data_generator
+from . import medical_benchmark
+from . import medical_export
+from . import medical_archive
+from . import medical_vitals
+from . import medical_job
+from . import medical_reminder
\ No newline at end of file
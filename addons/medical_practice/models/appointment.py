@@ -1,12 +1,44 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from odoo.tools import sql
+from .sql_utils import ensure_archive_table, ensure_extension, ensure_indexes
+from .medical_perf import profiled
 from datetime import timedelta
+from psycopg2.errors import ExclusionViolation
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# States that do not occupy the doctor's agenda
+FREE_STATES = ('cancelled', 'no_show')
+# Scheduled appointments still unconfirmed this long after their end are no-shows
+NO_SHOW_GRACE = timedelta(hours=2)
+NO_SHOW_BATCH = 1000
+# Fields that move an appointment in the doctors' capacity buckets
+CAPACITY_FIELDS = {'doctor_id', 'appointment_date', 'duration', 'state'}
+# Booked period of an appointment, as used by the overlap constraint
+PERIOD_SQL = "tsrange(appointment_date, COALESCE(end_time, appointment_date), '[)')"
 
 class MedicalAppointment(models.Model):
     _name = 'medical.appointment'
     _description = 'Medical Appointment'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = [
+        'mail.thread', 'mail.activity.mixin', 'medical.dashboard.stat.mixin', 'medical.state.transition.mixin',
+    ]
     _rec_name = 'name'
     _order = 'appointment_date desc'
+    _stat_column = 'appointment_count'
+    _stat_date_field = 'appointment_date'
+    _stat_archive_table = 'medical_appointment_archive'
+    # Target state: states it can be reached from. Nothing leaves a free
+    # state, so transitions never need the overlap check again.
+    _state_transitions = {
+        'confirmed': ('scheduled',),
+        'in_progress': ('confirmed',),
+        'completed': ('confirmed', 'in_progress'),
+        'cancelled': ('scheduled', 'confirmed', 'in_progress'),
+        'no_show': ('scheduled', 'confirmed'),
+    }
 
     name = fields.Char(
         string='Appointment Reference', 
@@ -16,9 +48,10 @@ class MedicalAppointment(models.Model):
         default='New'
     )
     
+    # patient_id and doctor_id are covered by the composite indexes of init()
     patient_id = fields.Many2one('medical.patient', string='Patient', required=True, tracking=True)
     doctor_id = fields.Many2one('medical.doctor', string='Doctor', required=True, tracking=True)
-    appointment_date = fields.Datetime(string='Appointment Date/Time', required=True, tracking=True)
+    appointment_date = fields.Datetime(string='Appointment Date/Time', required=True, tracking=True, index=True)
     duration = fields.Float(string='Duration (Hours)', default=1.0)
     end_time = fields.Datetime(string='End Time', compute='_compute_end_time', store=True)
     
@@ -44,6 +77,11 @@ class MedicalAppointment(models.Model):
     # Relations
     prescription_ids = fields.One2many('medical.prescription', 'appointment_id', string='Prescriptions')
 
+    _sql_constraints = [
+        # Also keeps the booked period a valid range for the overlap constraint
+        ('duration_positive', 'CHECK (duration >= 0)', 'The duration of an appointment cannot be negative.'),
+    ]
+
     @api.depends('appointment_date', 'duration')
     def _compute_end_time(self):
         for appointment in self:
@@ -52,20 +90,207 @@ class MedicalAppointment(models.Model):
             else:
                 appointment.end_time = False
 
+    def init(self):
+        cr = self.env.cr
+        ensure_indexes(cr, self._table, [
+            # Doctor agenda, calendar colored by doctor
+            ('medical_appointment_doctor_date_idx', ['doctor_id', 'appointment_date'], None),
+            # Patient smart button / history, newest first
+            ('medical_appointment_patient_date_idx', ['patient_id', 'appointment_date DESC'], None),
+            # Upcoming work (today's appointments, reminders, no-show sweep)
+            ('medical_appointment_open_date_idx', ['appointment_date'],
+             "state IN ('scheduled', 'confirmed', 'in_progress')"),
+        ])
+        # Old appointments are moved there by medical.archive
+        ensure_archive_table(cr, self._table, 'appointment_date')
+
+        # Exclusion constraint on (doctor, [start, end)): PostgreSQL refuses a
+        # double booking even between concurrent transactions, which cannot
+        # see each other's rows. Its GiST index also serves find_free_slots();
+        # btree_gist provides the "=" operator class.
+        if sql.constraint_definition(cr, self._table, 'medical_appointment_doctor_period_excl'):
+            return
+        if not ensure_extension(cr, 'btree_gist'):
+            _logger.warning("btree_gist is not available, concurrent double bookings are not prevented")
+            return
+        try:
+            sql.add_constraint(
+                cr, self._table, 'medical_appointment_doctor_period_excl',
+                f"EXCLUDE USING gist (doctor_id WITH =, {PERIOD_SQL} WITH &&) "
+                f"WHERE (state NOT IN ('cancelled', 'no_show'))",
+            )
+        except Exception:
+            _logger.warning("Overlapping appointments exist, the overlap constraint could not be added", exc_info=True)
+            return
+        # Superseded by the constraint's own index
+        cr.execute("DROP INDEX IF EXISTS medical_appointment_doctor_period_gist")
+
+    @api.constrains('doctor_id', 'appointment_date', 'duration', 'state')
+    @profiled
+    def _check_doctor_overlap(self):
+        active = self.filtered(lambda a: a.state not in FREE_STATES)
+        if not active:
+            return
+        try:
+            with self.env.cr.savepoint(flush=False):
+                active.flush_recordset(['doctor_id', 'appointment_date', 'end_time', 'state'])
+        except ExclusionViolation:
+            # Booked meanwhile by another transaction, or caught by the
+            # constraint before the query below could name the culprit
+            raise ValidationError(_(
+                "%(doctors)s is already booked at that time.",
+                doctors=", ".join(active.doctor_id.mapped('display_name')),
+            ))
+        # One indexed self-join for the whole batch, including overlaps
+        # between the new appointments themselves.
+        self.env.cr.execute("""
+            SELECT a.id, b.id
+            FROM medical_appointment a
+            JOIN medical_appointment b
+              ON b.doctor_id = a.doctor_id
+             AND b.id != a.id
+             AND b.state NOT IN %s
+             AND tsrange(b.appointment_date, COALESCE(b.end_time, b.appointment_date), '[)')
+                 && tsrange(a.appointment_date, COALESCE(a.end_time, a.appointment_date), '[)')
+            WHERE a.id IN %s
+            LIMIT 1
+        """, (FREE_STATES, tuple(active.ids)))
+        row = self.env.cr.fetchone()
+        if row:
+            first, second = self.browse(row)
+            raise ValidationError(_(
+                "%(doctor)s is already booked: %(first)s overlaps %(second)s.",
+                doctor=first.doctor_id.display_name, first=first.display_name, second=second.display_name,
+            ))
+
     @api.model
-    def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('medical.appointment') or 'New'
-        return super().create(vals)
+    @profiled
+    def find_free_slots(self, doctor_ids, date_range, duration, step=None):
+        """Return the free slots of each doctor within ``date_range``.
+
+        :param doctor_ids: ids of ``medical.doctor`` records
+        :param date_range: ``(start, end)`` datetimes (UTC) bounding the search
+        :param duration: slot length in hours
+        :param step: interval in hours between candidate slots, defaults to ``duration``
+        :return: ``{doctor_id: [(slot_start, slot_end), ...]}``
+        """
+        start, end = (fields.Datetime.to_datetime(d) for d in date_range)
+        length = timedelta(hours=duration)
+        step = timedelta(hours=step or duration)
+        doctor_ids = list(doctor_ids)
+        if not doctor_ids or length <= timedelta(0) or step <= timedelta(0):
+            return {}
+
+        self.flush_model(['doctor_id', 'appointment_date', 'end_time', 'state'])
+        # Busy intervals of every doctor in a single indexed query
+        self.env.cr.execute(f"""
+            SELECT doctor_id, appointment_date, COALESCE(end_time, appointment_date)
+            FROM medical_appointment
+            WHERE doctor_id IN %s
+              AND state NOT IN %s
+              AND {PERIOD_SQL} && tsrange(%s, %s, '[)')
+            ORDER BY doctor_id, appointment_date
+        """, (tuple(doctor_ids), FREE_STATES, start, end))
+        busy = {doctor_id: [] for doctor_id in doctor_ids}
+        for doctor_id, busy_start, busy_end in self.env.cr.fetchall():
+            intervals = busy[doctor_id]
+            # Rows come sorted by start: merge overlapping intervals on the fly
+            if intervals and busy_start <= intervals[-1][1]:
+                intervals[-1] = (intervals[-1][0], max(intervals[-1][1], busy_end))
+            else:
+                intervals.append((busy_start, busy_end))
+
+        # Sweep the candidate grid against the disjoint, sorted busy intervals
+        result = {}
+        for doctor_id, intervals in busy.items():
+            slots = []
+            index = 0
+            slot_start = start
+            while slot_start + length <= end:
+                slot_end = slot_start + length
+                while index < len(intervals) and intervals[index][1] <= slot_start:
+                    index += 1
+                if index == len(intervals) or intervals[index][0] >= slot_end:
+                    slots.append((slot_start, slot_end))
+                slot_start += step
+            result[doctor_id] = slots
+        return result
+
+    @api.model_create_multi
+    @profiled
+    def create(self, vals_list):
+        # Reserve the references of the whole batch in one sequence call
+        to_number = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        numbers = self.env['ir.sequence']._next_batch_by_code('medical.appointment', len(to_number))
+        for vals, number in zip(to_number, numbers):
+            vals['name'] = number or 'New'
+        appointments = super().create(vals_list)
+        self.env['medical.doctor.patient']._apply_delta(appointments, 1)
+        Capacity = self.env['medical.doctor.capacity']
+        Capacity._refresh_days(Capacity._days_of(appointments))
+        return appointments
+
+    def write(self, vals):
+        relinked = bool({'doctor_id', 'patient_id'} & set(vals))
+        Capacity = self.env['medical.doctor.capacity']
+        booking = bool(CAPACITY_FIELDS & set(vals))
+        if set(vals) == {'state'} and vals['state'] not in FREE_STATES:
+            # Moving between busy states books nothing more nor less
+            booking = any(state in FREE_STATES for state in self.mapped('state'))
+        days = Capacity._days_of(self) if booking else []
+        dates = {appointment: appointment.appointment_date for appointment in self} if 'appointment_date' in vals else {}
+        if relinked:
+            self.env['medical.doctor.patient']._apply_delta(self, -1)
+        res = super().write(vals)
+        if relinked:
+            self.env['medical.doctor.patient']._apply_delta(self, 1)
+        if booking:
+            # Both the buckets left and the buckets joined
+            Capacity._refresh_days(days + Capacity._days_of(self))
+        moved = self.filtered(lambda appointment: appointment in dates and appointment.appointment_date != dates[appointment])
+        if moved:
+            self.env['medical.reminder']._reset_appointments(moved)
+        return res
+
+    def unlink(self):
+        self.env['medical.doctor.patient']._apply_delta(self, -1)
+        Capacity = self.env['medical.doctor.capacity']
+        days = Capacity._days_of(self)
+        res = super().unlink()
+        Capacity._refresh_days(days)
+        return res
 
     def action_confirm(self):
-        self.state = 'confirmed'
-        
+        self._transition('confirmed')
+
     def action_start(self):
-        self.state = 'in_progress'
-        
+        self._transition('in_progress')
+
     def action_complete(self):
-        self.state = 'completed'
-        
+        self._transition('completed')
+
     def action_cancel(self):
-        self.state = 'cancelled'
\ No newline at end of file
+        self._transition('cancelled')
+
+    def action_no_show(self):
+        self._transition('no_show')
+
+    @api.model
+    @profiled
+    def _cron_mark_no_show(self):
+        """Mark the past appointments that were never confirmed as no-shows."""
+        cutoff = fields.Datetime.now() - NO_SHOW_GRACE
+        # appointment_date bound first so the partial open-state index is used;
+        # a zero-duration appointment has no end time
+        domain = [
+            ('state', '=', 'scheduled'), ('appointment_date', '<', cutoff),
+            '|', ('end_time', '=', False), ('end_time', '<', cutoff),
+        ]
+        total = 0
+        while True:
+            appointments = self.search(domain, limit=NO_SHOW_BATCH, order='appointment_date')
+            if not appointments:
+                break
+            total += len(appointments._transition('no_show'))
+        if total:
+            _logger.info("medical.appointment: %s past unconfirmed appointments marked as no-show", total)
@@ -0,0 +1,45 @@
+from odoo import models, api
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def _next_batch_by_code(self, code, count):
+        """Reserve ``count`` consecutive values of the sequence ``code``.
+
+        Same lookup rules as ``next_by_code`` but standard and no-gap
+        sequences are advanced with a single statement for the whole block.
+        Returns a list of ``count`` formatted values (``False`` when the
+        sequence does not exist).
+        """
+        if count <= 0:
+            return []
+        self.check_access_rights('read')
+        company_id = self.env.company.id
+        sequence = self.search([('code', '=', code), ('company_id', 'in', [company_id, False])], order='company_id', limit=1)
+        if not sequence:
+            _logger.debug("No ir.sequence has been found for code '%s'. Please make sure a sequence is set for current company.", code)
+            return [False] * count
+        if sequence.use_date_range:
+            # Date-range sub-sequences are resolved per call
+            return [sequence._next() for _i in range(count)]
+
+        cr = self.env.cr
+        if sequence.implementation == 'standard':
+            cr.execute("SELECT nextval(%s::regclass) FROM generate_series(1, %s)", ('ir_sequence_%03d' % sequence.id, count))
+            numbers = [row[0] for row in cr.fetchall()]
+        else:
+            step = sequence.number_increment
+            cr.execute("""
+                UPDATE ir_sequence SET number_next = number_next + %s
+                WHERE id = %s
+                RETURNING number_next
+            """, (step * count, sequence.id))
+            last = cr.fetchone()[0]
+            numbers = list(range(last - step * count, last, step))
+            sequence.invalidate_recordset(['number_next'])
+        return [sequence.get_next_char(number) for number in numbers]
@@ -0,0 +1,201 @@
+from odoo import models, fields, api, _
+from dateutil.relativedelta import relativedelta
+from .sql_utils import ensure_archive_partition, table_columns
+from .medical_job import JOB_TIME_BUDGET
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+HORIZON_PARAM = 'medical_practice.archive_horizon_years'
+BATCH_SIZE_PARAM = 'medical_practice.archive_batch_size'
+DEFAULT_HORIZON_YEARS = 3
+DEFAULT_BATCH_SIZE = 5000
+# Seconds a cron run may spend moving batches, the next run resumes from there
+TIME_BUDGET = 300
+
+# (model, date column, condition on the rows ``t`` that may leave the hot
+# table), in archiving order: records first, so that the appointments they
+# referenced can follow. Appointments still referenced by a hot record or
+# prescription stay where they are.
+ARCHIVE_SOURCES = [
+    ('medical.record', 'record_date', "TRUE"),
+    ('medical.appointment', 'appointment_date', """
+        t.state IN ('completed', 'cancelled', 'no_show')
+        AND NOT EXISTS (SELECT 1 FROM medical_record r WHERE r.appointment_id = t.id)
+        AND NOT EXISTS (SELECT 1 FROM medical_prescription rx WHERE rx.appointment_id = t.id)
+    """),
+]
+
+
+class MedicalArchive(models.AbstractModel):
+    """Move old appointments and records to yearly archive partitions.
+
+    Rows older than the horizon (``medical_practice.archive_horizon_years``
+    system parameter) are moved in small batches from the hot table to
+    ``<table>_archive``, a table partitioned by year, so the day-to-day list
+    and calendar queries only touch recent data. Each batch is its own
+    short transaction and locks only the rows it moves (``SKIP LOCKED``):
+    an interrupted run simply resumes with the remaining rows.
+
+    Archived rows keep their ids and stay readable through
+    ``medical.appointment.archive`` and ``medical.record.archive``; the
+    patient timeline, the dashboard statistics and the doctor/patient links
+    include them.
+    """
+    _name = 'medical.archive'
+    _description = 'Medical Data Archiving'
+
+    @api.model
+    def _get_horizon(self):
+        Param = self.env['ir.config_parameter'].sudo()
+        years = int(Param.get_param(HORIZON_PARAM, DEFAULT_HORIZON_YEARS))
+        return fields.Datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - relativedelta(years=years)
+
+    @api.model
+    def _has_backlog(self):
+        """Whether rows older than the horizon are still to be archived."""
+        horizon = self._get_horizon()
+        for model_name, date_column, condition in ARCHIVE_SOURCES:
+            Model = self.env[model_name]
+            Model.flush_model()
+            self.env.cr.execute(
+                f"SELECT 1 FROM {Model._table} t WHERE t.{date_column} < %s AND {condition} LIMIT 1", (horizon,))
+            if self.env.cr.fetchone():
+                return True
+        return False
+
+    @api.model
+    def _archive_batch(self, model_name, date_column, condition, horizon, batch_size):
+        """Move one batch of ``model_name`` rows older than ``horizon``, return its size."""
+        Model = self.env[model_name]
+        cr = self.env.cr
+        table, archive = Model._table, f'{Model._table}_archive'
+        Model.flush_model()
+        cr.execute(f"""
+            SELECT t.id, date_part('year', t.{date_column})::int
+            FROM {table} t
+            WHERE t.{date_column} < %s AND {condition}
+            ORDER BY t.{date_column}
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (horizon, batch_size))
+        rows = cr.fetchall()
+        if not rows:
+            return 0
+        for year in {year for _id, year in rows}:
+            ensure_archive_partition(cr, archive, year)
+        ids = [row[0] for row in rows]
+        columns = ', '.join(f'"{column}"' for column in table_columns(cr, table))
+        cr.execute(f"""
+            WITH moved AS (
+                DELETE FROM {table} WHERE id = ANY(%s) RETURNING {columns}
+            )
+            INSERT INTO {archive} ({columns}) SELECT {columns} FROM moved
+        """, (ids,))
+        # The messages stay for the audit trail, the rest has no use anymore
+        cr.execute("DELETE FROM mail_activity WHERE res_model = %s AND res_id = ANY(%s)", (model_name, ids))
+        cr.execute("DELETE FROM mail_followers WHERE res_model = %s AND res_id = ANY(%s)", (model_name, ids))
+        Model.invalidate_model()
+        return len(ids)
+
+    @api.model
+    def archive(self, auto_commit=False, time_budget=None):
+        """Archive the rows older than the horizon, return ``{model: moved rows}``.
+
+        :param auto_commit: commit after every batch
+        :param time_budget: stop after this many seconds, the rest is left
+            for the next call
+        """
+        horizon = self._get_horizon()
+        batch_size = int(self.env['ir.config_parameter'].sudo().get_param(BATCH_SIZE_PARAM, DEFAULT_BATCH_SIZE))
+        deadline = time.monotonic() + time_budget if time_budget else None
+        moved = {}
+        for model_name, date_column, condition in ARCHIVE_SOURCES:
+            moved[model_name] = 0
+            while not deadline or time.monotonic() < deadline:
+                count = self._archive_batch(model_name, date_column, condition, horizon, batch_size)
+                if not count:
+                    break
+                moved[model_name] += count
+                self.env['medical.job']._report_progress(
+                    0, message=_("%(count)s %(model)s rows archived", count=moved[model_name], model=model_name))
+                if auto_commit:
+                    self.env.cr.commit()
+            _logger.info("medical.archive: %s %s rows archived (older than %s)",
+                         moved[model_name], model_name, horizon)
+        return moved
+
+    @api.model
+    def _cron_archive(self):
+        self.archive(auto_commit=not self.env.registry.in_test_mode(), time_budget=TIME_BUDGET)
+
+    @api.model
+    def _job_archive(self):
+        """Background job: archive the rows past the horizon for ``JOB_TIME_BUDGET`` seconds.
+
+        The rest is archived by a new job, so that a long backlog is never
+        taken for a stale job and run twice.
+        """
+        moved = self.archive(auto_commit=not self.env.registry.in_test_mode(), time_budget=JOB_TIME_BUDGET)
+        if self._has_backlog():
+            self.env['medical.job'].enqueue(self, '_job_archive', name=_("Archiving of old appointments and records"),
+                                            max_attempts=1)
+        return moved
+
+    @api.model
+    def action_enqueue_archive(self):
+        Job = self.env['medical.job']
+        job = Job.enqueue(self, '_job_archive', name=_("Archiving of old appointments and records"), max_attempts=1)
+        return Job._queued_notification(job)
+
+
+class MedicalAppointmentArchive(models.Model):
+    """Read-only view of the archived appointments."""
+    _name = 'medical.appointment.archive'
+    _description = 'Archived Appointment'
+    _table = 'medical_appointment_archive'
+    _auto = False
+    _order = 'appointment_date desc'
+
+    name = fields.Char(string='Appointment Reference', readonly=True)
+    patient_id = fields.Many2one('medical.patient', string='Patient', readonly=True)
+    doctor_id = fields.Many2one('medical.doctor', string='Doctor', readonly=True)
+    appointment_date = fields.Datetime(string='Appointment Date/Time', readonly=True)
+    duration = fields.Float(string='Duration (Hours)', readonly=True)
+    end_time = fields.Datetime(string='End Time', readonly=True)
+    state = fields.Selection(
+        selection=lambda self: self.env['medical.appointment']._fields['state'].selection,
+        string='Status', readonly=True)
+    appointment_type = fields.Selection(
+        selection=lambda self: self.env['medical.appointment']._fields['appointment_type'].selection,
+        string='Appointment Type', readonly=True)
+    reason = fields.Text(string='Reason for Visit', readonly=True)
+    notes = fields.Text(string='Doctor Notes', readonly=True)
+
+
+class MedicalRecordArchive(models.Model):
+    """Read-only view of the archived medical records."""
+    _name = 'medical.record.archive'
+    _description = 'Archived Medical Record'
+    _table = 'medical_record_archive'
+    _auto = False
+    _order = 'record_date desc'
+
+    name = fields.Char(string='Record Reference', readonly=True)
+    patient_id = fields.Many2one('medical.patient', string='Patient', readonly=True)
+    doctor_id = fields.Many2one('medical.doctor', string='Doctor', readonly=True)
+    record_date = fields.Datetime(string='Record Date', readonly=True)
+    temperature = fields.Float(string='Temperature (°C)', readonly=True)
+    blood_pressure_systolic = fields.Integer(string='BP Systolic (mmHg)', readonly=True)
+    blood_pressure_diastolic = fields.Integer(string='BP Diastolic (mmHg)', readonly=True)
+    heart_rate = fields.Integer(string='Heart Rate (bpm)', readonly=True)
+    weight = fields.Float(string='Weight (kg)', readonly=True)
+    height = fields.Float(string='Height (cm)', readonly=True)
+    bmi = fields.Float(string='BMI', readonly=True)
+    chief_complaint = fields.Text(string='Chief Complaint', readonly=True)
+    history_present_illness = fields.Text(string='History of Present Illness', readonly=True)
+    physical_examination = fields.Text(string='Physical Examination', readonly=True)
+    diagnosis = fields.Text(string='Diagnosis', readonly=True)
+    treatment_plan = fields.Text(string='Treatment Plan', readonly=True)
+    follow_up_instructions = fields.Text(string='Follow-up Instructions', readonly=True)
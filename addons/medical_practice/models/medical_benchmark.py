@@ -0,0 +1,305 @@
+from odoo import models, fields, api
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+import json
+import logging
+import statistics
+import time as time_module
+
+_logger = logging.getLogger(__name__)
+
+BASELINE_PARAM = 'medical_practice.benchmark_baselines'
+
+
+class MedicalBenchmark(models.AbstractModel):
+    """Repeatable load benchmark of the addon's hot paths.
+
+    Each case runs ``repeat`` times inside a savepoint that is rolled back,
+    so the benchmark can run on a seeded database (see
+    ``medical.data.generator``) without altering it. Median timings are
+    compared with the baselines stored in the ``medical_practice.benchmark_baselines``
+    system parameter.
+    """
+    _name = 'medical.benchmark'
+    _description = 'Medical Practice Load Benchmark'
+
+    # ------------------------------------------------------------------
+    # Cases
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _benchmark_context(self):
+        """Values shared by the cases: a busy doctor, a patient, a week."""
+        cr = self.env.cr
+        cr.execute("""
+            SELECT doctor_id, patient_id FROM medical_appointment
+            WHERE doctor_id = (
+                SELECT doctor_id FROM medical_appointment GROUP BY doctor_id ORDER BY COUNT(*) DESC LIMIT 1
+            )
+            ORDER BY appointment_date DESC LIMIT 1
+        """)
+        doctor_id, patient_id = cr.fetchone() or (False, False)
+        today = fields.Date.context_today(self)
+        monday = datetime.combine(today - timedelta(days=today.weekday()), time.min)
+        return {
+            'doctor': self.env['medical.doctor'].browse(doctor_id),
+            'patient': self.env['medical.patient'].browse(patient_id),
+            'week': (monday, monday + timedelta(days=7)),
+            'today': (datetime.combine(today, time.min), datetime.combine(today, time.min) + timedelta(days=1)),
+        }
+
+    @api.model
+    def _benchmark_cases(self):
+        """Return ``{name: callable(ctx)}`` of the benchmarked operations."""
+        env = self.env
+        Patient = env['medical.patient']
+        Doctor = env['medical.doctor']
+        Appointment = env['medical.appointment']
+
+        def dashboard_counts(ctx):
+            dashboard = env['medical.dashboard'].search([], limit=1)
+            dashboard.invalidate_recordset()
+            dashboard.read(['patient_count', 'doctor_count', 'appointment_count', 'prescriptions_count'])
+
+        def doctor_list(ctx):
+            Doctor.search_read([], ['name', 'speciality_id', 'email', 'phone', 'patient_count'], limit=80)
+
+        def doctor_patients(ctx):
+            action = ctx['doctor'].action_open_patients()
+            Patient.search_read(action['domain'], ['patient_id', 'name', 'doctor_id'], limit=80)
+
+        def patient_list(ctx):
+            Patient.search_read([], ['patient_id', 'name', 'doctor_id', 'age', 'gender', 'phone', 'city'], limit=80)
+
+        def patient_name_search(ctx):
+            Patient.name_search('mar', limit=8)
+
+        def patient_form(ctx):
+            ctx['patient'].read(['name', 'patient_id', 'age', 'appointment_count', 'record_count', 'prescription_count'])
+
+        def patient_timeline(ctx):
+            page = ctx['patient'].get_timeline(limit=20)
+            if page['next_cursor']:
+                ctx['patient'].get_timeline(limit=20, cursor=page['next_cursor'])
+
+        def drug_name_search(ctx):
+            env['medical.drug'].name_search('amo', limit=8)
+
+        def prescription_safety_check(ctx):
+            prescriptions = env['medical.prescription'].search([('state', '=', 'draft')], limit=20)
+            prescriptions._get_safety_issues()
+
+        def rising_bp_report(ctx):
+            # The whole practice's trends in one pass, then the indexed report
+            Patient._refresh_vital_trends()
+            Patient.search_read([('bp_rising', '=', True)], ['name', 'last_bp_systolic', 'bp_systolic_trend'], limit=80)
+
+        def occupancy_quarter(ctx):
+            today = fields.Date.today()
+            env['medical.doctor.capacity'].get_occupancy(today - timedelta(days=91), today)
+
+        def dashboard_series(ctx):
+            # Every chart series of the year; repeated calls hit the cache
+            env['medical.dashboard'].get_series(bucket='week')
+
+        def reminder_generation(ctx):
+            # Every reminder due within the next day, in one set-based pass
+            env['medical.reminder'].generate()
+
+        def appointment_list(ctx):
+            Appointment.search_read([], ['name', 'patient_id', 'doctor_id', 'appointment_date', 'appointment_type',
+                                         'state'], limit=80)
+
+        def appointment_calendar(ctx):
+            start, end = ctx['week']
+            Appointment.search_read(
+                [('appointment_date', '>=', start), ('appointment_date', '<', end)],
+                ['patient_id', 'appointment_type', 'doctor_id', 'appointment_date', 'end_time'])
+
+        def appointment_today(ctx):
+            start, end = ctx['today']
+            Appointment.search_read(
+                [('appointment_date', '>=', start), ('appointment_date', '<', end)],
+                ['name', 'patient_id', 'doctor_id', 'appointment_date', 'state'], limit=80)
+
+        def free_slots(ctx):
+            Appointment.find_free_slots(Doctor.search([], limit=50).ids, ctx['week'], 0.5)
+
+        def create_patients(ctx):
+            Patient.create([{'name': f"Benchmark Patient {i}", 'birth_date': '1980-01-01'} for i in range(100)])
+            env.flush_all()
+
+        def create_appointments(ctx):
+            # Far in the future so the slots are free
+            start = datetime.combine(fields.Date.today() + timedelta(days=3650), time(8, 0))
+            Appointment.create([{
+                'patient_id': ctx['patient'].id,
+                'doctor_id': ctx['doctor'].id,
+                'appointment_date': start + timedelta(hours=i),
+                'appointment_type': 'consultation',
+            } for i in range(100)])
+            env.flush_all()
+
+        return {
+            'dashboard_counts': dashboard_counts,
+            'doctor_list': doctor_list,
+            'doctor_patients': doctor_patients,
+            'patient_list': patient_list,
+            'patient_name_search': patient_name_search,
+            'patient_form': patient_form,
+            'patient_timeline': patient_timeline,
+            'drug_name_search': drug_name_search,
+            'prescription_safety_check': prescription_safety_check,
+            'rising_bp_report': rising_bp_report,
+            'occupancy_quarter': occupancy_quarter,
+            'dashboard_series': dashboard_series,
+            'reminder_generation': reminder_generation,
+            'appointment_list': appointment_list,
+            'appointment_calendar': appointment_calendar,
+            'appointment_today': appointment_today,
+            'free_slots': free_slots,
+            'create_patients': create_patients,
+            'create_appointments': create_appointments,
+        }
+
+    # ------------------------------------------------------------------
+    # Runner
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _rolled_back(self):
+        """Run the block in a savepoint and undo everything it did."""
+        cr = self.env.cr
+        self.env.flush_all()
+        cr.execute('SAVEPOINT medical_benchmark')
+        try:
+            yield
+        finally:
+            cr.execute('ROLLBACK TO SAVEPOINT medical_benchmark')
+            cr.precommit.clear()
+            cr.postcommit.clear()
+            self.env.invalidate_all()
+
+    @api.model
+    def get_baselines(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(BASELINE_PARAM)
+        return json.loads(value) if value else {}
+
+    @api.model
+    def set_baselines(self, baselines):
+        self.env['ir.config_parameter'].sudo().set_param(BASELINE_PARAM, json.dumps(baselines, sort_keys=True))
+
+    @api.model
+    def run(self, cases=None, repeat=5, tolerance=0.25, save_baseline=False):
+        """Time the benchmark cases and compare them with the stored baselines.
+
+        :param cases: names of the cases to run, all of them by default
+        :param repeat: number of timed runs per case (after one warm-up run)
+        :param tolerance: relative slowdown over the baseline reported as a regression
+        :param save_baseline: store the medians as the new baselines
+        :return: list of ``{'case', 'median_ms', 'max_ms', 'queries', 'baseline_ms', 'regression'}``
+        """
+        all_cases = self._benchmark_cases()
+        names = cases or list(all_cases)
+        ctx = self._benchmark_context()
+        baselines = self.get_baselines()
+        cr = self.env.cr
+        results = []
+        for name in names:
+            case = all_cases[name]
+            timings = []
+            queries = 0
+            for run_index in range(repeat + 1):
+                with self._rolled_back():
+                    count_before = cr.sql_log_count
+                    start = time_module.perf_counter()
+                    case(ctx)
+                    elapsed = (time_module.perf_counter() - start) * 1000
+                    # The first run only warms the caches
+                    if run_index:
+                        timings.append(elapsed)
+                        queries = cr.sql_log_count - count_before
+            median = statistics.median(timings)
+            baseline = baselines.get(name)
+            regression = bool(baseline) and median > baseline * (1 + tolerance)
+            results.append({
+                'case': name,
+                'median_ms': round(median, 2),
+                'max_ms': round(max(timings), 2),
+                'queries': queries,
+                'baseline_ms': baseline,
+                'regression': regression,
+            })
+            if regression:
+                _logger.warning("medical.benchmark: %s regressed: %.2f ms (baseline %.2f ms)", name, median, baseline)
+            else:
+                _logger.info("medical.benchmark: %s %.2f ms, %s queries", name, median, queries)
+        if save_baseline:
+            baselines.update({result['case']: result['median_ms'] for result in results})
+            self.set_baselines(baselines)
+        return results
+
+    # ------------------------------------------------------------------
+    # Query plans
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _hot_queries(self, ctx):
+        """SQL equivalents of the main list/search queries, for EXPLAIN."""
+        doctor_id, patient_id = ctx['doctor'].id or 0, ctx['patient'].id or 0
+        return {
+            'appointments_today': (
+                "SELECT id FROM medical_appointment WHERE appointment_date >= %s AND appointment_date < %s "
+                "ORDER BY appointment_date DESC LIMIT 80", ctx['today']),
+            'doctor_week': (
+                "SELECT id FROM medical_appointment WHERE doctor_id = %s AND appointment_date >= %s "
+                "AND appointment_date < %s ORDER BY appointment_date", (doctor_id,) + ctx['week']),
+            'patient_appointments': (
+                "SELECT id FROM medical_appointment WHERE patient_id = %s ORDER BY appointment_date DESC LIMIT 80",
+                (patient_id,)),
+            'patient_records': (
+                "SELECT id FROM medical_record WHERE patient_id = %s ORDER BY record_date DESC LIMIT 80",
+                (patient_id,)),
+            'patient_prescriptions': (
+                "SELECT id FROM medical_prescription WHERE patient_id = %s ORDER BY prescription_date DESC LIMIT 80",
+                (patient_id,)),
+            'open_prescriptions': (
+                "SELECT id FROM medical_prescription WHERE state IN ('draft', 'prescribed') "
+                "ORDER BY prescription_date DESC LIMIT 80", ()),
+        }
+
+    @api.model
+    def explain_index_plan(self):
+        """Return ``{query: {'with_indexes': plan, 'without_indexes': plan}}``.
+
+        The plans without indexes are obtained by dropping the addon's
+        secondary indexes inside a savepoint that is rolled back afterwards;
+        this takes exclusive locks, so only run it on a benchmark database.
+        """
+        cr = self.env.cr
+        queries = self._hot_queries(self._benchmark_context())
+
+        def explain():
+            plans = {}
+            for name, (query, params) in queries.items():
+                cr.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+                plans[name] = "\n".join(row[0] for row in cr.fetchall())
+            return plans
+
+        with_indexes = explain()
+        with self._rolled_back():
+            cr.execute("""
+                SELECT i.indexrelid::regclass::text
+                FROM pg_index i
+                JOIN pg_class t ON t.oid = i.indrelid
+                WHERE t.relname IN ('medical_appointment', 'medical_record', 'medical_prescription')
+                  AND NOT i.indisprimary
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+            """)
+            for (index_name,) in cr.fetchall():
+                cr.execute(f'DROP INDEX {index_name}')
+            without_indexes = explain()
+        return {
+            name: {'with_indexes': with_indexes[name], 'without_indexes': without_indexes[name]}
+            for name in queries
+        }
@@ -0,0 +1,62 @@
+from odoo import models, api
+
+# Models whose changes invalidate cached data, one PostgreSQL sequence each
+VERSIONED_MODELS = ('medical.drug', 'medical.dashboard.stat', 'medical.patient')
+# Models changed by the current transaction, in ``cr.postcommit.data``
+BUMPED_KEY = 'medical.cache.version.bumped'
+
+
+def _sequence(model_name):
+    return f"medical_version_{model_name.replace('.', '_')}"
+
+
+class MedicalCacheVersion(models.AbstractModel):
+    """Cross-worker version counters keying ormcache entries.
+
+    A transaction changing a versioned model marks it; once the transaction
+    has committed, the model's sequence is set to the current clock, in
+    microseconds. No row is locked and nothing happens on rollback. A
+    reader may cache what it computed only when it has no uncommitted change
+    of its own and its transaction started after every version it depends
+    on, i.e. its snapshot includes the changes behind those versions.
+    """
+    _name = 'medical.cache.version'
+    _description = 'Medical Cache Versions'
+
+    def init(self):
+        for model_name in VERSIONED_MODELS:
+            self.env.cr.execute(f'CREATE SEQUENCE IF NOT EXISTS "{_sequence(model_name)}"')
+
+    @api.model
+    def bump(self, model_name):
+        """Mark ``model_name`` as changed; its version moves when the transaction commits."""
+        cr = self.env.cr
+        bumped = cr.postcommit.data.setdefault(BUMPED_KEY, set())
+        if not bumped:
+            registry = self.pool
+
+            @cr.postcommit.add
+            def set_versions():
+                with registry.cursor() as version_cr:
+                    for name in sorted(bumped):
+                        version_cr.execute(f"""
+                            SELECT setval(%(sequence)s, GREATEST(
+                                (SELECT last_value FROM "{_sequence(name)}") + 1,
+                                (extract(epoch FROM clock_timestamp()) * 1000000)::bigint))
+                        """, {'sequence': _sequence(name)})
+        bumped.add(model_name)
+
+    @api.model
+    def get(self, model_names):
+        """Return ``(versions, cacheable)`` for ``model_names``.
+
+        ``versions`` is a hashable tuple to key a cache with, ``cacheable``
+        tells whether data computed by this transaction may be cached.
+        """
+        cr = self.env.cr
+        columns = ", ".join(f'(SELECT last_value FROM "{_sequence(name)}")' for name in model_names)
+        cr.execute(f"SELECT {columns}, (extract(epoch FROM now()) * 1000000)::bigint")
+        *versions, started = cr.fetchone()
+        dirty = cr.postcommit.data.get(BUMPED_KEY)
+        cacheable = not dirty and all(version < started for version in versions)
+        return tuple(versions), cacheable
@@ -0,0 +1,251 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from datetime import timedelta
+from .appointment import FREE_STATES
+from .medical_perf import profiled
+
+# Days of capacity kept before and after today; the nightly rebuild slides the window
+CAPACITY_PAST_DAYS = 400
+CAPACITY_FUTURE_DAYS = 200
+
+WEEKDAYS = [
+    ('0', 'Monday'),
+    ('1', 'Tuesday'),
+    ('2', 'Wednesday'),
+    ('3', 'Thursday'),
+    ('4', 'Friday'),
+    ('5', 'Saturday'),
+    ('6', 'Sunday'),
+]
+# Standard week of action_default_schedule: (from, to) hours, Monday to Friday
+DEFAULT_WORKING_HOURS = [(8.0, 12.0), (13.0, 17.0)]
+
+# Local day of an appointment, in its doctor's timezone
+_LOCAL_DATE_SQL = "(a.appointment_date AT TIME ZONE 'UTC' AT TIME ZONE COALESCE(doc.tz, 'UTC'))::date"
+# Working hours of every day of the window, per doctor
+_CAPACITY_SQL = """
+    SELECT s.doctor_id, day::date AS date, SUM(s.hour_to - s.hour_from) AS capacity_hours
+    FROM generate_series(%(date_from)s::date, %(date_to)s::date, interval '1 day') AS day
+    JOIN medical_doctor_schedule s ON s.dayofweek = (extract(isodow FROM day)::int - 1)::varchar
+    {doctor_filter}
+    GROUP BY s.doctor_id, day
+"""
+
+
+class MedicalDoctorSchedule(models.Model):
+    """Working hours of a doctor, one line per weekday and time range."""
+    _name = 'medical.doctor.schedule'
+    _description = 'Doctor Working Hours'
+    _order = 'doctor_id, dayofweek, hour_from'
+
+    doctor_id = fields.Many2one('medical.doctor', string='Doctor', required=True, ondelete='cascade', index=True)
+    dayofweek = fields.Selection(WEEKDAYS, string='Day', required=True, default='0')
+    hour_from = fields.Float(string='From', required=True, default=8.0)
+    hour_to = fields.Float(string='To', required=True, default=12.0)
+
+    _sql_constraints = [
+        ('hours_check', 'CHECK (hour_from >= 0 AND hour_to <= 24 AND hour_from < hour_to)',
+         'Working hours must be a range within the day.'),
+    ]
+
+    @api.constrains('doctor_id', 'dayofweek', 'hour_from', 'hour_to')
+    def _check_overlap(self):
+        for line in self:
+            overlapping = line.doctor_id.schedule_ids.filtered(
+                lambda other: other != line and other.dayofweek == line.dayofweek
+                and other.hour_from < line.hour_to and line.hour_from < other.hour_to)
+            if overlapping:
+                raise ValidationError(_("The working hours of %s overlap.", line.doctor_id.name))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['medical.doctor.capacity']._rebuild(lines.doctor_id.ids)
+        return lines
+
+    def write(self, vals):
+        doctors = self.doctor_id
+        res = super().write(vals)
+        self.env['medical.doctor.capacity']._rebuild((doctors | self.doctor_id).ids)
+        return res
+
+    def unlink(self):
+        doctors = self.doctor_id
+        res = super().unlink()
+        self.env['medical.doctor.capacity']._rebuild(doctors.ids)
+        return res
+
+
+class MedicalDoctorCapacity(models.Model):
+    """Daily capacity bucket of a doctor: working hours against booked hours.
+
+    Capacity comes from the working hours, materialized day by day over a
+    sliding window; the booked side is kept current as appointments are
+    created, moved, resized, cancelled or deleted, by recounting only the
+    (doctor, day) buckets they touch. An occupancy report over a quarter
+    is then a plain read of at most one row per doctor and day.
+    """
+    _name = 'medical.doctor.capacity'
+    _description = 'Doctor Daily Capacity'
+    _order = 'date desc, doctor_id'
+    _rec_name = 'date'
+    _log_access = False
+
+    doctor_id = fields.Many2one('medical.doctor', string='Doctor', required=True, readonly=True, ondelete='cascade')
+    date = fields.Date(string='Date', required=True, readonly=True)
+    capacity_hours = fields.Float(string='Working Hours', readonly=True)
+    booked_hours = fields.Float(string='Booked Hours', readonly=True)
+    appointment_count = fields.Integer(string='Appointments', readonly=True)
+    utilization = fields.Float(string='Occupancy (%)', readonly=True, group_operator='avg', digits=(16, 1),
+                               help="Booked hours over working hours; empty on days off.")
+
+    _sql_constraints = [
+        ('doctor_date_uniq', 'unique (doctor_id, date)', 'A doctor has one capacity bucket per day.'),
+    ]
+
+    def init(self):
+        # Appointments and schedules may not exist yet
+        self.pool.post_init(self._init_capacity)
+
+    @api.model
+    def _init_capacity(self):
+        self.env.cr.execute("SELECT 1 FROM medical_doctor_capacity LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _window(self):
+        today = fields.Date.context_today(self)
+        return today - timedelta(days=CAPACITY_PAST_DAYS), today + timedelta(days=CAPACITY_FUTURE_DAYS)
+
+    @api.model
+    def _rebuild(self, doctor_ids=None):
+        """Recompute the buckets of ``doctor_ids`` (all doctors when ``None``) over the window."""
+        if doctor_ids is not None and not doctor_ids:
+            return
+        self.env.flush_all()
+        cr = self.env.cr
+        date_from, date_to = self._window()
+        params = {'date_from': date_from, 'date_to': date_to, 'doctor_ids': list(doctor_ids or []),
+                  'free_states': FREE_STATES}
+
+        def doctor_filter(alias, keyword='WHERE'):
+            return f"{keyword} {alias}.doctor_id = ANY(%(doctor_ids)s)" if doctor_ids is not None else ""
+
+        if doctor_ids is not None:
+            cr.execute("DELETE FROM medical_doctor_capacity WHERE doctor_id = ANY(%(doctor_ids)s)", params)
+        else:
+            cr.execute("DELETE FROM medical_doctor_capacity")
+        cr.execute(f"""
+            INSERT INTO medical_doctor_capacity
+                (doctor_id, date, capacity_hours, booked_hours, appointment_count, utilization)
+            SELECT doctor_id, date, SUM(capacity_hours), SUM(booked_hours), SUM(appointment_count),
+                   CASE WHEN SUM(capacity_hours) > 0 THEN 100 * SUM(booked_hours) / SUM(capacity_hours) END
+            FROM (
+                SELECT doctor_id, date, capacity_hours, 0 AS booked_hours, 0 AS appointment_count
+                FROM ({_CAPACITY_SQL.format(doctor_filter=doctor_filter('s'))}) AS capacity
+                UNION ALL
+                SELECT a.doctor_id, {_LOCAL_DATE_SQL}, 0, a.duration, 1
+                FROM medical_appointment a
+                JOIN medical_doctor doc ON doc.id = a.doctor_id
+                WHERE a.state NOT IN %(free_states)s
+                  AND a.appointment_date >= %(date_from)s - interval '1 day'
+                  AND a.appointment_date < %(date_to)s + interval '2 day'
+                  {doctor_filter('a', 'AND')}
+            ) AS bucket
+            WHERE date BETWEEN %(date_from)s AND %(date_to)s
+            GROUP BY doctor_id, date
+        """, params)
+        self.invalidate_model()
+
+    @api.model
+    def _cron_rebuild(self):
+        """Slide the window to today and correct any drift."""
+        self._rebuild()
+
+    @api.model
+    def _days_of(self, appointments):
+        """Return the (doctor id, local date) buckets of ``appointments``."""
+        if not appointments.ids:
+            return []
+        appointments.flush_recordset(['doctor_id', 'appointment_date'])
+        self.env.cr.execute(f"""
+            SELECT DISTINCT a.doctor_id, {_LOCAL_DATE_SQL}
+            FROM medical_appointment a
+            JOIN medical_doctor doc ON doc.id = a.doctor_id
+            WHERE a.id = ANY(%s)
+        """, (appointments.ids,))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _refresh_days(self, days):
+        """Recount the booked side of the given (doctor id, date) buckets."""
+        date_from, date_to = self._window()
+        days = [(doctor_id, date) for doctor_id, date in set(days) if date_from <= date <= date_to]
+        if not days:
+            return
+        self.env['medical.appointment'].flush_model(['doctor_id', 'appointment_date', 'duration', 'state'])
+        self.env.cr.execute("""
+            WITH day AS (
+                SELECT day.doctor_id, day.date,
+                       (day.date::timestamp AT TIME ZONE COALESCE(doc.tz, 'UTC')) AT TIME ZONE 'UTC' AS start_utc,
+                       ((day.date + 1)::timestamp AT TIME ZONE COALESCE(doc.tz, 'UTC')) AT TIME ZONE 'UTC' AS end_utc
+                FROM unnest(%(doctor_ids)s::int[], %(dates)s::date[]) AS day (doctor_id, date)
+                JOIN medical_doctor doc ON doc.id = day.doctor_id
+            ),
+            booked AS (
+                SELECT day.doctor_id, day.date, COALESCE(SUM(a.duration), 0) AS booked_hours, COUNT(a.id) AS appointment_count,
+                       (SELECT SUM(s.hour_to - s.hour_from) FROM medical_doctor_schedule s
+                        WHERE s.doctor_id = day.doctor_id
+                          AND s.dayofweek = (extract(isodow FROM day.date)::int - 1)::varchar) AS capacity_hours
+                FROM day
+                LEFT JOIN medical_appointment a
+                       ON a.doctor_id = day.doctor_id
+                      AND a.appointment_date >= day.start_utc AND a.appointment_date < day.end_utc
+                      AND a.state NOT IN %(free_states)s
+                GROUP BY day.doctor_id, day.date
+            )
+            INSERT INTO medical_doctor_capacity
+                (doctor_id, date, capacity_hours, booked_hours, appointment_count, utilization)
+            SELECT doctor_id, date, COALESCE(capacity_hours, 0), booked_hours, appointment_count,
+                   CASE WHEN capacity_hours > 0 THEN 100 * booked_hours / capacity_hours END
+            FROM booked
+            ON CONFLICT (doctor_id, date) DO UPDATE
+            SET booked_hours = EXCLUDED.booked_hours,
+                appointment_count = EXCLUDED.appointment_count,
+                utilization = EXCLUDED.utilization
+        """, {
+            'doctor_ids': [doctor_id for doctor_id, _date in days],
+            'dates': [date for _doctor_id, date in days],
+            'free_states': FREE_STATES,
+        })
+        self.invalidate_model()
+
+    @api.model
+    @profiled
+    def get_occupancy(self, date_from, date_to, doctor_ids=None):
+        """Occupancy heatmap data between two dates, from one indexed read.
+
+        :return: ``{'doctors': [{'id', 'name'}], 'dates': [...],
+                  'cells': {doctor_id: {date: {'capacity', 'booked', 'utilization'}}}}``
+        """
+        domain = [('date', '>=', date_from), ('date', '<=', date_to)]
+        if doctor_ids:
+            domain.append(('doctor_id', 'in', doctor_ids))
+        rows = self.search_read(domain, ['doctor_id', 'date', 'capacity_hours', 'booked_hours', 'utilization'],
+                                order='doctor_id, date')
+        cells, doctors = {}, {}
+        for row in rows:
+            doctor_id, doctor_name = row['doctor_id']
+            doctors[doctor_id] = doctor_name
+            cells.setdefault(doctor_id, {})[fields.Date.to_string(row['date'])] = {
+                'capacity': row['capacity_hours'],
+                'booked': row['booked_hours'],
+                'utilization': row['utilization'],
+            }
+        start, end = fields.Date.to_date(date_from), fields.Date.to_date(date_to)
+        return {
+            'doctors': [{'id': doctor_id, 'name': name} for doctor_id, name in sorted(doctors.items(), key=lambda item: item[1])],
+            'dates': [fields.Date.to_string(start + timedelta(days=offset)) for offset in range((end - start).days + 1)],
+            'cells': cells,
+        }
@@ -1,7 +1,26 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError
+from .medical_perf import profiled
 from xml.sax.saxutils import escape as xml_escape
 import math
 
+BUCKETS = [
+    ('day', 'Day'),
+    ('week', 'Week'),
+    ('month', 'Month'),
+]
+# Models whose version (see ``medical.cache.version``) keys the cached series
+SERIES_SOURCES = ('medical.dashboard.stat', 'medical.patient')
+STAT_MEASURES = ('patient_count', 'appointment_count', 'prescription_count')
+# Dashboard charts: (title, model, graph view, grouped by date bucket)
+CHARTS = {
+    'patients_doctor': ("Patients per Doctor", 'medical.dashboard.stat', 'view_patients_per_doctor_graph', False),
+    'patients_date': ("Patients per Date", 'medical.dashboard.stat', 'view_patients_per_week_graph', True),
+    'prescriptions_doctor': ("Prescriptions per Doctor", 'medical.dashboard.stat', 'view_prescriptions_per_doctor_graph', False),
+    'prescriptions_date': ("Prescriptions per Date", 'medical.dashboard.stat', 'view_prescriptions_per_month_graph', True),
+    'blood_type': ("Patients by Blood Type", 'medical.patient', 'view_patient_bloodtype_pie', False),
+}
+
 
 class MedicalDashboard(models.Model):
     _name = 'medical.dashboard'
@@ -16,12 +35,12 @@ class MedicalDashboard(models.Model):
     prescriptions_count = fields.Integer(string="Total Ordonnances", compute="_compute_counts")
 
     @api.depends()
+    @profiled
     def _compute_counts(self):
+        # Totals come from the materialized daily statistics (one small aggregate)
+        totals = self.env['medical.dashboard.stat'].get_totals()
         for record in self:
-            record.patient_count = self.env['medical.patient'].search_count([])
-            record.doctor_count = self.env['medical.doctor'].search_count([])
-            record.appointment_count = self.env['medical.appointment'].search_count([])
-            record.prescriptions_count = self.env['medical.prescription'].search_count([])
+            record.update(totals)
 
 
     # Dashboard actions used by the smart buttons in the view
@@ -65,29 +84,161 @@ class MedicalDashboard(models.Model):
             'domain': [],
         }
 
-    # Safe action-returning helpers (use env.ref to read existing actions by external id)
-    def open_patients_graph(self):
-        self.ensure_one()
-        action = self.env.ref('medical_practice.action_patients_per_doctor', False)
-        return action.read()[0] if action else {'type': 'ir.actions.act_window', 'res_model': 'medical.patient', 'view_mode': 'graph'}
+    def action_rebuild_stats(self):
+        Job = self.env['medical.job']
+        job = Job.enqueue(self.env['medical.dashboard.stat'], '_rebuild', name=_("Rebuild of the dashboard statistics"))
+        return Job._queued_notification(job)
 
-    def open_bloodtype_pie(self):
-        self.ensure_one()
-        action = self.env.ref('medical_practice.action_patient_bloodtype_pie', False)
-        return action.read()[0] if action else {'type': 'ir.actions.act_window', 'res_model': 'medical.patient', 'view_mode': 'graph'}
+    @api.model
+    def _default_range(self):
+        """Return the (date_from, date_to) of the current year."""
+        today = fields.Date.context_today(self)
+        return today.replace(month=1, day=1), today.replace(month=12, day=31)
 
-    def open_patients_week_graph(self):
-        self.ensure_one()
-        action = self.env.ref('medical_practice.action_patients_per_week', False)
-        return action.read()[0] if action else {'type': 'ir.actions.act_window', 'res_model': 'medical.patient', 'view_mode': 'graph'}
+    def action_open_chart(self):
+        """Ask the range of the chart named by the ``chart`` context key.
 
-    def open_prescriptions_doctor_graph(self):
-        self.ensure_one()
-        action = self.env.ref('medical_practice.action_prescriptions_per_doctor', False)
-        return action.read()[0] if action else {'type': 'ir.actions.act_window', 'res_model': 'medical.prescription', 'view_mode': 'graph'}
+        The dashboard record is shared: the range and bucket belong to each
+        user's ``medical.dashboard.chart`` wizard.
+        """
+        chart = self.env.context['chart']
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _(CHARTS[chart][0]),
+            'res_model': 'medical.dashboard.chart',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {'default_chart': chart},
+        }
 
-    def open_prescriptions_month_graph(self):
-        self.ensure_one()
-        action = self.env.ref('medical_practice.action_prescriptions_per_month', False)
-        return action.read()[0] if action else {'type': 'ir.actions.act_window', 'res_model': 'medical.prescription', 'view_mode': 'graph'}
+    # ------------------------------------------------------------------
+    # Series endpoint
+    # ------------------------------------------------------------------
+
+    @api.model
+    @profiled
+    def get_series(self, date_from=None, date_to=None, bucket='month'):
+        """Every dashboard series in one call, cached until the data changes.
+
+        The series come from the daily statistics and the patients' blood
+        types, neither of them company-scoped; they are cached per range and
+        bucket, and keyed on the versions of those models, so a repeated
+        call costs one small version lookup.
+
+        :return: ``{'date_from', 'date_to', 'bucket', 'totals': {...},
+                  'per_doctor': [{'doctor_id', 'doctor', 'patient_count', ...}],
+                  'per_date': [{'date', 'patient_count', ...}],
+                  'blood_types': [{'blood_type', 'label', 'count'}]}``
+        """
+        if bucket not in dict(BUCKETS):
+            raise UserError(_("Unknown bucket %s: use day, week or month.", bucket))
+        default_from, default_to = self._default_range()
+        date_from = fields.Date.to_date(date_from) or default_from
+        date_to = fields.Date.to_date(date_to) or default_to
+        if date_from > date_to:
+            raise UserError(_("The start date must be before the end date."))
+        date_from, date_to = fields.Date.to_string(date_from), fields.Date.to_string(date_to)
+        versions, cacheable = self.env['medical.cache.version'].get(SERIES_SOURCES)
+        if not cacheable:
+            # Uncommitted changes, or a snapshot older than the versions
+            per_doctor, per_date, blood_types = self._aggregate_series(date_from, date_to, bucket)
+        else:
+            per_doctor, per_date, blood_types = self._compute_series(date_from, date_to, bucket, versions)
+        totals = dict.fromkeys(STAT_MEASURES, 0)
+        for _date, *counts in per_date:
+            for measure, count in zip(STAT_MEASURES, counts):
+                totals[measure] += count
+        doctors = self.env['medical.doctor'].sudo().with_context(active_test=False).browse(
+            [doctor_id for doctor_id, *_counts in per_doctor if doctor_id])
+        names = dict(zip(doctors.ids, doctors.mapped('display_name')))
+        labels = dict(self.env['medical.patient']._fields['blood_type']._description_selection(self.env))
+        return {
+            'date_from': date_from,
+            'date_to': date_to,
+            'bucket': bucket,
+            'totals': totals,
+            'per_doctor': [
+                dict(zip(STAT_MEASURES, counts), doctor_id=doctor_id, doctor=names.get(doctor_id, _("Unassigned")))
+                for doctor_id, *counts in per_doctor
+            ],
+            'per_date': [dict(zip(STAT_MEASURES, counts), date=date) for date, *counts in per_date],
+            'blood_types': [
+                {'blood_type': blood_type, 'label': labels.get(blood_type, _("Unknown")), 'count': count}
+                for blood_type, count in blood_types
+            ],
+        }
 
+    @api.model
+    @tools.ormcache('date_from', 'date_to', 'bucket', 'versions')
+    def _compute_series(self, date_from, date_to, bucket, versions):
+        """Cached :meth:`_aggregate_series`; ``versions`` only keys the cache."""
+        return self._aggregate_series(date_from, date_to, bucket)
+
+    @api.model
+    def _aggregate_series(self, date_from, date_to, bucket):
+        """Return the (per doctor, per date, blood types) series as immutable tuples."""
+        Stat = self.env['medical.dashboard.stat'].sudo()
+        domain = [('date', '>=', date_from), ('date', '<=', date_to)]
+        aggregates = [f'{measure}:sum' for measure in STAT_MEASURES]
+        per_doctor = tuple(
+            (doctor.id, *(count or 0 for count in counts))
+            for doctor, *counts in Stat._read_group(domain, ['doctor_id'], aggregates)
+        )
+        per_date = tuple(
+            (fields.Date.to_string(date), *(count or 0 for count in counts))
+            for date, *counts in Stat._read_group(domain, [f'date:{bucket}'], aggregates, order=f'date:{bucket}')
+        )
+        blood_types = tuple(
+            self.env['medical.patient'].sudo()._read_group([], ['blood_type'], ['__count'], order='blood_type')
+        )
+        return per_doctor, per_date, blood_types
+
+
+
+class MedicalDashboardChart(models.TransientModel):
+    """Range and bucket of a dashboard chart, kept per user."""
+    _name = 'medical.dashboard.chart'
+    _description = 'Medical Dashboard Chart'
+
+    chart = fields.Selection([(key, title) for key, (title, *_rest) in CHARTS.items()],
+                             string="Chart", required=True, default='patients_doctor')
+    # An empty bound means the current year
+    date_from = fields.Date(string="From")
+    date_to = fields.Date(string="To")
+    bucket = fields.Selection(BUCKETS, string="Group By", required=True, default='month')
+
+    @api.model
+    def default_get(self, fields_list):
+        """Start from the range the user chose last."""
+        values = super().default_get(fields_list)
+        last = self.search([('create_uid', '=', self.env.uid)], order='id desc', limit=1)
+        for name in ('date_from', 'date_to', 'bucket'):
+            if name in fields_list and last[name]:
+                values[name] = last[name]
+        return values
+
+    def _get_range(self):
+        """Return the (date_from, date_to) of the chart, defaulting to the current year."""
+        default_from, default_to = self.env['medical.dashboard']._default_range()
+        return self.date_from or default_from, self.date_to or default_to
+
+    def action_open(self):
+        self.ensure_one()
+        title, model, view, by_date = CHARTS[self.chart]
+        date_from, date_to = self._get_range()
+        if date_from > date_to:
+            raise UserError(_("The start date must be before the end date."))
+        action = {
+            'type': 'ir.actions.act_window',
+            'name': _("%(title)s (%(date_from)s - %(date_to)s)", title=_(title),
+                      date_from=fields.Date.to_string(date_from), date_to=fields.Date.to_string(date_to)),
+            'res_model': model,
+            'view_mode': 'graph',
+            'views': [(self.env.ref(f'medical_practice.{view}').id, 'graph')],
+            'target': 'current',
+            'domain': [],
+            'context': {'graph_groupbys': [f'date:{self.bucket}']} if by_date else {},
+        }
+        if model == 'medical.dashboard.stat':
+            action['domain'] = [('date', '>=', date_from), ('date', '<=', date_to)]
+        return action
@@ -0,0 +1,168 @@
+from odoo import models, fields, api
+
+
+class MedicalDashboardStat(models.Model):
+    """Daily counters per doctor backing the medical dashboard.
+
+    Rows are maintained incrementally by ``medical.dashboard.stat.mixin`` and
+    fully rebuilt every night by ``_cron_rebuild``.
+    """
+    _name = 'medical.dashboard.stat'
+    _description = 'Medical Dashboard Daily Statistics'
+    _order = 'date desc, doctor_id'
+    _rec_name = 'date'
+
+    date = fields.Date(string='Date', required=True, readonly=True)
+    doctor_id = fields.Many2one('medical.doctor', string='Doctor', readonly=True, ondelete='cascade')
+    patient_count = fields.Integer(string='New Patients', readonly=True)
+    doctor_count = fields.Integer(string='New Doctors', readonly=True)
+    appointment_count = fields.Integer(string='Appointments', readonly=True)
+    prescription_count = fields.Integer(string='Ordonnances', readonly=True)
+
+    _sql_constraints = [
+        ('date_doctor_uniq', 'unique nulls not distinct (date, doctor_id)',
+         'Only one statistics row per day and doctor is allowed.'),
+    ]
+
+    def init(self):
+        # Fill the table the first time the module is installed on a database
+        # that already holds data; afterwards the mixin keeps it up to date.
+        # The source tables may not exist yet, so wait for every model.
+        self.pool.post_init(self._init_stats)
+
+    @api.model
+    def _init_stats(self):
+        self.env.cr.execute("SELECT 1 FROM medical_dashboard_stat LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _get_sources(self):
+        """Return the models feeding the statistics table."""
+        return [
+            self.env[name] for name in (
+                'medical.patient', 'medical.doctor', 'medical.appointment', 'medical.prescription',
+            )
+        ]
+
+    @api.model
+    def _source_query(self, model, count='COUNT(*)', table=None):
+        """Return the ``SELECT date, doctor_id, count`` query aggregating ``model``.
+
+        ``table`` reads another table with the same columns, e.g. the archive.
+        """
+        where = f"AND {model._stat_where}" if model._stat_where else ""
+        return f"""
+            SELECT {model._stat_date_field}::date, {model._stat_doctor_field}, {count}
+            FROM {table or model._table}
+            WHERE {model._stat_date_field} IS NOT NULL {where}
+        """
+
+    @api.model
+    def _apply_delta(self, records, sign):
+        """Add (``sign=1``) or remove (``sign=-1``) ``records`` from the counters."""
+        if not records:
+            return
+        records.flush_recordset()
+        column = records._stat_column
+        query = self._source_query(records, count=f'{int(sign)} * COUNT(*)')
+        self.env.cr.execute(f"""
+            INSERT INTO medical_dashboard_stat (date, doctor_id, {column})
+            SELECT src.* FROM ({query} AND id IN %s GROUP BY 1, 2) AS src
+            ON CONFLICT ON CONSTRAINT medical_dashboard_stat_date_doctor_uniq
+            DO UPDATE SET {column} = medical_dashboard_stat.{column} + EXCLUDED.{column}
+        """, (tuple(records.ids),))
+        self.invalidate_model()
+        self.env['medical.cache.version'].bump(self._name)
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the whole table from the source models."""
+        self.env.flush_all()
+        cr = self.env.cr
+        cr.execute("DELETE FROM medical_dashboard_stat")
+        for model in self._get_sources():
+            column = model._stat_column
+            # Archived rows still count in the history
+            for table in filter(None, (model._table, model._stat_archive_table)):
+                cr.execute(f"""
+                    INSERT INTO medical_dashboard_stat (date, doctor_id, {column})
+                    SELECT src.* FROM ({self._source_query(model, table=table)} GROUP BY 1, 2) AS src
+                    ON CONFLICT ON CONSTRAINT medical_dashboard_stat_date_doctor_uniq
+                    DO UPDATE SET {column} = COALESCE(medical_dashboard_stat.{column}, 0) + EXCLUDED.{column}
+                """)
+        self.invalidate_model()
+        self.env['medical.cache.version'].bump(self._name)
+
+    @api.model
+    def _cron_rebuild(self):
+        self._rebuild()
+
+    @api.model
+    def get_totals(self):
+        """Return the dashboard totals summed over every row."""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(patient_count), 0),
+                   COALESCE(SUM(doctor_count), 0),
+                   COALESCE(SUM(appointment_count), 0),
+                   COALESCE(SUM(prescription_count), 0)
+            FROM medical_dashboard_stat
+        """)
+        patients, doctors, appointments, prescriptions = self.env.cr.fetchone()
+        return {
+            'patient_count': patients,
+            'doctor_count': doctors,
+            'appointment_count': appointments,
+            'prescriptions_count': prescriptions,
+        }
+
+
+class MedicalDashboardStatMixin(models.AbstractModel):
+    """Keep ``medical.dashboard.stat`` in sync on create/write/unlink."""
+    _name = 'medical.dashboard.stat.mixin'
+    _description = 'Medical Dashboard Statistics Mixin'
+
+    # Counter column in medical_dashboard_stat fed by this model
+    _stat_column = None
+    # Columns giving the day and the doctor of each row
+    _stat_date_field = 'create_date'
+    _stat_doctor_field = 'doctor_id'
+    # Optional SQL filter on the rows to count
+    _stat_where = None
+    # Table holding the archived rows of the model, counted by the rebuild
+    _stat_archive_table = None
+    # Fields read directly by the dashboard series: changing them bumps the model's version
+    _stat_series_fields = ()
+
+    @api.model
+    def _stat_tracked_fields(self):
+        """Fields whose change moves a record to another statistics bucket."""
+        return {self._stat_date_field, self._stat_doctor_field}
+
+    def _bump_series_version(self):
+        if self._stat_series_fields:
+            self.env['medical.cache.version'].bump(self._name)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['medical.dashboard.stat']._apply_delta(records, 1)
+        records._bump_series_version()
+        return records
+
+    def write(self, vals):
+        tracked = bool(self._stat_tracked_fields() & set(vals))
+        if tracked:
+            self.env['medical.dashboard.stat']._apply_delta(self, -1)
+        res = super().write(vals)
+        if tracked:
+            self.env['medical.dashboard.stat']._apply_delta(self, 1)
+        if set(self._stat_series_fields) & set(vals):
+            self._bump_series_version()
+        return res
+
+    def unlink(self):
+        self.env['medical.dashboard.stat']._apply_delta(self, -1)
+        self._bump_series_version()
+        return super().unlink()
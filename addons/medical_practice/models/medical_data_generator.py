@@ -0,0 +1,364 @@
+from odoo import models, fields, api
+from datetime import datetime, time, timedelta
+import csv
+import io
+import logging
+import random
+
+_logger = logging.getLogger(__name__)
+
+FIRST_NAMES = [
+    'Adam', 'Alice', 'Amélie', 'Antoine', 'Camille', 'Chloé', 'Clément', 'Élodie', 'Emma', 'Étienne',
+    'Fatima', 'François', 'Gabriel', 'Hélène', 'Hugo', 'Inès', 'Jules', 'Léa', 'Louis', 'Lucas',
+    'Manon', 'Mathis', 'Mehdi', 'Nathan', 'Noémie', 'Océane', 'Paul', 'Raphaël', 'Sarah', 'Sofiane',
+    'Théo', 'Yasmine', 'Zoé', 'Anna', 'Omar', 'Maria', 'Li', 'Raj', 'John', 'Jane',
+]
+LAST_NAMES = [
+    'Martin', 'Bernard', 'Thomas', 'Petit', 'Robert', 'Richard', 'Durand', 'Dubois', 'Moreau', 'Laurent',
+    'Simon', 'Michel', 'Lefèvre', 'Leroy', 'Roux', 'David', 'Bertrand', 'Morel', 'Fournier', 'Girard',
+    'Bonnet', 'Dupont', 'Lambert', 'Fontaine', 'Rousseau', 'Vincent', 'Müller', 'Benali', 'Haddad', 'Garcia',
+    'Lopez', 'Chen', 'Kumar', 'Ali', 'Smith', 'Nguyen', 'Faure', 'André', 'Mercier', 'Blanc',
+]
+CITIES = [
+    'Paris', 'Marseille', 'Lyon', 'Toulouse', 'Nice', 'Nantes', 'Montpellier', 'Strasbourg', 'Bordeaux', 'Lille',
+    'Rennes', 'Reims', 'Tunis', 'Sfax', 'Sousse', 'Genève', 'Bruxelles', 'Montréal',
+]
+BLOOD_TYPES = [('O+', 36), ('A+', 30), ('B+', 9), ('AB+', 3), ('O-', 7), ('A-', 8), ('B-', 2), ('AB-', 1)]
+APPOINTMENT_TYPES = [('consultation', 50), ('checkup', 25), ('follow_up', 20), ('emergency', 5)]
+PAST_APPOINTMENT_STATES = [('completed', 85), ('cancelled', 8), ('no_show', 7)]
+FUTURE_APPOINTMENT_STATES = [('scheduled', 55), ('confirmed', 38), ('cancelled', 7)]
+DRUGS = [
+    ('Paracétamol', 'PARA-1000', '1000 mg', 'Three times daily', '5 days'),
+    ('Amoxicillin', 'AMX-500', '500 mg', 'Three times daily', '7 days'),
+    ('Ibuprofen', 'IBU-400', '400 mg', 'Twice daily', '5 days'),
+    ('Oméprazole', 'OME-20', '20 mg', 'Once daily', '28 days'),
+    ('Metformin', 'MET-850', '850 mg', 'Twice daily', '90 days'),
+    ('Amlodipine', 'AML-5', '5 mg', 'Once daily', '90 days'),
+    ('Salbutamol', 'SAL-100', '100 µg', 'As needed', '30 days'),
+    ('Hydrocortisone', 'HC-1', '1% cream', 'Twice daily', '10 days'),
+]
+
+# Half-hour slots between 08:00 and 18:00 (UTC) on week days
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 20
+DAY_START = time(8, 0)
+
+
+def _weighted(rng, choices, k):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=k)
+
+
+class MedicalDataGenerator(models.AbstractModel):
+    """Bulk synthetic dataset for load testing.
+
+    Rows are written with PostgreSQL ``COPY`` in chunks, bypassing the ORM,
+    then the derived tables (dashboard statistics, doctor/patient links) are
+    rebuilt and the tables analyzed. Meant for test databases only.
+    """
+    _name = 'medical.data.generator'
+    _description = 'Synthetic Medical Data Generator'
+
+    @api.model
+    def generate(self, patients=1000, doctors=20, appointments=10000, records=2000,
+                 prescriptions=5000, lines_per_prescription=1, years=3, future_days=60, future_share=0.15,
+                 seed=42, chunk_size=50000):
+        """Generate a dataset and return the number of rows created per model.
+
+        Appointments span ``years`` of history and the next ``future_days``,
+        ``future_share`` of them being upcoming (scheduled or confirmed) ones
+        so the agenda, free-slot and reminder paths work on a realistic load.
+        """
+        rng = random.Random(seed)
+        end = fields.Datetime.now().replace(microsecond=0)
+        start = end - timedelta(days=365 * years)
+        self.env.flush_all()
+
+        doctor_ids = self._generate_doctors(doctors)
+        # Zipf-like workload: a few doctors see most of the patients
+        doctor_weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(doctor_ids))]
+        patients_by_doctor = self._generate_patients(rng, patients, doctor_ids, doctor_weights, start, end, chunk_size)
+        appointment_count = self._generate_appointments(
+            rng, appointments, doctor_ids, doctor_weights, patients_by_doctor, start, end, chunk_size,
+            future_days=future_days, future_share=future_share)
+        record_count = self._generate_records(
+            rng, records, doctor_ids, doctor_weights, patients_by_doctor, start, end, chunk_size)
+        prescription_count, line_count = self._generate_prescriptions(
+            rng, prescriptions, lines_per_prescription, doctor_ids, doctor_weights, patients_by_doctor,
+            start, end, chunk_size)
+
+        self.env.invalidate_all()
+        self._refresh_derived_data()
+        self.env.cr.execute("""
+            ANALYZE medical_doctor, medical_patient, medical_appointment, medical_record,
+                    medical_prescription, medical_prescription_line
+        """)
+        return {
+            'medical.doctor': len(doctor_ids),
+            'medical.patient': sum(len(ids) for ids in patients_by_doctor.values()),
+            'medical.appointment': appointment_count,
+            'medical.record': record_count,
+            'medical.prescription': prescription_count,
+            'medical.prescription.line': line_count,
+        }
+
+    @api.model
+    def _refresh_derived_data(self):
+        """Rebuild the tables maintained by the ORM hooks that COPY bypassed."""
+        self.env['medical.dashboard.stat']._rebuild()
+        self.env['medical.cache.version'].bump('medical.patient')
+        self.env['medical.doctor.patient']._rebuild()
+        self.env['medical.patient']._refresh_ages()
+        self.env['medical.record']._refresh_vital_flags()
+        self.env['medical.patient']._refresh_vital_trends()
+        # Generated doctors work a standard week (this rebuilds their capacity)
+        self.env['medical.doctor'].search([('schedule_ids', '=', False)]).action_default_schedule()
+        self.env['medical.doctor.capacity']._rebuild()
+
+    # ------------------------------------------------------------------
+    # Low level helpers
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _reserve_ids(self, table, count):
+        """Draw ``count`` ids from the id sequence of ``table``."""
+        self.env.cr.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)", (table, count))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _copy(self, table, columns, rows, dated=False):
+        """Bulk insert ``rows`` (tuples matching ``columns``) with COPY ... FROM STDIN.
+
+        When ``dated`` is set, the last value of each row is used as its
+        create/write date instead of the current time.
+        """
+        if not rows:
+            return
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        uid = self.env.uid
+        now = fields.Datetime.to_string(fields.Datetime.now())
+        for row in rows:
+            if dated:
+                row, now = row[:-1], row[-1]
+            writer.writerow(row + (uid, now, uid, now))
+        buffer.seek(0)
+        all_columns = ', '.join(columns + ['create_uid', 'create_date', 'write_uid', 'write_date'])
+        self.env.cr.copy_expert(f"COPY {table} ({all_columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    @api.model
+    def _random_datetime(self, rng, start, end):
+        return start + timedelta(seconds=rng.randrange(int((end - start).total_seconds())))
+
+    @api.model
+    def _pick_patient(self, rng, doctor_id, patients_by_doctor, all_patients):
+        # Most visits are with the primary care doctor
+        own = patients_by_doctor.get(doctor_id)
+        if own and rng.random() < 0.7:
+            return rng.choice(own)
+        return rng.choice(all_patients)
+
+    # ------------------------------------------------------------------
+    # Generators
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _generate_doctors(self, count):
+        specialities = self.env['medical.speciality'].search([])
+        doctors = self.env['medical.doctor'].create([{
+            'name': f"Dr. {FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i * 7) % len(LAST_NAMES)]} {i + 1}",
+            'speciality_id': specialities[i % len(specialities)].id if specialities else False,
+            'email': f"doctor{i + 1}@example.com",
+        } for i in range(count)])
+        self.env.flush_all()
+        return doctors.ids
+
+    @api.model
+    def _generate_patients(self, rng, count, doctor_ids, doctor_weights, start, end, chunk_size):
+        columns = ['id', 'name', 'patient_id', 'birth_date', 'gender', 'blood_type', 'phone', 'city', 'doctor_id']
+        today = end.date()
+        patients_by_doctor = {doctor_id: [] for doctor_id in doctor_ids}
+        done = 0
+        while done < count:
+            size = min(chunk_size, count - done)
+            ids = self._reserve_ids('medical_patient', size)
+            numbers = self.env['ir.sequence']._next_batch_by_code('medical.patient', size)
+            doctors = rng.choices(doctor_ids, weights=doctor_weights, k=size)
+            blood_types = _weighted(rng, BLOOD_TYPES, size)
+            rows = []
+            for i in range(size):
+                age_days = int(rng.triangular(0, 95, 40) * 365.25)
+                patients_by_doctor[doctors[i]].append(ids[i])
+                rows.append((
+                    ids[i],
+                    f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    numbers[i] or f"PAT-{ids[i]}",
+                    (today - timedelta(days=age_days)).isoformat(),
+                    rng.choice(('male', 'female', 'female', 'male', 'other')),
+                    blood_types[i],
+                    f"+33 6 {rng.randrange(10 ** 8):08d}",
+                    rng.choice(CITIES),
+                    doctors[i],
+                    fields.Datetime.to_string(self._random_datetime(rng, start, end)),
+                ))
+            self._copy('medical_patient', columns, rows, dated=True)
+            done += size
+            _logger.info("medical.data.generator: %s/%s patients", done, count)
+        return patients_by_doctor
+
+    @api.model
+    def _generate_appointments(self, rng, count, doctor_ids, doctor_weights, patients_by_doctor, start, end, chunk_size,
+                               future_days=0, future_share=0.0):
+        if not count:
+            return 0
+        all_patients = [pid for ids in patients_by_doctor.values() for pid in ids]
+        if not all_patients:
+            return 0
+        columns = ['id', 'name', 'patient_id', 'doctor_id', 'appointment_date', 'duration', 'end_time',
+                   'state', 'appointment_type']
+        # Week days of the history (up to today) and of the upcoming agenda
+        past_days = [start.date() + timedelta(days=d) for d in range((end - start).days + 1)]
+        upcoming_days = [end.date() + timedelta(days=d) for d in range(1, future_days + 1)]
+        grids = [[day for day in days if day.weekday() < 5] for days in (past_days, upcoming_days)]
+        total_weight = sum(doctor_weights)
+        slot = timedelta(minutes=SLOT_MINUTES)
+
+        rows = []
+        done = 0
+
+        def flush(rows):
+            ids = self._reserve_ids('medical_appointment', len(rows))
+            numbers = self.env['ir.sequence']._next_batch_by_code('medical.appointment', len(rows))
+            self._copy('medical_appointment', columns, [
+                (ids[i], numbers[i] or f"APP-{ids[i]}") + row for i, row in enumerate(rows)
+            ])
+
+        def slots(doctor_id, days, wanted):
+            grid_size = len(days) * SLOTS_PER_DAY
+            if wanted > grid_size:
+                _logger.warning("medical.data.generator: doctor %s capped at %s appointments (agenda full)",
+                                doctor_id, grid_size)
+                wanted = grid_size
+            # Distinct half-hour slots per doctor: no overlapping appointments
+            for slot_index in rng.sample(range(grid_size), wanted):
+                day, position = divmod(slot_index, SLOTS_PER_DAY)
+                yield datetime.combine(days[day], DAY_START) + position * slot
+
+        for doctor_id, weight in zip(doctor_ids, doctor_weights):
+            wanted = round(count * weight / total_weight)
+            upcoming = round(wanted * future_share) if grids[1] else 0
+            dates = [*slots(doctor_id, grids[0], wanted - upcoming), *slots(doctor_id, grids[1], upcoming)]
+            for appointment_date in dates:
+                states = PAST_APPOINTMENT_STATES if appointment_date < end else FUTURE_APPOINTMENT_STATES
+                rows.append((
+                    self._pick_patient(rng, doctor_id, patients_by_doctor, all_patients),
+                    doctor_id,
+                    fields.Datetime.to_string(appointment_date),
+                    SLOT_MINUTES / 60.0,
+                    fields.Datetime.to_string(appointment_date + slot),
+                    _weighted(rng, states, 1)[0],
+                    _weighted(rng, APPOINTMENT_TYPES, 1)[0],
+                ))
+                if len(rows) >= chunk_size:
+                    flush(rows)
+                    done += len(rows)
+                    rows = []
+                    _logger.info("medical.data.generator: %s/%s appointments", done, count)
+        if rows:
+            flush(rows)
+            done += len(rows)
+        return done
+
+    @api.model
+    def _generate_records(self, rng, count, doctor_ids, doctor_weights, patients_by_doctor, start, end, chunk_size):
+        all_patients = [pid for ids in patients_by_doctor.values() for pid in ids]
+        if not count or not all_patients:
+            return 0
+        columns = ['id', 'name', 'patient_id', 'doctor_id', 'record_date', 'temperature',
+                   'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'weight', 'height', 'bmi',
+                   'chief_complaint', 'diagnosis']
+        complaints = ['Fièvre', 'Toux', 'Céphalées', 'Douleur abdominale', 'Fatigue', 'Lombalgie', 'Contrôle annuel']
+        diagnoses = ['Grippe', 'Rhinopharyngite', 'Hypertension artérielle', 'Diabète de type 2', 'Migraine',
+                     'Gastro-entérite', 'Bilan normal']
+        done = 0
+        while done < count:
+            size = min(chunk_size, count - done)
+            ids = self._reserve_ids('medical_record', size)
+            numbers = self.env['ir.sequence']._next_batch_by_code('medical.record', size)
+            doctors = rng.choices(doctor_ids, weights=doctor_weights, k=size)
+            rows = []
+            for i in range(size):
+                weight = round(rng.gauss(72, 14), 1)
+                height = round(rng.gauss(170, 10), 1)
+                rows.append((
+                    ids[i],
+                    numbers[i] or f"MR-{ids[i]}",
+                    self._pick_patient(rng, doctors[i], patients_by_doctor, all_patients),
+                    doctors[i],
+                    fields.Datetime.to_string(self._random_datetime(rng, start, end)),
+                    round(rng.gauss(37.0, 0.6), 1),
+                    int(rng.gauss(125, 15)),
+                    int(rng.gauss(80, 10)),
+                    int(rng.gauss(75, 12)),
+                    weight,
+                    height,
+                    round(weight / (height / 100) ** 2, 2),
+                    rng.choice(complaints),
+                    rng.choice(diagnoses),
+                ))
+            self._copy('medical_record', columns, rows)
+            done += size
+            _logger.info("medical.data.generator: %s/%s medical records", done, count)
+        return done
+
+    @api.model
+    def _generate_prescriptions(self, rng, count, lines_per_prescription, doctor_ids, doctor_weights,
+                                patients_by_doctor, start, end, chunk_size):
+        all_patients = [pid for ids in patients_by_doctor.values() for pid in ids]
+        if not count or not all_patients:
+            return 0, 0
+        Drug = self.env['medical.drug']
+        drugs = Drug.search([])
+        if not drugs:
+            drugs = Drug.create([{
+                'name': name, 'code': code, 'default_dosage': dosage,
+                'default_frequency': frequency, 'default_duration': duration,
+            } for name, code, dosage, frequency, duration in DRUGS])
+            self.env.flush_all()
+        drug_rows = [(d.id, d.name, d.default_dosage or '1 unit', d.default_frequency or 'Once daily',
+                      d.default_duration or '7 days') for d in drugs]
+        columns = ['id', 'name', 'patient_id', 'doctor_id', 'prescription_date', 'state']
+        line_columns = ['prescription_id', 'medication_id', 'medication_name', 'dosage', 'frequency',
+                        'duration', 'quantity']
+        recent = (end - timedelta(days=30)).date()
+        done = lines_done = 0
+        while done < count:
+            size = min(chunk_size, count - done)
+            ids = self._reserve_ids('medical_prescription', size)
+            numbers = self.env['ir.sequence']._next_batch_by_code('medical.prescription', size)
+            doctors = rng.choices(doctor_ids, weights=doctor_weights, k=size)
+            rows, lines = [], []
+            for i in range(size):
+                prescription_date = self._random_datetime(rng, start, end).date()
+                if prescription_date < recent:
+                    state = _weighted(rng, [('completed', 70), ('dispensed', 25), ('prescribed', 5)], 1)[0]
+                else:
+                    state = _weighted(rng, [('draft', 30), ('prescribed', 50), ('dispensed', 20)], 1)[0]
+                rows.append((
+                    ids[i],
+                    numbers[i] or f"RX-{ids[i]}",
+                    self._pick_patient(rng, doctors[i], patients_by_doctor, all_patients),
+                    doctors[i],
+                    prescription_date.isoformat(),
+                    state,
+                ))
+                line_count = max(1, round(rng.expovariate(1.0 / lines_per_prescription))) if lines_per_prescription else 0
+                for drug in rng.sample(drug_rows, min(line_count, len(drug_rows))):
+                    lines.append((ids[i],) + drug + (float(rng.randint(1, 3)),))
+            self._copy('medical_prescription', columns, rows)
+            self._copy('medical_prescription_line', line_columns, lines)
+            done += size
+            lines_done += len(lines)
+            _logger.info("medical.data.generator: %s/%s prescriptions", done, count)
+        return done, lines_done
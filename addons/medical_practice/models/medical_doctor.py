@@ -1,4 +1,7 @@
 from odoo import models, fields, api
+from odoo.addons.base.models.res_partner import _tz_get
+from .medical_perf import profiled
+from .medical_capacity import DEFAULT_WORKING_HOURS
 
 
 # New model for medical specialities so specialities are normalized and creatable
@@ -9,11 +12,105 @@ class MedicalSpeciality(models.Model):
     name = fields.Char(string='Speciality', required=True)
 
 
+# Lien médecin / patient : un enregistrement par couple ayant au moins un rendez-vous
+class MedicalDoctorPatient(models.Model):
+    _name = 'medical.doctor.patient'
+    _description = 'Doctor / Patient Link'
+    _log_access = False
+
+    doctor_id = fields.Many2one('medical.doctor', string='Doctor', required=True, readonly=True, ondelete='cascade')
+    patient_id = fields.Many2one('medical.patient', string='Patient', required=True, readonly=True, ondelete='cascade', index=True)
+    appointment_count = fields.Integer(string='Appointments', readonly=True)
+
+    _sql_constraints = [
+        ('doctor_patient_uniq', 'unique (doctor_id, patient_id)', 'A doctor/patient link must be unique.'),
+    ]
+
+    def init(self):
+        # Other tables may not exist yet: fill the links once every model is set up
+        self.pool.post_init(self._init_links)
+
+    @api.model
+    def _init_links(self):
+        self.env.cr.execute("SELECT 1 FROM medical_doctor_patient LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _rebuild(self):
+        """Recompute every link and every doctor's patient_count from the appointments, archived ones included."""
+        self.env.flush_all()
+        cr = self.env.cr
+        cr.execute("DELETE FROM medical_doctor_patient")
+        cr.execute("""
+            INSERT INTO medical_doctor_patient (doctor_id, patient_id, appointment_count)
+            SELECT doctor_id, patient_id, COUNT(*)
+            FROM (
+                SELECT doctor_id, patient_id FROM medical_appointment
+                UNION ALL
+                SELECT doctor_id, patient_id FROM medical_appointment_archive
+            ) AS appointment
+            WHERE doctor_id IS NOT NULL AND patient_id IS NOT NULL
+            GROUP BY doctor_id, patient_id
+        """)
+        cr.execute("""
+            UPDATE medical_doctor d
+            SET patient_count = (SELECT COUNT(*) FROM medical_doctor_patient l WHERE l.doctor_id = d.id)
+        """)
+        self.invalidate_model()
+        self.env['medical.doctor'].invalidate_model(['patient_count'])
+
+    @api.model
+    def _apply_delta(self, appointments, sign):
+        """Add (``sign=1``) or remove (``sign=-1``) ``appointments`` from the links."""
+        if not appointments:
+            return
+        appointments.flush_recordset(['doctor_id', 'patient_id'])
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO medical_doctor_patient (doctor_id, patient_id, appointment_count)
+            SELECT doctor_id, patient_id, %s * COUNT(*)
+            FROM medical_appointment
+            WHERE id IN %s AND doctor_id IS NOT NULL AND patient_id IS NOT NULL
+            GROUP BY doctor_id, patient_id
+            ON CONFLICT (doctor_id, patient_id)
+            DO UPDATE SET appointment_count = medical_doctor_patient.appointment_count + EXCLUDED.appointment_count
+            RETURNING doctor_id, patient_id, xmax = 0 AS inserted, appointment_count
+        """, (int(sign), tuple(appointments.ids)))
+        rows = cr.fetchall()
+        self.invalidate_model()
+        # Only a link added or removed changes a doctor's patient_count: the
+        # doctor row is not touched (nor locked) by every booking.
+        doctor_ids = {doctor_id for doctor_id, _patient_id, inserted, _count in rows if inserted}
+        emptied = tuple((doctor_id, patient_id) for doctor_id, patient_id, _inserted, count in rows if count <= 0)
+        if emptied:
+            cr.execute("""
+                DELETE FROM medical_doctor_patient
+                WHERE (doctor_id, patient_id) IN %s AND appointment_count <= 0
+                RETURNING doctor_id
+            """, (emptied,))
+            doctor_ids.update(row[0] for row in cr.fetchall())
+        if not doctor_ids:
+            return
+        doctor_ids = tuple(doctor_ids)
+        cr.execute("""
+            UPDATE medical_doctor d
+            SET patient_count = (SELECT COUNT(*) FROM medical_doctor_patient l WHERE l.doctor_id = d.id)
+            WHERE d.id IN %s
+        """, (doctor_ids,))
+        self.env['medical.doctor'].browse(doctor_ids).invalidate_recordset(['patient_count'])
+
+
 # Définition du modèle "Médecin"
 class MedicalDoctor(models.Model):
     _name = 'medical.doctor'               # Nom technique (table en DB : medical_doctor)
     _description = 'Médecin'               # Description lisible par l'utilisateur
     _order = 'name'                        # Ordre par défaut
+    _inherit = ['medical.dashboard.stat.mixin']
+    # Compteur du tableau de bord : médecins actifs, par date de création
+    _stat_column = 'doctor_count'
+    _stat_doctor_field = 'id'
+    _stat_where = 'active'
 
     name = fields.Char(
         string="Nom du médecin",
@@ -48,9 +145,13 @@ class MedicalDoctor(models.Model):
         help="Décocher pour archiver le médecin"
     )
 
+    # Nombre de patients distincts vus en rendez-vous, tenu à jour par
+    # medical.doctor.patient à chaque création/modification/suppression de rendez-vous
     patient_count = fields.Integer(
         string="Nombre de patients",
-        compute="_compute_patient_count"
+        readonly=True,
+        copy=False,
+        default=0,
     )
 
     # Optional inverse relation for easier counting and fast grouping
@@ -58,43 +159,16 @@ class MedicalDoctor(models.Model):
     # Link to appointments so we can depend on appointment changes
     appointment_ids = fields.One2many('medical.appointment', 'doctor_id', string='Appointments')
 
-    @api.depends('patient_ids', 'appointment_ids.patient_id')
-    def _compute_patient_count(self):
-        if not self:
-            return
-        cr = self.env.cr
-        ids = tuple(self.ids)
-        counts = {doc_id: 0 for doc_id in self.ids}
-        try:
-            query = f"""
-                SELECT doctor_id, COUNT(DISTINCT patient_id) AS c
-                FROM medical_appointment
-                WHERE doctor_id IN %s AND patient_id IS NOT NULL
-                GROUP BY doctor_id
-            """
-            cr.execute(query, (ids,))
-            for row in cr.fetchall():
-                doc_id, c = row
-                counts[doc_id] = c or 0
-        except Exception:
-            Appointment = self.env['medical.appointment']
-            for doctor in self:
-                try:
-                    appts = Appointment.search([('doctor_id', '=', doctor.id)])
-                    patient_ids = appts.mapped('patient_id.id')
-                    doctor.patient_count = len(set([p for p in patient_ids if p]))
-                except Exception:
-                    doctor.patient_count = 0
-            return
-
-        for doctor in self:
-            doctor.patient_count = counts.get(doctor.id, 0)
+    # Horaires de travail, matérialisés en capacité journalière (medical.doctor.capacity)
+    schedule_ids = fields.One2many('medical.doctor.schedule', 'doctor_id', string='Horaires de travail')
+    tz = fields.Selection(_tz_get, string='Fuseau horaire', default=lambda self: self.env.user.tz or 'UTC',
+                          help="Fuseau horaire des horaires de travail")
 
+    @profiled
     def action_open_patients(self):
         self.ensure_one()
-        Appointment = self.env['medical.appointment']
-        appt_patient_ids = Appointment.search([('doctor_id', '=', self.id)]).mapped('patient_id.id')
-        domain = ['|', ('doctor_id', '=', self.id), ('id', 'in', appt_patient_ids or [])]
+        # Sub-query on the doctor/patient link table instead of an id list
+        domain = ['|', ('doctor_id', '=', self.id), ('doctor_link_ids.doctor_id', '=', self.id)]
         return {
             'type': 'ir.actions.act_window',
             'name': f'Patients de {self.name}',
@@ -102,4 +176,45 @@ class MedicalDoctor(models.Model):
             'view_mode': 'tree,form',
             'domain': domain,
             'context': {'default_doctor_id': self.id},
-        }
\ No newline at end of file
+        }
+
+    def action_default_schedule(self):
+        """Semaine type : du lundi au vendredi, DEFAULT_WORKING_HOURS."""
+        self.env['medical.doctor.schedule'].create([
+            {'doctor_id': doctor.id, 'dayofweek': str(day), 'hour_from': hour_from, 'hour_to': hour_to}
+            for doctor in self.filtered(lambda doctor: not doctor.schedule_ids)
+            for day in range(5)
+            for hour_from, hour_to in DEFAULT_WORKING_HOURS
+        ])
+        return True
+
+    def action_open_occupancy(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Occupation de {self.name}',
+            'res_model': 'medical.doctor.capacity',
+            'view_mode': 'graph,pivot,tree',
+            'domain': [('doctor_id', '=', self.id)],
+        }
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'tz' in vals:
+            # Appointments fall on other local days
+            self.env['medical.doctor.capacity']._rebuild(self.ids)
+        return res
+
+    @api.model
+    def _stat_tracked_fields(self):
+        return super()._stat_tracked_fields() | {'active'}
+
+    def unlink(self):
+        # Patients of a deleted doctor lose their doctor (ON DELETE SET NULL in
+        # PostgreSQL): move their dashboard counters to the "no doctor" bucket.
+        Stat = self.env['medical.dashboard.stat']
+        patients = self.env['medical.patient'].search([('doctor_id', 'in', self.ids)])
+        Stat._apply_delta(patients, -1)
+        res = super().unlink()
+        Stat._apply_delta(patients, 1)
+        return res
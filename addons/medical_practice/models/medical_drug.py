@@ -1,14 +1,182 @@
-from odoo import models, fields
+from odoo import models, fields, api, tools
+from .medical_perf import profiled
+from bisect import bisect_left
+from collections import namedtuple
+import re
+import unicodedata
+
+# Fields copied into the in-process catalog
+CATALOG_FIELDS = ('name', 'code', 'default_dosage', 'default_frequency', 'default_duration', 'active')
+
+DrugEntry = namedtuple('DrugEntry', 'id name code default_dosage default_frequency default_duration')
+# ``keys`` is sorted; ``targets[i]`` is the ``(drug id, is_word)`` pair of ``keys[i]``
+DrugCatalog = namedtuple('DrugCatalog', 'by_id by_code by_name keys targets')
+
+
+def normalize(text):
+    """Lower-case ``text`` and strip its accents, like ``medical_unaccent``."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower().strip()
 
 
 class MedicalDrug(models.Model):
     _name = 'medical.drug'
     _description = 'Medical Drug / Medication'
 
-    name = fields.Char(string='Name', required=True)
-    code = fields.Char(string='Drug Code')
+    name = fields.Char(string='Name', required=True, index='trigram')
+    code = fields.Char(string='Drug Code', index=True)
     description = fields.Text(string='Description')
     default_dosage = fields.Char(string='Default Dosage')
     default_frequency = fields.Char(string='Default Frequency')
     default_duration = fields.Char(string='Default Duration')
     active = fields.Boolean(string='Active', default=True)
+
+    # ------------------------------------------------------------------
+    # Catalog cache
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _get_catalog(self):
+        """Return the active drugs as an immutable :class:`DrugCatalog`.
+
+        The catalog lives in the registry's ormcache, keyed on the drugs'
+        version (see ``medical.cache.version``): it is built once per worker
+        and rebuilt after a drug is created, modified or deleted, without
+        clearing the rest of the cache. A transaction that changed drugs
+        builds its own, uncached.
+        """
+        versions, cacheable = self.env['medical.cache.version'].get([self._name])
+        if not cacheable:
+            return self._build_catalog()
+        return self._cached_catalog(versions)
+
+    @api.model
+    @tools.ormcache('versions')
+    def _cached_catalog(self, versions):
+        return self._build_catalog()
+
+    @api.model
+    def _build_catalog(self):
+        self.flush_model(CATALOG_FIELDS)
+        self.env.cr.execute("""
+            SELECT id, name, code, default_dosage, default_frequency, default_duration
+            FROM medical_drug WHERE active ORDER BY name, id
+        """)
+        by_id, by_code, by_name, index = {}, {}, {}, []
+        for row in self.env.cr.fetchall():
+            entry = DrugEntry(*row)
+            by_id[entry.id] = entry
+            if entry.code:
+                by_code.setdefault(normalize(entry.code), entry.id)
+                index.append((normalize(entry.code), entry.id, True))
+            # The full name, then every word after the first, so that
+            # "clav" finds "Amoxicilline acide clavulanique"
+            name = normalize(entry.name)
+            by_name.setdefault(name, entry.id)
+            index.append((name, entry.id, False))
+            words = name.split()
+            for position in range(1, len(words)):
+                index.append((' '.join(words[position:]), entry.id, True))
+        index.sort()
+        return DrugCatalog(
+            by_id=by_id,
+            by_code=by_code,
+            by_name=by_name,
+            keys=tuple(key for key, _id, _word in index),
+            targets=tuple((drug_id, word) for _key, drug_id, word in index),
+        )
+
+    @api.model
+    def _catalog_entry(self, drug_id):
+        """Return the cached :class:`DrugEntry` of an active drug, or ``None``."""
+        return self._get_catalog().by_id.get(drug_id)
+
+    @api.model
+    def _catalog_resolve(self, name):
+        """Return the id of the active drug named or coded exactly ``name``, or ``None``."""
+        catalog = self._get_catalog()
+        key = normalize(name)
+        return catalog.by_name.get(key) or catalog.by_code.get(key)
+
+    @api.model
+    def _catalog_resolve_list(self, text):
+        """Return the ids of the active drugs listed in free ``text``.
+
+        Entries are separated by new lines, commas or semicolons and may end
+        with a dosage: "Warfarine 5 mg" resolves to "Warfarine".
+        """
+        drug_ids = []
+        for entry in re.split(r'[\n,;]+', text or ''):
+            words = entry.split()
+            for end in range(len(words), 0, -1):
+                drug_id = self._catalog_resolve(' '.join(words[:end]))
+                if drug_id:
+                    drug_ids.append(drug_id)
+                    break
+        return drug_ids
+
+    @api.model
+    def _catalog_match(self, term, limit=None):
+        """Return the ids of the active drugs matching ``term``.
+
+        Exact code first, then drugs whose name starts with ``term``, then
+        drugs with a later word or their code starting with ``term``.
+        """
+        catalog = self._get_catalog()
+        term = normalize(term)
+        if not term:
+            return []
+        exact = catalog.by_code.get(term)
+        name_matches, word_matches = [], []
+        start = bisect_left(catalog.keys, term)
+        for position in range(start, len(catalog.keys)):
+            if not catalog.keys[position].startswith(term):
+                break
+            drug_id, word = catalog.targets[position]
+            (word_matches if word else name_matches).append(drug_id)
+        result, seen = [], set()
+        for drug_id in ([exact] if exact else []) + name_matches + word_matches:
+            if drug_id not in seen:
+                seen.add(drug_id)
+                result.append(drug_id)
+                if limit and len(result) >= limit:
+                    break
+        return result
+
+    @api.model
+    @profiled
+    def name_search(self, name='', args=None, operator='ilike', limit=100):
+        # Autocomplete is served from the catalog; archived drugs, other
+        # operators and empty terms use the regular search.
+        if not name or operator != 'ilike' or not self.env.context.get('active_test', True):
+            return super().name_search(name, args, operator, limit)
+        self.check_access_rights('read')
+        ids = self._catalog_match(name, limit=None if args else limit)
+        if args and ids:
+            allowed = set(self._search(list(args) + [('id', 'in', ids)]))
+            ids = [drug_id for drug_id in ids if drug_id in allowed][:limit]
+        catalog = self._get_catalog()
+        result = [(drug_id, catalog.by_id[drug_id].name) for drug_id in ids]
+        if not limit or len(result) < limit:
+            # The catalog matches starts of words; the other substrings
+            # ("cillin" in "Amoxicillin") come from the regular search
+            result += super().name_search(
+                name, list(args or []) + [('id', 'not in', ids)], operator, limit and limit - len(result))
+        return result
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        drugs = super().create(vals_list)
+        self.env['medical.cache.version'].bump(self._name)
+        return drugs
+
+    def write(self, vals):
+        res = super().write(vals)
+        if set(CATALOG_FIELDS) & set(vals):
+            self.env['medical.cache.version'].bump(self._name)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['medical.cache.version'].bump(self._name)
+        return res
@@ -0,0 +1,159 @@
+from odoo import models, fields, api, _
+import io
+import logging
+
+_logger = logging.getLogger(__name__)
+
+SEVERITIES = [
+    ('minor', 'Minor'),
+    ('moderate', 'Moderate'),
+    ('major', 'Major'),
+    ('contraindicated', 'Contraindicated'),
+]
+# Severities that prevent a prescription from being prescribed
+BLOCKING_SEVERITIES = ('contraindicated',)
+
+
+class MedicalDrugInteraction(models.Model):
+    """Known interaction between two drugs.
+
+    Each pair is stored once, ordered (``drug_a_id < drug_b_id``), so the
+    unique index on the pair is the lookup structure: checking any set of
+    drugs against another is a single indexed query (see ``_find``).
+    """
+    _name = 'medical.drug.interaction'
+    _description = 'Drug Interaction'
+    _order = 'drug_a_id, drug_b_id'
+
+    drug_a_id = fields.Many2one('medical.drug', string='Drug', required=True, ondelete='cascade')
+    drug_b_id = fields.Many2one('medical.drug', string='Interacts With', required=True, ondelete='cascade', index=True)
+    severity = fields.Selection(SEVERITIES, string='Severity', required=True, default='moderate')
+    description = fields.Text(string='Description')
+
+    _sql_constraints = [
+        ('pair_uniq', 'unique (drug_a_id, drug_b_id)', 'This interaction is already recorded.'),
+        ('pair_ordered', 'CHECK (drug_a_id < drug_b_id)', 'An interaction must link two different drugs.'),
+    ]
+
+    @api.depends('drug_a_id', 'drug_b_id')
+    def _compute_display_name(self):
+        for interaction in self:
+            interaction.display_name = f"{interaction.drug_a_id.name} + {interaction.drug_b_id.name}"
+
+    @api.model
+    def _order_pair(self, vals):
+        """Swap the drugs of ``vals`` so that ``drug_a_id < drug_b_id``."""
+        first, second = vals.get('drug_a_id'), vals.get('drug_b_id')
+        if first and second and first > second:
+            vals = dict(vals, drug_a_id=second, drug_b_id=first)
+        return vals
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        return super().create([self._order_pair(vals) for vals in vals_list])
+
+    def write(self, vals):
+        if not {'drug_a_id', 'drug_b_id'} & set(vals):
+            return super().write(vals)
+        for interaction in self:
+            pair = {'drug_a_id': interaction.drug_a_id.id, 'drug_b_id': interaction.drug_b_id.id}
+            pair.update({key: vals[key] for key in pair if key in vals})
+            super(MedicalDrugInteraction, interaction).write(dict(vals, **self._order_pair(pair)))
+        return True
+
+    @api.model
+    def _find(self, drug_ids, other_drug_ids=()):
+        """Return ``{(drug_a, drug_b): (severity, description)}``.
+
+        Covers the interactions among ``drug_ids`` and between ``drug_ids``
+        and ``other_drug_ids``, in one query on the ordered pair index.
+        """
+        drug_ids = list(set(drug_ids))
+        if not drug_ids:
+            return {}
+        every_id = list(set(drug_ids) | set(other_drug_ids))
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT drug_a_id, drug_b_id, severity, description
+            FROM medical_drug_interaction
+            WHERE drug_a_id = ANY(%s) AND drug_b_id = ANY(%s)
+              AND (drug_a_id = ANY(%s) OR drug_b_id = ANY(%s))
+        """, (every_id, every_id, drug_ids, drug_ids))
+        return {(first, second): (severity, description) for first, second, severity, description in self.env.cr.fetchall()}
+
+    @api.model
+    def import_csv(self, csv_file):
+        """Bulk import an interaction table.
+
+        ``csv_file`` is a text file object with a header line and the columns
+        ``code_a, code_b, severity, description``. Drugs are matched on their
+        code (case-insensitive); the rows are loaded with COPY and merged with
+        one INSERT ... ON CONFLICT, existing pairs being updated.
+
+        :return: ``{'rows': read, 'imported': inserted or updated}``
+        """
+        cr = self.env.cr
+        self.flush_model()
+        # Dropped explicitly below, and with the transaction if anything fails
+        cr.execute("""
+            CREATE TEMP TABLE medical_drug_interaction_import (
+                code_a varchar, code_b varchar, severity varchar, description text
+            ) ON COMMIT DROP
+        """)
+        cr.copy_expert("COPY medical_drug_interaction_import FROM STDIN WITH (FORMAT csv, HEADER true)", csv_file)
+        cr.execute("SELECT COUNT(*) FROM medical_drug_interaction_import")
+        rows = cr.fetchone()[0]
+        severities = [key for key, _label in SEVERITIES]
+        # When a pair appears several times, keep its most severe row
+        cr.execute("""
+            INSERT INTO medical_drug_interaction
+                (drug_a_id, drug_b_id, severity, description, create_uid, create_date, write_uid, write_date)
+            SELECT DISTINCT ON (LEAST(a.id, b.id), GREATEST(a.id, b.id))
+                   LEAST(a.id, b.id), GREATEST(a.id, b.id), lower(trim(i.severity)), i.description,
+                   %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+            FROM medical_drug_interaction_import i
+            JOIN medical_drug a ON lower(a.code) = lower(trim(i.code_a))
+            JOIN medical_drug b ON lower(b.code) = lower(trim(i.code_b))
+            WHERE a.id != b.id AND lower(trim(i.severity)) = ANY(%(severities)s)
+            ORDER BY LEAST(a.id, b.id), GREATEST(a.id, b.id),
+                     array_position(%(severities)s, lower(trim(i.severity))) DESC
+            ON CONFLICT ON CONSTRAINT medical_drug_interaction_pair_uniq
+            DO UPDATE SET severity = EXCLUDED.severity, description = EXCLUDED.description,
+                          write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+        """, {'uid': self.env.uid, 'severities': severities})
+        imported = cr.rowcount
+        cr.execute("DROP TABLE medical_drug_interaction_import")
+        self.invalidate_model()
+        _logger.info("medical.drug.interaction: %s rows read, %s interactions imported", rows, imported)
+        return {'rows': rows, 'imported': imported}
+
+
+    @api.model
+    def _import_attachment(self, attachment_id):
+        """Background job: import the CSV stored in ``attachment_id``, then delete it."""
+        attachment = self.env['ir.attachment'].browse(attachment_id)
+        self.env['medical.job']._report_progress(0, message=_("Loading %s", attachment.name))
+        content = attachment.raw.decode('utf-8-sig')
+        result = self.import_csv(io.StringIO(content))
+        attachment.unlink()
+        return result
+
+
+class MedicalDrugInteractionImport(models.TransientModel):
+    _name = 'medical.drug.interaction.import'
+    _description = 'Import Drug Interactions'
+
+    file = fields.Binary(string='CSV File', required=True)
+    filename = fields.Char(string='File Name')
+
+    def action_import(self):
+        self.ensure_one()
+        # The file goes through an attachment, the job only carries its id
+        attachment = self.env['ir.attachment'].create({
+            'name': self.filename or 'drug_interactions.csv',
+            'datas': self.file,
+        })
+        Job = self.env['medical.job']
+        job = Job.enqueue(self.env['medical.drug.interaction'], '_import_attachment', attachment.id,
+                          name=_("Import of drug interactions (%s)", attachment.name))
+        return Job._queued_notification(job)
@@ -0,0 +1,371 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError, ValidationError
+from datetime import timedelta
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+WATERMARK_PARAM = 'medical_practice.export_watermark.%s'
+MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+_PATIENT_DOCTOR_COLUMNS = """
+    pat.id AS patient_id, pat.patient_id AS patient_ref, pat.name AS patient_name,
+    doc.id AS doctor_id, doc.name AS doctor_name
+"""
+
+# Exportable datasets: flat SELECT (names joined in), the table alias holding
+# the watermark column and the date column used for date ranges.
+DATASETS = {
+    'appointments': {
+        'model': 'medical.appointment',
+        'query': f"""
+            SELECT a.id, a.name, a.appointment_date, a.end_time, a.duration, a.state, a.appointment_type,
+                   {_PATIENT_DOCTOR_COLUMNS}, a.write_date
+            FROM medical_appointment a
+            JOIN medical_patient pat ON pat.id = a.patient_id
+            JOIN medical_doctor doc ON doc.id = a.doctor_id
+        """,
+        'alias': 'a',
+        'date_column': 'a.appointment_date',
+    },
+    'records': {
+        'model': 'medical.record',
+        'query': f"""
+            SELECT r.id, r.name, r.record_date, {_PATIENT_DOCTOR_COLUMNS},
+                   r.appointment_id, r.temperature, r.blood_pressure_systolic, r.blood_pressure_diastolic,
+                   r.heart_rate, r.weight, r.height, r.bmi, r.chief_complaint, r.diagnosis, r.write_date
+            FROM medical_record r
+            JOIN medical_patient pat ON pat.id = r.patient_id
+            JOIN medical_doctor doc ON doc.id = r.doctor_id
+        """,
+        'alias': 'r',
+        'date_column': 'r.record_date',
+    },
+    'prescriptions': {
+        'model': 'medical.prescription',
+        'query': f"""
+            SELECT rx.id, rx.name, rx.prescription_date, rx.state, {_PATIENT_DOCTOR_COLUMNS},
+                   rx.appointment_id, rx.write_date
+            FROM medical_prescription rx
+            JOIN medical_patient pat ON pat.id = rx.patient_id
+            JOIN medical_doctor doc ON doc.id = rx.doctor_id
+        """,
+        'alias': 'rx',
+        'date_column': 'rx.prescription_date',
+    },
+    'prescription_lines': {
+        'model': 'medical.prescription.line',
+        'query': f"""
+            SELECT l.id, rx.id AS prescription_id, rx.name AS prescription, rx.prescription_date,
+                   rx.state AS prescription_state, {_PATIENT_DOCTOR_COLUMNS},
+                   drug.id AS medication_id, drug.code AS medication_code, drug.name AS medication,
+                   l.medication_name, l.dosage, l.frequency, l.duration, l.quantity, l.write_date
+            FROM medical_prescription_line l
+            JOIN medical_prescription rx ON rx.id = l.prescription_id
+            JOIN medical_patient pat ON pat.id = rx.patient_id
+            JOIN medical_doctor doc ON doc.id = rx.doctor_id
+            LEFT JOIN medical_drug drug ON drug.id = l.medication_id
+        """,
+        'alias': 'l',
+        'date_column': 'rx.prescription_date',
+    },
+}
+
+
+class MedicalExport(models.AbstractModel):
+    """Constant-memory exports of the clinical tables.
+
+    Rows are read through a PostgreSQL server-side cursor, in fixed-size
+    chunks, on a dedicated database cursor so the export can be streamed to
+    the client after the HTTP request's own cursor is gone.
+    """
+    _name = 'medical.export'
+    _description = 'Medical Data Export'
+
+    @api.model
+    def _check_dataset(self, dataset):
+        if dataset not in DATASETS:
+            raise UserError(_("Unknown export dataset: %s", dataset))
+        self.env[DATASETS[dataset]['model']].check_access_rights('read')
+        return DATASETS[dataset]
+
+    @api.model
+    def _get_watermark_state(self, dataset):
+        """Return ``(since, seen)`` of the incremental export of ``dataset``.
+
+        ``since`` is the write date from which rows are read again and
+        ``seen`` the ``(id, write_date)`` pairs already exported since then.
+        """
+        value = self.env['ir.config_parameter'].sudo().get_param(WATERMARK_PARAM % dataset)
+        if not value:
+            return False, set()
+        if not value.startswith('{'):
+            # Plain write date of the first versions
+            return value, set()
+        state = json.loads(value)
+        return state['since'], {tuple(pair) for pair in state['seen']}
+
+    @api.model
+    def get_watermark(self, dataset):
+        return self._get_watermark_state(dataset)[0]
+
+    @api.model
+    def _build_query(self, dataset, date_from=None, date_to=None, since=None):
+        spec = DATASETS[dataset]
+        conditions, params = [], []
+        if date_from:
+            conditions.append(f"{spec['date_column']} >= %s")
+            params.append(date_from)
+        if date_to:
+            # Inclusive end date, also for datetime columns
+            conditions.append(f"{spec['date_column']} < %s")
+            params.append(fields.Date.to_date(date_to) + timedelta(days=1))
+        if since:
+            conditions.append(f"{spec['alias']}.write_date >= %s")
+            params.append(since)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Watermark order for incremental exports, id order otherwise
+        order = f"{spec['alias']}.write_date, {spec['alias']}.id" if since is not None else f"{spec['alias']}.id"
+        return f"{spec['query']} {where} ORDER BY {order}", params
+
+    @api.model
+    def iter_chunks(self, dataset, date_from=None, date_to=None, incremental=False, chunk_size=10000):
+        """Return ``(columns, chunks)`` where ``chunks`` lazily yields row lists.
+
+        With ``incremental``, only rows written since the dataset watermark
+        are exported and the watermark is moved forward once every chunk has
+        been consumed.
+
+        ``write_date`` is the start time of the writing transaction, not its
+        commit time: a transaction still open during the export commits
+        rows dated before the last exported one. The watermark therefore
+        stops at the start of the oldest open transaction, and the rows
+        exported past it are remembered so the next export skips them
+        unless they changed again.
+
+        The watermark covers the whole dataset, so an incremental export
+        takes no date range: the rows outside the range would be skipped by
+        every later export.
+        """
+        self._check_dataset(dataset)
+        if incremental and (date_from or date_to):
+            raise UserError(_("An incremental export covers the whole dataset, it cannot have a date range."))
+        since, seen = self._get_watermark_state(dataset) if incremental else (None, set())
+        if incremental:
+            since = since or '1970-01-01'
+        query, params = self._build_query(dataset, date_from, date_to, since)
+        registry = self.pool
+        uid, context = self.env.uid, dict(self.env.context)
+
+        # Column names without reading any row
+        self.env.cr.execute(f"SELECT * FROM ({query}) AS q LIMIT 0", params)
+        columns = [column[0] for column in self.env.cr.description]
+        id_index, write_date_index = columns.index('id'), columns.index('write_date')
+
+        def chunks():
+            exported = set()
+            with registry.cursor() as cr:
+                if incremental:
+                    # Taken before the snapshot: rows this export cannot see
+                    # are all dated from this point on.
+                    cr.execute("""
+                        SELECT min(xact_start) AT TIME ZONE 'UTC' FROM pg_stat_activity
+                        WHERE datname = current_database() AND xact_start IS NOT NULL
+                    """)
+                    horizon = cr.fetchone()[0]
+                with cr._cnx.cursor(name=f'medical_export_{dataset}') as server_cursor:
+                    server_cursor.itersize = chunk_size
+                    server_cursor.execute(query, params)
+                    while True:
+                        rows = server_cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        if incremental:
+                            rows = [row for row in rows if (row[id_index], str(row[write_date_index])) not in seen]
+                            exported.update(
+                                (row[id_index], str(row[write_date_index]))
+                                for row in rows if row[write_date_index] >= horizon)
+                            if not rows:
+                                continue
+                        yield rows
+                if incremental:
+                    env = api.Environment(cr, uid, context)
+                    # Rows re-read next time and already exported are skipped
+                    seen_again = {pair for pair in seen if pair[1] >= str(horizon)}
+                    env['ir.config_parameter'].sudo().set_param(WATERMARK_PARAM % dataset, json.dumps({
+                        'since': str(horizon),
+                        'seen': sorted(exported | seen_again),
+                    }))
+                    _logger.info("medical.export: %s watermark moved to %s", dataset, horizon)
+
+        return columns, chunks()
+
+    @api.model
+    def stream_csv(self, dataset, **kwargs):
+        """Yield the export as UTF-8 CSV bytes, one chunk at a time."""
+        columns, chunks = self.iter_chunks(dataset, **kwargs)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    @api.model
+    def stream_parquet(self, dataset, **kwargs):
+        """Yield the export as a Parquet file, one row group per chunk.
+
+        Parquet needs its footer at the end of the file, so row groups are
+        written to a temporary file which is then streamed back.
+        """
+        if pyarrow is None:
+            raise UserError(_("Parquet exports require the pyarrow Python package."))
+        columns, chunks = self.iter_chunks(dataset, **kwargs)
+        handle, path = tempfile.mkstemp(suffix='.parquet')
+        os.close(handle)
+        try:
+            writer = None
+            for rows in chunks:
+                table = pyarrow.Table.from_pydict({
+                    column: [row[index] for row in rows] for index, column in enumerate(columns)
+                })
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            if writer is not None:
+                writer.close()
+            with open(path, 'rb') as parquet_file:
+                while True:
+                    data = parquet_file.read(1024 * 1024)
+                    if not data:
+                        break
+                    yield data
+        finally:
+            os.unlink(path)
+
+
+    @api.model
+    def _export_attachment(self, dataset, file_format='csv', **kwargs):
+        """Background job: write the export to an attachment, return its download URL.
+
+        The file is spooled to disk chunk by chunk, hashed on the way, then
+        copied into the filestore without being loaded in memory.
+        """
+        stream = self.stream_parquet if file_format == 'parquet' else self.stream_csv
+        Job = self.env['medical.job']
+        size = 0
+        checksum = hashlib.sha1()
+        with tempfile.TemporaryFile() as spool:
+            for data in stream(dataset, **kwargs):
+                spool.write(data)
+                checksum.update(data)
+                size += len(data)
+                Job._report_progress(0, message=_("%s MB written", round(size / 1024 / 1024, 1)))
+            spool.seek(0)
+            attachment = self._spool_to_attachment(
+                spool, f"{dataset}_{fields.Date.today()}.{file_format}", MIMETYPES[file_format],
+                checksum.hexdigest(), size)
+        return {'attachment_id': attachment.id, 'url': f"/web/content/{attachment.id}?download=true"}
+
+    @api.model
+    def _spool_to_attachment(self, spool, name, mimetype, checksum, size):
+        """Create an attachment from the open file ``spool`` of ``size`` bytes and SHA-1 ``checksum``."""
+        Attachment = self.env['ir.attachment']
+        if Attachment._storage() != 'file':
+            # Stored in the database: the content has to go through memory
+            return Attachment.create({'name': name, 'mimetype': mimetype, 'raw': spool.read()})
+        # Same layout as ir.attachment._file_write, copied by blocks
+        fname = f"{checksum[:2]}/{checksum}"
+        full_path = Attachment._full_path(fname)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as target:
+                shutil.copyfileobj(spool, target, 1024 * 1024)
+            # Collected again if the transaction rolls back
+            Attachment._mark_for_gc(fname)
+        attachment = Attachment.create({'name': name, 'mimetype': mimetype})
+        # create() and write() ignore the file columns, derived from the content
+        self.env.cr.execute(
+            "UPDATE ir_attachment SET store_fname = %s, file_size = %s, checksum = %s WHERE id = %s",
+            (fname, size, checksum, attachment.id))
+        attachment.invalidate_recordset(['store_fname', 'file_size', 'checksum', 'raw', 'datas'])
+        return attachment
+
+
+class MedicalExportWizard(models.TransientModel):
+    _name = 'medical.export.wizard'
+    _description = 'Medical Data Export Wizard'
+
+    dataset = fields.Selection([
+        ('appointments', 'Appointments'),
+        ('records', 'Medical Records'),
+        ('prescriptions', 'Prescriptions'),
+        ('prescription_lines', 'Prescription Lines'),
+    ], string='Data', required=True, default='appointments')
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+    ], string='Format', required=True, default='csv')
+    date_from = fields.Date(string='From')
+    date_to = fields.Date(string='To')
+    incremental = fields.Boolean(
+        string='Only changes since last export',
+        help="Export the rows created or modified since the previous incremental export of this data.")
+    watermark = fields.Char(string='Last incremental export', compute='_compute_watermark')
+    background = fields.Boolean(
+        string='Run in background',
+        help="Build the file in a background job and download it from Background Jobs when it is ready.")
+
+    @api.constrains('incremental', 'date_from', 'date_to')
+    def _check_incremental_range(self):
+        if any(wizard.incremental and (wizard.date_from or wizard.date_to) for wizard in self):
+            raise ValidationError(_("An incremental export covers the whole dataset, it cannot have a date range."))
+
+    @api.depends('dataset')
+    def _compute_watermark(self):
+        Export = self.env['medical.export']
+        for wizard in self:
+            wizard.watermark = Export.get_watermark(wizard.dataset) if wizard.dataset else False
+
+    def action_export(self):
+        self.ensure_one()
+        if self.background:
+            Job = self.env['medical.job']
+            job = Job.enqueue(
+                self.env['medical.export'], '_export_attachment', self.dataset,
+                file_format=self.file_format, date_from=self.date_from or None,
+                date_to=self.date_to or None, incremental=self.incremental,
+                name=_("Export of %s", dict(self._fields['dataset']._description_selection(self.env))[self.dataset]))
+            return Job._queued_notification(job)
+        params = [f"format={self.file_format}"]
+        if self.date_from:
+            params.append(f"date_from={self.date_from}")
+        if self.date_to:
+            params.append(f"date_to={self.date_to}")
+        if self.incremental:
+            params.append("incremental=1")
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f"/medical_practice/export/{self.dataset}?{'&'.join(params)}",
+            'target': 'self',
+        }
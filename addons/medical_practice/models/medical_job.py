@@ -0,0 +1,345 @@
+from odoo import models, fields, api, SUPERUSER_ID, _
+from odoo.exceptions import AccessError
+from odoo.tools import date_utils
+from datetime import timedelta
+from psycopg2 import errorcodes
+import json
+import logging
+import threading
+import time
+import traceback
+
+_logger = logging.getLogger(__name__)
+
+# Seconds a cron run may spend on jobs, the next run picks up the rest
+RUN_TIME_BUDGET = 240
+# A job still running this many seconds after its last sign of life (start
+# or progress report) lost its worker
+STALE_AFTER = 3600
+# Jobs doing open-ended work stop after this many seconds and queue the
+# rest as a new job, well before they could be taken for stale
+JOB_TIME_BUDGET = STALE_AFTER // 4
+# Progress is written (and pushed on the bus) at most this often per job
+PROGRESS_INTERVAL = 1.0
+# Retried a minute later: the job lost a race, it did not fail. The retry
+# still counts against ``max_attempts``.
+RETRYABLE_PGCODES = (errorcodes.SERIALIZATION_FAILURE, errorcodes.DEADLOCK_DETECTED, errorcodes.LOCK_NOT_AVAILABLE)
+# Context keys carried from the enqueuing request into the job
+CONTEXT_KEYS = ('lang', 'tz', 'allowed_company_ids')
+# The only (model, method) pairs a job may call, see ``_is_queueable``
+QUEUEABLE_METHODS = frozenset([
+    ('medical.archive', '_job_archive'),
+    ('medical.dashboard.stat', '_rebuild'),
+    ('medical.drug.interaction', '_import_attachment'),
+    ('medical.export', '_export_attachment'),
+    ('medical.reminder', '_job_process'),
+])
+# Fields describing the call; they are set by ``enqueue`` and never change
+CALL_FIELDS = ('model_name', 'method_name', 'res_ids', 'args', 'kwargs', 'context', 'user_id')
+
+_last_progress = {}
+_progress_lock = threading.Lock()
+
+JOB_STATES = [
+    ('pending', 'Pending'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+    ('cancelled', 'Cancelled'),
+]
+
+
+class MedicalJob(models.Model):
+    """Background job run by the ``Medical: Run Background Jobs`` cron.
+
+    A job is a method call, ``env[model].browse(res_ids).method(*args,
+    **kwargs)``, stored as a row and run later as the user who enqueued it.
+    Only the methods of ``QUEUEABLE_METHODS`` can be queued, and the call
+    cannot be modified once the job exists.
+    Workers claim pending rows with ``FOR UPDATE SKIP LOCKED``, so several
+    cron workers (or ``medical_jobs`` runs) never pick the same job, and each
+    job runs in its own transaction. Jobs report their progress with
+    ``_report_progress``; it is stored on the job and pushed to the user
+    through the bus, with a notification when the job ends.
+    """
+    _name = 'medical.job'
+    _description = 'Medical Background Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Job', required=True, readonly=True)
+    model_name = fields.Char(string='Model', required=True, readonly=True)
+    method_name = fields.Char(string='Method', required=True, readonly=True)
+    res_ids = fields.Text(string='Record IDs', readonly=True, default='[]')
+    args = fields.Text(string='Arguments', readonly=True, default='[]')
+    kwargs = fields.Text(string='Keyword Arguments', readonly=True, default='{}')
+    context = fields.Text(string='Context', readonly=True, default='{}')
+    user_id = fields.Many2one('res.users', string='Requested by', required=True, readonly=True,
+                              default=lambda self: self.env.user, index=True)
+    state = fields.Selection(JOB_STATES, string='Status', required=True, readonly=True, default='pending')
+    priority = fields.Integer(string='Priority', readonly=True, default=10,
+                              help="Jobs with a lower priority run first.")
+    eta = fields.Datetime(string='Run After', readonly=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    max_attempts = fields.Integer(string='Max Attempts', readonly=True, default=3)
+    progress = fields.Float(string='Progress', readonly=True)
+    progress_message = fields.Char(string='Progress Message', readonly=True)
+    date_started = fields.Datetime(string='Started', readonly=True)
+    date_heartbeat = fields.Datetime(string='Last Progress', readonly=True)
+    date_done = fields.Datetime(string='Ended', readonly=True)
+    result = fields.Text(string='Result', readonly=True)
+    result_url = fields.Char(string='Result File', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    def init(self):
+        # Claiming a job only ever scans the pending rows
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS medical_job_pending_idx
+            ON medical_job (priority, id) WHERE state = 'pending'
+        """)
+
+    def write(self, vals):
+        if set(CALL_FIELDS) & set(vals):
+            raise AccessError(_("The call of a background job cannot be modified."))
+        return super().write(vals)
+
+    # ------------------------------------------------------------------
+    # Enqueuing
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _is_queueable(self, model_name, method):
+        """Return whether ``model_name.method`` may be run as a job; extend to add methods."""
+        return (model_name, method) in QUEUEABLE_METHODS
+
+    @api.model
+    def enqueue(self, records, method, *args, name=None, priority=10, eta=None, max_attempts=3, **kwargs):
+        """Run ``records.method(*args, **kwargs)`` in the background.
+
+        ``records`` is a recordset (empty for model methods); the arguments
+        must be JSON serializable, dates are passed as strings.
+        """
+        if not self._is_queueable(records._name, method) or not callable(getattr(records, method, None)):
+            raise AccessError(_("%(model)s.%(method)s cannot be run as a background job.",
+                                model=records._name, method=method))
+        context = {key: self.env.context[key] for key in CONTEXT_KEYS if key in self.env.context}
+        job = self.sudo().create({
+            'name': name or f"{records._name}.{method}",
+            'model_name': records._name,
+            'method_name': method,
+            'res_ids': json.dumps(records.ids),
+            'args': json.dumps(args, default=date_utils.json_default),
+            'kwargs': json.dumps(kwargs, default=date_utils.json_default),
+            'context': json.dumps(context),
+            'user_id': self.env.uid,
+            'priority': priority,
+            'eta': eta,
+            'max_attempts': max_attempts,
+        })
+        self.env.ref('medical_practice.ir_cron_run_medical_jobs').sudo()._trigger(eta)
+        return job
+
+    @api.model
+    def _queued_notification(self, job):
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Running in the background"),
+                'message': _("%s has been queued, you will be notified when it ends.", job.name),
+                'type': 'info',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def _commit(self):
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    @api.model
+    def _requeue_stale(self):
+        """Give the jobs whose worker died (still running, too old) back to the queue."""
+        self.env.cr.execute("""
+            UPDATE medical_job
+            SET state = CASE WHEN attempts < max_attempts THEN 'pending' ELSE 'failed' END,
+                error = 'The worker running this job stopped before it ended.'
+            WHERE state = 'running'
+              AND COALESCE(date_heartbeat, date_started) < (now() AT TIME ZONE 'UTC') - %s * interval '1 second'
+            RETURNING id
+        """, (STALE_AFTER,))
+        if self.env.cr.rowcount:
+            _logger.warning("medical.job: requeued stale jobs %s", [row[0] for row in self.env.cr.fetchall()])
+            self.invalidate_model()
+
+    @api.model
+    def _claim(self):
+        """Mark the next runnable job as running and return it (empty if none)."""
+        self.env.cr.execute("""
+            UPDATE medical_job
+            SET state = 'running', attempts = attempts + 1, progress = 0, progress_message = NULL,
+                date_started = (now() AT TIME ZONE 'UTC'), date_heartbeat = NULL, date_done = NULL, error = NULL
+            WHERE id = (
+                SELECT id FROM medical_job
+                WHERE state = 'pending' AND (eta IS NULL OR eta <= (now() AT TIME ZONE 'UTC'))
+                ORDER BY priority, id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+        """)
+        row = self.env.cr.fetchone()
+        self.invalidate_model()
+        return self.browse(row[0] if row else [])
+
+    @api.model
+    def run_pending(self, time_budget=RUN_TIME_BUDGET):
+        """Run pending jobs until the queue is empty or the time budget is spent.
+
+        :return: the number of jobs run
+        """
+        self._requeue_stale()
+        self._commit()
+        deadline = time.monotonic() + time_budget if time_budget else None
+        count = 0
+        while not deadline or time.monotonic() < deadline:
+            job = self._claim()
+            # The claim is committed so other workers skip the job right away
+            self._commit()
+            if not job:
+                break
+            job.sudo()._run()
+            count += 1
+        return count
+
+    @api.model
+    def _cron_run_jobs(self):
+        self.run_pending()
+
+    def _run(self):
+        self.ensure_one()
+        _logger.info("medical.job %s: running %s (attempt %s)", self.id, self.name, self.attempts)
+        context = dict(json.loads(self.context or '{}'), medical_job_id=self.id)
+        env = self.env(user=self.user_id.id, context=context, su=False)
+        try:
+            if not self._is_queueable(self.model_name, self.method_name):
+                raise AccessError(_("%(model)s.%(method)s cannot be run as a background job.",
+                                    model=self.model_name, method=self.method_name))
+            records = env[self.model_name].browse(json.loads(self.res_ids or '[]'))
+            result = getattr(records, self.method_name)(*json.loads(self.args or '[]'), **json.loads(self.kwargs or '{}'))
+            env.flush_all()
+        except Exception as error:
+            self.env.cr.rollback()
+            self.env.transaction.reset()
+            self._handle_failure(error)
+        else:
+            values = {'state': 'done', 'progress': 100, 'date_done': fields.Datetime.now()}
+            if isinstance(result, dict) and result.get('url'):
+                values['result_url'] = result['url']
+            if result is not None:
+                values['result'] = json.dumps(result, default=date_utils.json_default, indent=2)
+            self.write(values)
+            _logger.info("medical.job %s: done", self.id)
+            self._notify_end()
+        finally:
+            with _progress_lock:
+                _last_progress.pop(self.id, None)
+        self._commit()
+
+    def _handle_failure(self, error):
+        retry = getattr(error, 'pgcode', None) in RETRYABLE_PGCODES
+        if self.attempts < self.max_attempts and not isinstance(error, AccessError):
+            _logger.warning("medical.job %s: attempt %s failed, retrying", self.id, self.attempts, exc_info=True)
+            self.write({
+                'state': 'pending',
+                # Back off a minute per attempt
+                'eta': fields.Datetime.now() + timedelta(minutes=1 if retry else self.attempts),
+                'error': traceback.format_exc(),
+            })
+            return
+        _logger.error("medical.job %s: failed after %s attempts", self.id, self.attempts, exc_info=True)
+        self.write({
+            'state': 'failed',
+            'date_done': fields.Datetime.now(),
+            'error': traceback.format_exc(),
+        })
+        self._notify_end()
+
+    # ------------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------------
+
+    def _bus_payload(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'state': self.state,
+            'progress': self.progress,
+            'message': self.progress_message or '',
+        }
+
+    def _notify_end(self):
+        Bus = self.env['bus.bus']
+        for job in self:
+            partner = job.user_id.partner_id
+            Bus._sendone(partner, 'medical_job_progress', job._bus_payload())
+            if job.state == 'done':
+                notification = {'type': 'success', 'title': _("Background job done"), 'message': job.name}
+            else:
+                notification = {'type': 'danger', 'title': _("Background job failed"), 'message': job.name}
+            Bus._sendone(partner, 'simple_notification', dict(notification, sticky=job.state != 'done'))
+
+    @api.model
+    def _report_progress(self, done, total=None, message=None):
+        """Report the progress of the current job; no-op outside of a job.
+
+        ``done`` is a percentage, or a count out of ``total``. The update is
+        committed on its own cursor so the user sees it while the job's
+        transaction is still open; it also tells that the job is alive.
+        """
+        job_id = self.env.context.get('medical_job_id')
+        if not job_id:
+            return
+        now = time.monotonic()
+        with _progress_lock:
+            if now - _last_progress.get(job_id, 0) < PROGRESS_INTERVAL:
+                return
+            _last_progress[job_id] = now
+        progress = min(100.0, 100.0 * done / total) if total else min(100.0, float(done))
+        try:
+            with self.env.registry.cursor() as cr:
+                job = api.Environment(cr, SUPERUSER_ID, {})['medical.job'].browse(job_id)
+                job.write({'progress': progress, 'progress_message': message, 'date_heartbeat': fields.Datetime.now()})
+                job.env['bus.bus']._sendone(job.user_id.partner_id, 'medical_job_progress', job._bus_payload())
+        except Exception:
+            _logger.warning("medical.job %s: could not report progress", job_id, exc_info=True)
+
+    # ------------------------------------------------------------------
+    # Actions
+    # ------------------------------------------------------------------
+
+    def _check_manager(self):
+        # Managers read the jobs but do not write them, only these actions do
+        if not self.env.user.has_group('medical_practice.group_medical_manager'):
+            raise AccessError(_("Only the medical managers can requeue or cancel background jobs."))
+
+    def action_requeue(self):
+        self._check_manager()
+        jobs = self.filtered(lambda job: job.state in ('failed', 'cancelled'))
+        jobs.sudo().write({'state': 'pending', 'attempts': 0, 'eta': False, 'error': False})
+        if jobs:
+            self.env.ref('medical_practice.ir_cron_run_medical_jobs').sudo()._trigger()
+        return True
+
+    def action_cancel(self):
+        self._check_manager()
+        self.filtered(lambda job: job.state == 'pending').sudo().write({'state': 'cancelled'})
+        return True
+
+    def action_open_result(self):
+        self.ensure_one()
+        if not self.result_url:
+            return False
+        return {'type': 'ir.actions.act_url', 'url': self.result_url, 'target': 'self'}
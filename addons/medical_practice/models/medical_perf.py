@@ -0,0 +1,212 @@
+from odoo import models, fields, api, tools
+from collections import Counter, deque
+import functools
+import hashlib
+import logging
+import re
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+ENABLED_PARAM = 'medical_practice.profiling'
+SLOW_MS_PARAM = 'medical_practice.profiling_slow_ms'
+DEFAULT_SLOW_MS = 300
+# Samples kept in memory per worker; they are written in batches, from a
+# separate cursor, every FLUSH_SIZE samples or FLUSH_INTERVAL seconds.
+RING_SIZE = 10000
+FLUSH_SIZE = 200
+FLUSH_INTERVAL = 30
+# Days of samples kept by the purge cron
+RETENTION_DAYS = 14
+
+_buffer = deque(maxlen=RING_SIZE)
+_buffer_lock = threading.Lock()
+_last_flush = [time.monotonic()]
+_local = threading.local()
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(query):
+    """Return ``(hash, normalized query)``, literals and parameters removed."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    normalized = str(query)
+    for pattern, replacement in _LITERALS:
+        normalized = pattern.sub(replacement, normalized)
+    normalized = normalized.strip()
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def profiled(method):
+    """Record the query count, SQL and Python time of ``method`` when profiling is on.
+
+    Profiling is enabled with the ``medical_practice.profiling`` system
+    parameter. Put the decorator under the ``api`` ones. The parameters are
+    read before the call: the transaction may be aborted after it.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        params = self.env['ir.config_parameter'].sudo()
+        if not params.get_param(ENABLED_PARAM):
+            return method(self, *args, **kwargs)
+        slow_ms = float(params.get_param(SLOW_MS_PARAM, DEFAULT_SLOW_MS))
+        thread = threading.current_thread()
+        queries = []
+
+        def hook(cr, query, params, start, delay, *rest):
+            queries.append((query, delay))
+
+        hooks = getattr(thread, 'query_hooks', None)
+        if hooks is None:
+            hooks = thread.query_hooks = []
+        hooks.append(hook)
+        depth = getattr(_local, 'depth', 0)
+        _local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            _local.depth = depth
+            hooks.remove(hook)
+            try:
+                _record(self, f"{self._name}.{method.__name__}", duration, queries, slow_ms, flush=not depth)
+            except Exception:
+                # Never hide the result or the error of the profiled method
+                _logger.warning("Could not record the profile of %s", method.__name__, exc_info=True)
+    return wrapper
+
+
+def _record(model, name, duration, queries, slow_ms, flush):
+    sql_ms = sum(delay for _query, delay in queries) * 1000
+    sample = {
+        'date': fields.Datetime.now(),
+        'method': name,
+        'duration_ms': duration,
+        'sql_ms': sql_ms,
+        'python_ms': max(duration - sql_ms, 0.0),
+        'query_count': len(queries),
+        'slow': False,
+        'fingerprints': False,
+    }
+    if duration >= slow_ms:
+        totals, counts, texts = Counter(), Counter(), {}
+        for query, delay in queries:
+            key, text = fingerprint(query)
+            totals[key] += delay * 1000
+            counts[key] += 1
+            texts[key] = text
+        lines = [
+            f"{counts[key]:>4} x {total:8.1f} ms  {key}  {texts[key][:300]}"
+            for key, total in totals.most_common(10)
+        ]
+        sample.update(slow=True, fingerprints="\n".join(lines))
+        _logger.warning(
+            "Slow call %s: %.1f ms (%s queries, %.1f ms SQL)\n%s",
+            name, duration, len(queries), sql_ms, sample['fingerprints'])
+    with _buffer_lock:
+        _buffer.append(sample)
+        due = len(_buffer) >= FLUSH_SIZE or time.monotonic() - _last_flush[0] >= FLUSH_INTERVAL
+    if flush and due:
+        model.env['medical.perf.sample']._flush_buffer()
+
+
+class MedicalPerfSample(models.Model):
+    """One profiled call of a medical_practice method."""
+    _name = 'medical.perf.sample'
+    _description = 'Medical Performance Sample'
+    _order = 'date desc, id desc'
+    _log_access = False
+    _rec_name = 'method'
+
+    date = fields.Datetime(string='Date', required=True, readonly=True, index=True)
+    method = fields.Char(string='Method', required=True, readonly=True, index=True)
+    duration_ms = fields.Float(string='Duration (ms)', readonly=True)
+    sql_ms = fields.Float(string='SQL (ms)', readonly=True)
+    python_ms = fields.Float(string='Python (ms)', readonly=True)
+    query_count = fields.Integer(string='Queries', readonly=True)
+    slow = fields.Boolean(string='Slow', readonly=True)
+    fingerprints = fields.Text(string='Query Fingerprints', readonly=True)
+
+    @api.model
+    def _flush_buffer(self):
+        """Write the buffered samples in their own transaction."""
+        with _buffer_lock:
+            samples = list(_buffer)
+            _buffer.clear()
+            _last_flush[0] = time.monotonic()
+        if not samples:
+            return 0
+        columns = ['date', 'method', 'duration_ms', 'sql_ms', 'python_ms', 'query_count', 'slow', 'fingerprints']
+        try:
+            with self.env.registry.cursor() as cr:
+                values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(samples))
+                cr.execute(
+                    f"INSERT INTO medical_perf_sample ({', '.join(columns)}) VALUES {values}",
+                    [sample[column] for sample in samples for column in columns])
+        except Exception:
+            _logger.warning("Could not store %s performance samples", len(samples), exc_info=True)
+            return 0
+        return len(samples)
+
+    @api.model
+    def _cron_purge(self):
+        self._flush_buffer()
+        self.env.cr.execute(
+            "DELETE FROM medical_perf_sample WHERE date < (now() AT TIME ZONE 'UTC') - %s * interval '1 day'",
+            (RETENTION_DAYS,))
+
+
+class MedicalPerfStat(models.Model):
+    """p50/p95 per method over the stored samples."""
+    _name = 'medical.perf.stat'
+    _description = 'Medical Performance Statistics'
+    _auto = False
+    _order = 'p95_ms desc'
+    _rec_name = 'method'
+
+    method = fields.Char(string='Method', readonly=True)
+    call_count = fields.Integer(string='Calls', readonly=True)
+    slow_count = fields.Integer(string='Slow Calls', readonly=True)
+    p50_ms = fields.Float(string='p50 (ms)', readonly=True)
+    p95_ms = fields.Float(string='p95 (ms)', readonly=True)
+    max_ms = fields.Float(string='Max (ms)', readonly=True)
+    avg_queries = fields.Float(string='Queries (avg)', readonly=True)
+    avg_sql_ms = fields.Float(string='SQL (avg ms)', readonly=True)
+    avg_python_ms = fields.Float(string='Python (avg ms)', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE VIEW {self._table} AS
+            SELECT MIN(id) AS id,
+                   method,
+                   COUNT(*) AS call_count,
+                   COUNT(*) FILTER (WHERE slow) AS slow_count,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms) AS p50_ms,
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) AS p95_ms,
+                   MAX(duration_ms) AS max_ms,
+                   AVG(query_count) AS avg_queries,
+                   AVG(sql_ms) AS avg_sql_ms,
+                   AVG(python_ms) AS avg_python_ms
+            FROM medical_perf_sample
+            GROUP BY method
+        """)
+
+    def action_open_samples(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': self.method,
+            'res_model': 'medical.perf.sample',
+            'view_mode': 'tree,form',
+            'domain': [('method', '=', self.method)],
+        }
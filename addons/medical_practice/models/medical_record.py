@@ -1,4 +1,51 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from .sql_utils import ensure_archive_table, ensure_indexes, ensure_unaccent_function
+from .medical_perf import profiled
+
+# Full-text document of a record, repeated verbatim in search_notes()
+NOTES_TSVECTOR_EXPR = (
+    "to_tsvector('french', medical_unaccent(COALESCE(chief_complaint, '') || ' ' || COALESCE(diagnosis, '')))"
+)
+
+# Normal (low, high) bounds of the vital signs; zero or empty means not measured
+VITAL_RANGES = {
+    'temperature': (35.5, 38.0),
+    'blood_pressure_systolic': (90, 140),
+    'blood_pressure_diastolic': (60, 90),
+    'heart_rate': (50, 100),
+    'bmi': (18.5, 30.0),
+}
+VITAL_FLAGS = [('low', 'Low'), ('high', 'High')]
+# Flag column -> vital columns it summarizes (blood pressure has two)
+FLAG_COLUMNS = {
+    'temperature_flag': ('temperature',),
+    'bp_flag': ('blood_pressure_systolic', 'blood_pressure_diastolic'),
+    'heart_rate_flag': ('heart_rate',),
+    'bmi_flag': ('bmi',),
+}
+# Fields whose change moves the per-patient vital trends
+TREND_FIELDS = {'patient_id', 'record_date', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'weight'}
+
+
+def vital_flag_of(values):
+    """Return 'high', 'low' or False for ``{vital column: value}``, high winning."""
+    flags = set()
+    for column, value in values.items():
+        low, high = VITAL_RANGES[column]
+        if value and value > high:
+            flags.add('high')
+        elif value and value < low:
+            flags.add('low')
+    return 'high' if 'high' in flags else 'low' if flags else False
+
+
+def _vital_flag_sql(columns):
+    """SQL twin of ``vital_flag_of`` over the given columns."""
+    high = " OR ".join(f"COALESCE({column}, 0) > {VITAL_RANGES[column][1]}" for column in columns)
+    low = " OR ".join(
+        f"(COALESCE({column}, 0) != 0 AND {column} < {VITAL_RANGES[column][0]})" for column in columns)
+    return f"CASE WHEN {high} THEN 'high' WHEN {low} THEN 'low' END"
+
 
 class MedicalRecord(models.Model):
     _name = 'medical.record'
@@ -15,10 +62,11 @@ class MedicalRecord(models.Model):
         default='New'
     )
     
+    # patient_id and doctor_id are covered by the composite indexes of init()
     patient_id = fields.Many2one('medical.patient', string='Patient', required=True, tracking=True)
     doctor_id = fields.Many2one('medical.doctor', string='Doctor', required=True)
-    appointment_id = fields.Many2one('medical.appointment', string='Related Appointment')
-    record_date = fields.Datetime(string='Record Date', default=fields.Datetime.now, required=True)
+    appointment_id = fields.Many2one('medical.appointment', string='Related Appointment', index='btree_not_null')
+    record_date = fields.Datetime(string='Record Date', default=fields.Datetime.now, required=True, index=True)
     
     # Vital Signs
     temperature = fields.Float(string='Temperature (°C)')
@@ -28,15 +76,74 @@ class MedicalRecord(models.Model):
     weight = fields.Float(string='Weight (kg)')
     height = fields.Float(string='Height (cm)')
     bmi = fields.Float(string='BMI', compute='_compute_bmi', store=True)
+
+    # Out-of-range vitals, stored for filtering (see VITAL_RANGES)
+    temperature_flag = fields.Selection(VITAL_FLAGS, string='Temperature Flag', compute='_compute_vital_flags', store=True)
+    bp_flag = fields.Selection(VITAL_FLAGS, string='Blood Pressure Flag', compute='_compute_vital_flags', store=True)
+    heart_rate_flag = fields.Selection(VITAL_FLAGS, string='Heart Rate Flag', compute='_compute_vital_flags', store=True)
+    bmi_flag = fields.Selection(VITAL_FLAGS, string='BMI Flag', compute='_compute_vital_flags', store=True)
+    abnormal_vitals = fields.Boolean(string='Abnormal Vitals', compute='_compute_vital_flags', store=True)
     
     # Medical Information
-    chief_complaint = fields.Text(string='Chief Complaint')
+    chief_complaint = fields.Text(string='Chief Complaint', index='trigram')
     history_present_illness = fields.Text(string='History of Present Illness')
     physical_examination = fields.Text(string='Physical Examination')
-    diagnosis = fields.Text(string='Diagnosis')
+    diagnosis = fields.Text(string='Diagnosis', index='trigram')
     treatment_plan = fields.Text(string='Treatment Plan')
     follow_up_instructions = fields.Text(string='Follow-up Instructions')
 
+    def _auto_init(self):
+        # Create and fill the flag columns in SQL, the ORM would otherwise
+        # compute them record by record over the whole table
+        cr = self.env.cr
+        new_columns = [column for column in (*FLAG_COLUMNS, 'abnormal_vitals')
+                       if not tools.column_exists(cr, self._table, column)]
+        if tools.table_exists(cr, self._table) and new_columns:
+            for column in new_columns:
+                tools.create_column(cr, self._table, column, 'boolean' if column == 'abnormal_vitals' else 'varchar')
+            self._refresh_vital_flags()
+        return super()._auto_init()
+
+    def init(self):
+        cr = self.env.cr
+        ensure_unaccent_function(cr)
+        ensure_indexes(cr, self._table, [
+            # Patient history, newest first
+            ('medical_record_patient_date_idx', ['patient_id', 'record_date DESC'], None),
+            ('medical_record_doctor_date_idx', ['doctor_id', 'record_date DESC'], None),
+            # Practice-wide abnormal vitals, newest first
+            ('medical_record_abnormal_date_idx', ['record_date DESC'], 'abnormal_vitals'),
+            # Full-text search over the clinical notes
+            ('medical_record_notes_fts_idx', [NOTES_TSVECTOR_EXPR], None, 'gin'),
+        ])
+        # Old records are moved there by medical.archive
+        ensure_archive_table(cr, self._table, 'record_date')
+
+    @api.model
+    @profiled
+    def search_notes(self, query, patient_id=None, limit=20):
+        """Full-text search of chief complaints and diagnoses, best match first.
+
+        ``query`` uses the web search syntax (``"quoted phrase"``, ``or``,
+        ``-excluded``) with French stemming, ignoring case and accents.
+        Returns the matching ``medical.record`` records.
+        """
+        if not (query or '').strip():
+            return self.browse()
+        self.flush_model(['chief_complaint', 'diagnosis', 'patient_id', 'record_date'])
+        patient_clause = "AND patient_id = %(patient_id)s" if patient_id else ""
+        self.env.cr.execute(f"""
+            SELECT id
+            FROM medical_record, websearch_to_tsquery('french', medical_unaccent(%(query)s)) AS q
+            WHERE {NOTES_TSVECTOR_EXPR} @@ q {patient_clause}
+            ORDER BY ts_rank({NOTES_TSVECTOR_EXPR}, q) DESC, record_date DESC
+            LIMIT %(limit)s
+        """, {'query': query, 'patient_id': patient_id, 'limit': limit})
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        # Apply access rules while keeping the ranking
+        allowed = set(self.search([('id', 'in', ids)]).ids) if ids else set()
+        return self.browse([record_id for record_id in ids if record_id in allowed])
+
     @api.depends('weight', 'height')
     def _compute_bmi(self):
         for record in self:
@@ -46,8 +153,48 @@ class MedicalRecord(models.Model):
             else:
                 record.bmi = 0.0
 
+    @api.depends('temperature', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'bmi')
+    def _compute_vital_flags(self):
+        for record in self:
+            for flag, columns in FLAG_COLUMNS.items():
+                record[flag] = vital_flag_of({column: record[column] for column in columns})
+            record.abnormal_vitals = any(record[flag] for flag in FLAG_COLUMNS)
+
     @api.model
-    def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('medical.record') or 'New'
-        return super().create(vals)
\ No newline at end of file
+    def _refresh_vital_flags(self):
+        """Recompute every stored vital flag in one UPDATE."""
+        flags = {flag: _vital_flag_sql(columns) for flag, columns in FLAG_COLUMNS.items()}
+        assignments = ", ".join(f"{flag} = {expression}" for flag, expression in flags.items())
+        abnormal = " OR ".join(f"({expression}) IS NOT NULL" for expression in flags.values())
+        changed = " OR ".join(f"{flag} IS DISTINCT FROM {expression}" for flag, expression in flags.items())
+        self.env.cr.execute(f"""
+            UPDATE {self._table}
+            SET {assignments}, abnormal_vitals = ({abnormal})
+            WHERE {changed} OR abnormal_vitals IS NULL
+        """)
+        self.invalidate_model(list(flags) + ['abnormal_vitals'])
+
+    @api.model_create_multi
+    @profiled
+    def create(self, vals_list):
+        # Reserve the references of the whole batch in one sequence call
+        to_number = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        numbers = self.env['ir.sequence']._next_batch_by_code('medical.record', len(to_number))
+        for vals, number in zip(to_number, numbers):
+            vals['name'] = number or 'New'
+        records = super().create(vals_list)
+        self.env['medical.patient']._refresh_vital_trends(records.patient_id.ids)
+        return records
+
+    def write(self, vals):
+        patients = self.patient_id if TREND_FIELDS & set(vals) else self.env['medical.patient']
+        res = super().write(vals)
+        if patients:
+            self.env['medical.patient']._refresh_vital_trends((patients | self.patient_id).ids)
+        return res
+
+    def unlink(self):
+        patients = self.patient_id
+        res = super().unlink()
+        self.env['medical.patient']._refresh_vital_trends(patients.ids)
+        return res
\ No newline at end of file
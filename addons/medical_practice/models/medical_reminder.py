@@ -0,0 +1,289 @@
+from odoo import models, fields, api, _
+from odoo.tools import html2plaintext
+from collections import defaultdict
+import logging
+
+_logger = logging.getLogger(__name__)
+
+OFFSETS_PARAM = 'medical_practice.reminder_offsets'
+RATE_PARAM = 'medical_practice.reminder_rate_per_minute'
+# Hours before the appointment at which a reminder goes out
+DEFAULT_OFFSETS = '24,2'
+# Reminders sent per minute, i.e. per run of the every-minute cron
+DEFAULT_RATE = 600
+# Reminders due within this many hours are generated ahead of time
+LOOKAHEAD_HOURS = 24
+# Reminders rendered and sent together, one SMTP connection per batch
+SEND_BATCH_SIZE = 100
+# Appointments that still get reminders
+ACTIVE_STATES = ('scheduled', 'confirmed')
+
+CHANNELS = [
+    ('email', 'Email'),
+    ('sms', 'SMS'),
+]
+TEMPLATES = {
+    'email': 'medical_practice.mail_template_appointment_reminder',
+    'sms': 'medical_practice.mail_template_appointment_reminder_sms',
+}
+
+
+class MedicalReminder(models.Model):
+    """Appointment reminder, both the outbox and the sent-log.
+
+    Reminders are generated by one INSERT ... SELECT per offset over the
+    upcoming appointments (partial index on the open appointments), the
+    unique (appointment, offset) pair making the generation idempotent: a
+    reminder is never queued, nor sent, twice. Queued reminders are sent
+    in batches grouped per channel and offset, each batch rendered with a
+    single template call, at most ``medical_practice.reminder_rate_per_minute``
+    per run of the every-minute cron; the next run sends the rest. Emails go straight through ``ir.mail_server`` on one SMTP
+    connection per batch, without a mail.mail/mail.message per reminder.
+    """
+    _name = 'medical.reminder'
+    _description = 'Appointment Reminder'
+    _order = 'date_scheduled desc, id desc'
+    _rec_name = 'appointment_id'
+
+    appointment_id = fields.Many2one('medical.appointment', string='Appointment', required=True,
+                                     readonly=True, ondelete='cascade')
+    patient_id = fields.Many2one(related='appointment_id.patient_id', string='Patient')
+    offset_hours = fields.Integer(string='Hours Before', required=True, readonly=True)
+    channel = fields.Selection(CHANNELS, string='Channel', required=True, readonly=True)
+    recipient = fields.Char(string='Recipient', readonly=True)
+    date_scheduled = fields.Datetime(string='Scheduled', required=True, readonly=True)
+    date_sent = fields.Datetime(string='Sent', readonly=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ], string='Status', required=True, readonly=True, default='queued', index=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    _sql_constraints = [
+        ('appointment_offset_uniq', 'unique (appointment_id, offset_hours)',
+         'A reminder is sent only once per appointment and offset.'),
+    ]
+
+    def init(self):
+        # The outbox: only the queued rows are ever scanned by the dispatcher
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS medical_reminder_queued_idx
+            ON medical_reminder (date_scheduled) WHERE state = 'queued'
+        """)
+
+    @api.model
+    def _get_offsets(self):
+        value = self.env['ir.config_parameter'].sudo().get_param(OFFSETS_PARAM, DEFAULT_OFFSETS)
+        return sorted({int(offset) for offset in value.split(',') if offset.strip()}, reverse=True)
+
+    # ------------------------------------------------------------------
+    # Generation
+    # ------------------------------------------------------------------
+
+    @api.model
+    def generate(self, lookahead_hours=LOOKAHEAD_HOURS):
+        """Queue the reminders due within ``lookahead_hours``, return how many were added."""
+        self.env['medical.appointment'].flush_model(['appointment_date', 'state', 'patient_id'])
+        self.env['medical.patient'].flush_model(['email', 'mobile', 'phone'])
+        cr = self.env.cr
+        queued = 0
+        for offset in self._get_offsets():
+            # Email when the patient has one, SMS otherwise; patients without
+            # any contact get no reminder. Existing pairs are left untouched.
+            cr.execute("""
+                INSERT INTO medical_reminder
+                    (appointment_id, offset_hours, channel, recipient, date_scheduled, state,
+                     create_uid, create_date, write_uid, write_date)
+                SELECT a.id, %(offset)s,
+                       CASE WHEN NULLIF(trim(p.email), '') IS NOT NULL THEN 'email' ELSE 'sms' END,
+                       COALESCE(NULLIF(trim(p.email), ''), NULLIF(trim(p.mobile), ''), NULLIF(trim(p.phone), '')),
+                       a.appointment_date - %(offset)s * interval '1 hour', 'queued',
+                       %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+                FROM medical_appointment a
+                JOIN medical_patient p ON p.id = a.patient_id
+                WHERE a.state IN %(states)s
+                  AND a.appointment_date > now() AT TIME ZONE 'UTC'
+                  AND a.appointment_date <= (now() AT TIME ZONE 'UTC') + (%(offset)s + %(lookahead)s) * interval '1 hour'
+                  AND COALESCE(NULLIF(trim(p.email), ''), NULLIF(trim(p.mobile), ''), NULLIF(trim(p.phone), '')) IS NOT NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM medical_reminder r WHERE r.appointment_id = a.id AND r.offset_hours = %(offset)s
+                  )
+                ON CONFLICT ON CONSTRAINT medical_reminder_appointment_offset_uniq DO NOTHING
+            """, {'offset': offset, 'lookahead': lookahead_hours, 'uid': self.env.uid, 'states': ACTIVE_STATES})
+            queued += cr.rowcount
+        self.invalidate_model()
+        _logger.info("medical.reminder: %s reminders queued", queued)
+        return queued
+
+    @api.model
+    def _reset_appointments(self, appointments):
+        """Follow the new date of rescheduled ``appointments``.
+
+        Queued reminders move to their new send time. The other reminders
+        are forgotten, so they are generated and sent again, only when their
+        new send time is still to come: a reminder already sent for a time
+        that has passed again is not repeated.
+        """
+        if not appointments.ids:
+            return
+        self.flush_model()
+        appointments.flush_recordset(['appointment_date'])
+        cr = self.env.cr
+        cr.execute("""
+            DELETE FROM medical_reminder r USING medical_appointment a
+            WHERE a.id = r.appointment_id AND a.id = ANY(%s) AND r.state != 'queued'
+              AND a.appointment_date - r.offset_hours * interval '1 hour' > now() AT TIME ZONE 'UTC'
+        """, (appointments.ids,))
+        cr.execute("""
+            UPDATE medical_reminder r
+            SET date_scheduled = a.appointment_date - r.offset_hours * interval '1 hour',
+                write_date = now() AT TIME ZONE 'UTC'
+            FROM medical_appointment a
+            WHERE a.id = r.appointment_id AND a.id = ANY(%s) AND r.state = 'queued'
+        """, (appointments.ids,))
+        self.invalidate_model()
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _claim_batch(self, limit):
+        """Lock the next due reminders; cancel those whose appointment went away."""
+        self.env['medical.appointment'].flush_model(['appointment_date', 'state'])
+        cr = self.env.cr
+        cr.execute("""
+            UPDATE medical_reminder r
+            SET state = 'cancelled', write_date = now() AT TIME ZONE 'UTC'
+            FROM medical_appointment a
+            WHERE a.id = r.appointment_id AND r.state = 'queued'
+              AND r.date_scheduled <= now() AT TIME ZONE 'UTC'
+              AND (a.state NOT IN %s OR a.appointment_date <= now() AT TIME ZONE 'UTC')
+        """, (ACTIVE_STATES,))
+        cr.execute("""
+            SELECT id FROM medical_reminder
+            WHERE state = 'queued' AND date_scheduled <= now() AT TIME ZONE 'UTC'
+            ORDER BY date_scheduled, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (limit,))
+        self.invalidate_model()
+        return self.browse([row[0] for row in cr.fetchall()])
+
+    def _render(self, channel, offset):
+        """Render ``self`` (same channel and offset) in one template call per field."""
+        template = self.env.ref(TEMPLATES[channel])
+        appointment_ids = self.appointment_id.ids
+        add_context = {'offset_hours': offset}
+        bodies = template._render_field('body_html', appointment_ids, add_context=add_context)
+        subjects = (template._render_field('subject', appointment_ids, add_context=add_context)
+                    if channel == 'email' else {})
+        return {
+            reminder: (subjects.get(reminder.appointment_id.id), bodies[reminder.appointment_id.id])
+            for reminder in self
+        }
+
+    def _send_email(self, rendered):
+        """Send the rendered emails on one SMTP connection, return ``{reminder: error}``."""
+        MailServer = self.env['ir.mail_server'].sudo()
+        email_from = MailServer._get_default_from_address()
+        errors = {}
+        smtp_session = MailServer.connect()
+        try:
+            for reminder, (subject, body) in rendered.items():
+                message = MailServer.build_email(
+                    email_from, [reminder.recipient], subject, body,
+                    subtype='html', body_alternative=html2plaintext(body))
+                try:
+                    MailServer.send_email(message, smtp_session=smtp_session)
+                except Exception as error:
+                    errors[reminder] = str(error)
+        finally:
+            if smtp_session:
+                smtp_session.quit()
+        return errors
+
+    def _send_sms(self, rendered):
+        """Hand the texts to the ``sms`` module when installed, return ``{reminder: error}``."""
+        if 'sms.sms' not in self.env:
+            return {reminder: _("No SMS gateway: install the SMS module.") for reminder in rendered}
+        self.env['sms.sms'].sudo().create([
+            {'number': reminder.recipient, 'body': html2plaintext(body)}
+            for reminder, (_subject, body) in rendered.items()
+        ]).send(auto_commit=False, raise_exception=False)
+        return {}
+
+    def _send(self):
+        """Render and send ``self``, grouped per channel and offset."""
+        groups = defaultdict(lambda: self.browse())
+        for reminder in self:
+            groups[reminder.channel, reminder.offset_hours] |= reminder
+        failed = {}
+        for (channel, offset), reminders in groups.items():
+            try:
+                rendered = reminders._render(channel, offset)
+                failed.update(getattr(reminders, f'_send_{channel}')(rendered))
+            except Exception as error:
+                _logger.warning("medical.reminder: %s %s reminders failed", len(reminders), channel, exc_info=True)
+                failed.update(dict.fromkeys(reminders, str(error)))
+        sent = self.filtered(lambda reminder: reminder not in failed)
+        sent.write({'state': 'sent', 'date_sent': fields.Datetime.now(), 'error': False})
+        for reminder, error in failed.items():
+            reminder.write({'state': 'failed', 'error': error})
+        return len(sent)
+
+    @api.model
+    def dispatch(self, limit=None, auto_commit=False):
+        """Send the due reminders, at most ``limit`` of them.
+
+        Nothing waits here: the rate is kept by sending one minute's worth
+        per run of the every-minute cron.
+
+        :param limit: maximum number of reminders sent (default: one minute's worth)
+        :return: the number of reminders sent
+        """
+        limit = limit or int(self.env['ir.config_parameter'].sudo().get_param(RATE_PARAM, DEFAULT_RATE))
+        Job = self.env['medical.job']
+        sent = done = 0
+        while done < limit:
+            batch = self._claim_batch(min(SEND_BATCH_SIZE, limit - done))
+            if not batch:
+                break
+            sent += batch._send()
+            done += len(batch)
+            Job._report_progress(done, limit, _("%s reminders sent", sent))
+            if auto_commit:
+                self.env.cr.commit()
+        _logger.info("medical.reminder: %s reminders sent", sent)
+        return sent
+
+    @api.model
+    def _cron_process(self):
+        self.generate()
+        auto_commit = not self.env.registry.in_test_mode()
+        if auto_commit:
+            self.env.cr.commit()
+        self.dispatch(auto_commit=auto_commit)
+
+    @api.model
+    def _job_process(self):
+        """Background job: queue the upcoming reminders and send one minute's worth.
+
+        The cron sends the rest, keeping the rate.
+        """
+        self = self.sudo()
+        queued = self.generate()
+        sent = self.dispatch(auto_commit=not self.env.registry.in_test_mode())
+        return {'queued': queued, 'sent': sent}
+
+    @api.model
+    def action_enqueue_process(self):
+        Job = self.env['medical.job']
+        job = Job.enqueue(self, '_job_process', name=_("Appointment reminders"), max_attempts=1)
+        return Job._queued_notification(job)
+
+    def action_retry(self):
+        self.filtered(lambda reminder: reminder.state == 'failed').write({'state': 'queued', 'error': False})
+        return True
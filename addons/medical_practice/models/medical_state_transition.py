@@ -0,0 +1,114 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from .medical_perf import profiled
+from collections import Counter
+import json
+
+
+class MedicalStateTransitionMixin(models.AbstractModel):
+    """Validated, set-based state transitions.
+
+    Models declare their workflow in ``_state_transitions`` as
+    ``{target_state: (allowed source states, ...)}``. A single record goes
+    through ``write()`` so the chatter tracks it as usual; larger batches are
+    locked with one query, written at once without tracking, and logged once
+    in ``medical.state.transition.log`` instead of one tracking message per
+    record. Both paths run every ``write()`` override.
+    """
+    _name = 'medical.state.transition.mixin'
+    _description = 'Medical State Transition Mixin'
+
+    _state_transitions = {}
+
+    @profiled
+    def _transition(self, target):
+        """Move the records to the ``target`` state, returns the records that changed."""
+        allowed = self._state_transitions.get(target)
+        if allowed is None:
+            raise UserError(_("Unknown status: %s", target))
+        invalid = self.filtered(lambda record: record.state != target and record.state not in allowed)
+        if invalid:
+            labels = dict(self._fields['state']._description_selection(self.env))
+            raise UserError(_(
+                "The following records cannot be set to %(state)s:\n%(records)s",
+                state=labels.get(target, target),
+                records="\n".join(
+                    f"- {record.display_name} ({labels.get(record.state, record.state)})" for record in invalid[:10]
+                ) + ("\n..." if len(invalid) > 10 else ""),
+            ))
+        todo = self.filtered(lambda record: record.state != target)
+        if not todo:
+            return todo
+        if len(todo) == 1:
+            from_states = Counter({todo.state: 1})
+            todo.write({'state': target})
+            todo._after_state_transition(target, from_states)
+            return todo
+        return todo._bulk_transition(target, allowed)
+
+    def _bulk_transition(self, target, allowed):
+        self.check_access_rights('write')
+        self.check_access_rule('write')
+        self.flush_recordset(['state'])
+        cr = self.env.cr
+        # Lock the batch against concurrent transitions and read the
+        # committed previous state of each row in one query.
+        cr.execute(f"""
+            SELECT id, state FROM {self._table}
+            WHERE id IN %s AND state IN %s
+            FOR UPDATE
+        """, (tuple(self.ids), tuple(allowed)))
+        rows = cr.fetchall()
+        self.invalidate_recordset(['state'])
+        changed = self.browse([row[0] for row in rows])
+        # A single UPDATE through write(), so its overrides still apply;
+        # the batch log replaces the per-record tracking messages.
+        changed.with_context(tracking_disable=True).write({'state': target})
+        from_states = Counter(row[1] for row in rows)
+        self.env['medical.state.transition.log']._log_batch(changed, target, from_states)
+        changed._after_state_transition(target, from_states)
+        return changed
+
+    def _after_state_transition(self, target, from_states):
+        """Hook called with the records that just moved to ``target``.
+
+        ``from_states`` counts the records per previous state.
+        """
+        return True
+
+
+class MedicalStateTransitionLog(models.Model):
+    """One entry per batched status change, in place of per-record tracking."""
+    _name = 'medical.state.transition.log'
+    _description = 'Medical Batch Status Change'
+    _order = 'id desc'
+
+    res_model = fields.Char(string='Model', required=True, readonly=True, index=True)
+    target_state = fields.Char(string='New Status', required=True, readonly=True)
+    from_states = fields.Char(string='Previous Statuses', readonly=True)
+    record_count = fields.Integer(string='Records', readonly=True)
+    res_ids = fields.Text(string='Record IDs', readonly=True)
+    user_id = fields.Many2one('res.users', string='Done by', readonly=True, default=lambda self: self.env.user)
+
+    @api.model
+    def _log_batch(self, records, target, from_states):
+        if not records:
+            return self.browse()
+        labels = dict(records._fields['state']._description_selection(self.env))
+        return self.sudo().create({
+            'res_model': records._name,
+            'target_state': labels.get(target, target),
+            'from_states': ", ".join(f"{labels.get(state, state)}: {count}" for state, count in from_states.items()),
+            'record_count': len(records),
+            'res_ids': json.dumps(records.ids),
+        })
+
+    def action_open_records(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("%(count)s records set to %(state)s", count=self.record_count, state=self.target_state),
+            'res_model': self.res_model,
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', json.loads(self.res_ids or '[]'))],
+        }
@@ -0,0 +1,57 @@
+from odoo import models, fields, tools
+
+
+class MedicalVitalTrend(models.Model):
+    """Vital signs of every record with per-patient rolling averages and deltas.
+
+    The window functions are partitioned by patient, so PostgreSQL pushes a
+    ``patient_id`` filter below them: one patient's trend only reads that
+    patient's records, through the (patient, date) index. Archived records
+    are included.
+    """
+    _name = 'medical.vital.trend'
+    _description = 'Vital Signs Trend'
+    _auto = False
+    _order = 'record_date desc'
+    _rec_name = 'record_date'
+
+    patient_id = fields.Many2one('medical.patient', string='Patient', readonly=True)
+    doctor_id = fields.Many2one('medical.doctor', string='Doctor', readonly=True)
+    record_date = fields.Datetime(string='Date', readonly=True)
+    temperature = fields.Float(string='Temperature (°C)', readonly=True, group_operator='avg')
+    blood_pressure_systolic = fields.Integer(string='BP Systolic (mmHg)', readonly=True, group_operator='avg')
+    blood_pressure_diastolic = fields.Integer(string='BP Diastolic (mmHg)', readonly=True, group_operator='avg')
+    heart_rate = fields.Integer(string='Heart Rate (bpm)', readonly=True, group_operator='avg')
+    weight = fields.Float(string='Weight (kg)', readonly=True, group_operator='avg')
+    bmi = fields.Float(string='BMI', readonly=True, group_operator='avg')
+    systolic_avg = fields.Float(string='Systolic (rolling avg)', readonly=True, group_operator='avg', digits=(16, 1),
+                                help="Average of this reading and the two previous ones.")
+    systolic_delta = fields.Integer(string='Systolic Change', readonly=True, group_operator='avg',
+                                    help="Difference with the previous reading.")
+    diastolic_delta = fields.Integer(string='Diastolic Change', readonly=True, group_operator='avg')
+    heart_rate_delta = fields.Integer(string='Heart Rate Change', readonly=True, group_operator='avg')
+    weight_delta = fields.Float(string='Weight Change (kg)', readonly=True, group_operator='avg')
+    weight_avg = fields.Float(string='Weight (rolling avg)', readonly=True, group_operator='avg', digits=(16, 1))
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        readings = " UNION ALL ".join(f"""
+            SELECT id, patient_id, doctor_id, record_date, NULLIF(temperature, 0) AS temperature,
+                   NULLIF(blood_pressure_systolic, 0) AS systolic, NULLIF(blood_pressure_diastolic, 0) AS diastolic,
+                   NULLIF(heart_rate, 0) AS heart_rate, NULLIF(weight, 0) AS weight, NULLIF(bmi, 0) AS bmi
+            FROM {table}
+        """ for table in ('medical_record', 'medical_record_archive'))
+        self.env.cr.execute(f"""
+            CREATE VIEW {self._table} AS
+            SELECT id, patient_id, doctor_id, record_date, temperature,
+                   systolic AS blood_pressure_systolic, diastolic AS blood_pressure_diastolic,
+                   heart_rate, weight, bmi,
+                   AVG(systolic) OVER (w ROWS BETWEEN 2 PRECEDING AND CURRENT ROW)::float AS systolic_avg,
+                   systolic - LAG(systolic) OVER w AS systolic_delta,
+                   diastolic - LAG(diastolic) OVER w AS diastolic_delta,
+                   heart_rate - LAG(heart_rate) OVER w AS heart_rate_delta,
+                   weight - LAG(weight) OVER w AS weight_delta,
+                   AVG(weight) OVER (w ROWS BETWEEN 2 PRECEDING AND CURRENT ROW) AS weight_avg
+            FROM ({readings}) AS readings
+            WINDOW w AS (PARTITION BY patient_id ORDER BY record_date, id)
+        """)
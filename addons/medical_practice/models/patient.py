@@ -1,24 +1,82 @@
 from odoo import models, fields, api
+from datetime import timedelta
+import re
+from .sql_utils import ensure_extension, ensure_indexes, ensure_unaccent_function
+from .medical_perf import profiled
+
+# (key, label, minimum age) of the age brackets, youngest first
+AGE_BRACKETS = [
+    ('pediatric', 'Pediatric (0-17)', 0),
+    ('young_adult', 'Adult (18-39)', 18),
+    ('adult', 'Adult (40-64)', 40),
+    ('geriatric', 'Geriatric (65+)', 65),
+]
+AGE_REFRESH_PARAM = 'medical_practice.age_refresh_date'
+
+# Vital trends: the last TREND_READINGS blood pressure readings of a patient
+# are averaged and regressed; the pressure is rising when the slope reaches
+# RISING_BP_SLOPE mmHg per 30 days over enough readings, the last one elevated.
+TREND_READINGS = 5
+RISING_BP_MIN_READINGS = 3
+RISING_BP_SLOPE = 5.0
+RISING_BP_MIN_SYSTOLIC = 130
+
+# Index expressions of the quick search, repeated verbatim in the queries
+NAME_SEARCH_EXPR = "medical_unaccent(name)"
+# Digits of each number, so that "0612" finds "06 12 34 56 78"
+PHONE_SEARCH_EXPR = (
+    "regexp_replace(COALESCE(phone, ''), '[^0-9]', '', 'g') || ' ' || "
+    "regexp_replace(COALESCE(mobile, ''), '[^0-9]', '', 'g')"
+)
+
+# Timeline sources: (type, model, date column, state and summary SQL
+# expressions). Archived rows keep their ids, so a type and an id still
+# identify an entry.
+TIMELINE_SOURCES = [
+    ('appointment', 'medical.appointment', 'appointment_date', 't.state', 't.appointment_type'),
+    ('appointment', 'medical.appointment.archive', 'appointment_date', 't.state', 't.appointment_type'),
+    ('record', 'medical.record', 'record_date', 'NULL', 'left(t.chief_complaint, 120)'),
+    ('record', 'medical.record.archive', 'record_date', 'NULL', 'left(t.chief_complaint, 120)'),
+    ('prescription', 'medical.prescription', 'prescription_date', 't.state', 'NULL'),
+]
+
+
+def age_bracket_of(age):
+    bracket = False
+    for key, _label, min_age in AGE_BRACKETS:
+        if age >= min_age:
+            bracket = key
+    return bracket
+
 
 class MedicalPatient(models.Model):
     _name = 'medical.patient'
     _description = 'Medical Patient'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'medical.dashboard.stat.mixin']
     _rec_name = 'name'
     _order = 'name'
+    _stat_column = 'patient_count'
+    _stat_series_fields = ('blood_type',)
 
-    name = fields.Char(string='Full Name', required=True, tracking=True)
+    name = fields.Char(string='Full Name', required=True, tracking=True, index='trigram')
     patient_id = fields.Char(
         string='Patient ID', 
         required=True, 
         copy=False, 
         readonly=True, 
-        default='New'
+        default='New',
+        index=True,
     )
     
     # Personal Information
     birth_date = fields.Date(string='Date of Birth')
-    age = fields.Integer(string='Age', compute='_compute_age')
+    # Stored so that age can be searched, sorted and grouped in SQL; kept
+    # current by the daily _cron_refresh_ages on birthdays.
+    age = fields.Integer(string='Age', compute='_compute_age', store=True, index=True)
+    age_bracket = fields.Selection(
+        [(key, label) for key, label, _min_age in AGE_BRACKETS],
+        string='Age Bracket', compute='_compute_age', store=True, index=True,
+    )
     gender = fields.Selection([
         ('male', 'Male'),
         ('female', 'Female'),
@@ -35,7 +93,7 @@ class MedicalPatient(models.Model):
     country_id = fields.Many2one('res.country', string='Country')
     
     # Medical Information
-    doctor_id = fields.Many2one('medical.doctor', string='Primary Care Doctor')
+    doctor_id = fields.Many2one('medical.doctor', string='Primary Care Doctor', index='btree_not_null')
     blood_type = fields.Selection([
         ('A+', 'A+'), ('A-', 'A-'),
         ('B+', 'B+'), ('B-', 'B-'),
@@ -44,6 +102,8 @@ class MedicalPatient(models.Model):
     ], string='Blood Type')
     
     allergies = fields.Text(string='Allergies')
+    allergy_drug_ids = fields.Many2many(
+        'medical.drug', 'medical_patient_drug_allergy_rel', 'patient_id', 'drug_id', string='Drug Allergies')
     medical_history = fields.Text(string='Medical History')
     current_medications = fields.Text(string='Current Medications')
     
@@ -60,30 +120,370 @@ class MedicalPatient(models.Model):
     appointment_ids = fields.One2many('medical.appointment', 'patient_id', string='Appointments')
     medical_record_ids = fields.One2many('medical.record', 'patient_id', string='Medical Records')
     prescription_ids = fields.One2many('medical.prescription', 'patient_id', string='Prescriptions')
+    doctor_link_ids = fields.One2many('medical.doctor.patient', 'patient_id', string='Seen by Doctors')
     
     # Computed fields
-    appointment_count = fields.Integer(compute='_compute_appointment_count')
+    appointment_count = fields.Integer(compute='_compute_counts')
+    record_count = fields.Integer(compute='_compute_counts')
+    prescription_count = fields.Integer(compute='_compute_counts')
+    archived_appointment_count = fields.Integer(compute='_compute_counts')
+    archived_record_count = fields.Integer(compute='_compute_counts')
+
+    # Vital trends, kept by _refresh_vital_trends when records change
+    vitals_date = fields.Datetime(string='Last Vitals', readonly=True)
+    last_bp_systolic = fields.Integer(string='Last BP Systolic', readonly=True)
+    last_bp_diastolic = fields.Integer(string='Last BP Diastolic', readonly=True)
+    bp_systolic_avg = fields.Float(string='Systolic Average', readonly=True, digits=(16, 1),
+                                   help="Average of the last readings of the systolic pressure.")
+    bp_systolic_trend = fields.Float(string='Systolic Trend (mmHg / 30 days)', readonly=True, digits=(16, 1))
+    bp_rising = fields.Boolean(string='Rising Blood Pressure', readonly=True)
+    last_weight = fields.Float(string='Last Weight (kg)', readonly=True)
+    weight_change = fields.Float(string='Weight Change (kg)', readonly=True,
+                                 help="Difference with the previous weight measured.")
+
+    def init(self):
+        cr = self.env.cr
+        ensure_indexes(cr, self._table, [
+            # Birthday lookup of the daily age refresh
+            ('medical_patient_birthday_idx',
+             ['EXTRACT(MONTH FROM birth_date)', 'EXTRACT(DAY FROM birth_date)'], 'birth_date IS NOT NULL'),
+        ])
+
+        # Quick search: accent/case-insensitive trigram indexes, plus a
+        # prefix index for terms too short for trigrams.
+        ensure_unaccent_function(cr)
+        indexes = [('medical_patient_name_prefix_idx', [f'{NAME_SEARCH_EXPR} text_pattern_ops'], None)]
+        if ensure_extension(cr, 'pg_trgm'):
+            indexes += [
+                ('medical_patient_name_trgm_idx', [f'{NAME_SEARCH_EXPR} gin_trgm_ops'], None, 'gin'),
+                ('medical_patient_phone_digits_trgm_idx', [f'({PHONE_SEARCH_EXPR}) gin_trgm_ops'], None, 'gin'),
+                ('medical_patient_ref_trgm_idx', ['lower(patient_id) gin_trgm_ops'], None, 'gin'),
+                ('medical_patient_insurance_trgm_idx', ['lower(insurance_number) gin_trgm_ops'],
+                 'insurance_number IS NOT NULL', 'gin'),
+            ]
+        ensure_indexes(cr, self._table, indexes)
+        # Replaced by medical_patient_phone_digits_trgm_idx
+        cr.execute("DROP INDEX IF EXISTS medical_patient_phone_trgm_idx")
+        ensure_indexes(cr, self._table, [
+            # Rising blood pressure report, steepest first
+            ('medical_patient_bp_rising_idx', ['bp_systolic_trend DESC'], 'bp_rising'),
+        ])
+        # The records (and their archive) may not exist yet
+        self.pool.post_init(self._init_vital_trends)
 
     @api.depends('birth_date')
+    @profiled
     def _compute_age(self):
         for record in self:
             if record.birth_date:
                 today = fields.Date.today()
                 record.age = today.year - record.birth_date.year - \
                     ((today.month, today.day) < (record.birth_date.month, record.birth_date.day))
+                record.age_bracket = age_bracket_of(record.age)
             else:
                 record.age = 0
+                record.age_bracket = False
+
+    @api.model
+    def _refresh_ages(self, birthdays=None):
+        """Recompute the stored ages in SQL.
+
+        :param birthdays: ``(month, day)`` pairs of the patients to update,
+                          all patients with a birth date when ``None``
+        """
+        if birthdays is not None and not birthdays:
+            return
+        self.flush_model(['birth_date'])
+        bracket = " ".join(
+            f"WHEN src.age >= {min_age} THEN '{key}'" for key, _label, min_age in reversed(AGE_BRACKETS)
+        )
+        where = ""
+        params = [fields.Date.today()]
+        if birthdays is not None:
+            where = "AND (EXTRACT(MONTH FROM birth_date), EXTRACT(DAY FROM birth_date)) IN %s"
+            params.append(tuple(birthdays))
+        self.env.cr.execute(f"""
+            UPDATE medical_patient p
+            SET age = src.age, age_bracket = CASE {bracket} END
+            FROM (
+                SELECT id, date_part('year', age(%s, birth_date))::int AS age
+                FROM medical_patient
+                WHERE birth_date IS NOT NULL {where}
+            ) AS src
+            WHERE p.id = src.id AND (p.age IS DISTINCT FROM src.age OR p.age_bracket IS NULL)
+        """, params)
+        self.invalidate_model(['age', 'age_bracket'])
+
+    @api.model
+    def _init_vital_trends(self):
+        self.env.cr.execute("SELECT 1 FROM medical_patient WHERE vitals_date IS NOT NULL LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._refresh_vital_trends()
+
+    @api.model
+    def _refresh_vital_trends(self, patient_ids=None):
+        """Recompute the stored vital trends in one pass over the records.
+
+        Window functions rank the readings of each patient (archived records
+        included), the last ones are aggregated and regressed per patient,
+        and only the patients whose values changed are updated.
+
+        :param patient_ids: patients to update, all of them when ``None``
+        """
+        if patient_ids is not None and not patient_ids:
+            return
+        self.env['medical.record'].flush_model(
+            ['patient_id', 'record_date', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'weight'])
+        where = "WHERE patient_id = ANY(%(ids)s)" if patient_ids is not None else ""
+        patient_where = "WHERE pat.id = ANY(%(ids)s)" if patient_ids is not None else ""
+        readings = " UNION ALL ".join(f"""
+            SELECT patient_id, record_date, NULLIF(blood_pressure_systolic, 0) AS systolic,
+                   NULLIF(blood_pressure_diastolic, 0) AS diastolic, NULLIF(weight, 0) AS weight
+            FROM {table} {where}
+        """ for table in ('medical_record', 'medical_record_archive'))
+        columns = ['vitals_date', 'last_bp_systolic', 'last_bp_diastolic', 'bp_systolic_avg',
+                   'bp_systolic_trend', 'bp_rising', 'last_weight', 'weight_change']
+        self.env.cr.execute(f"""
+            WITH readings AS ({readings}),
+            bp AS (
+                SELECT patient_id, record_date, systolic, diastolic,
+                       row_number() OVER (PARTITION BY patient_id ORDER BY record_date DESC) AS rank
+                FROM readings
+                WHERE systolic IS NOT NULL
+            ),
+            bp_summary AS (
+                SELECT patient_id,
+                       (array_agg(systolic ORDER BY record_date DESC))[1] AS last_systolic,
+                       (array_agg(diastolic ORDER BY record_date DESC))[1] AS last_diastolic,
+                       AVG(systolic)::float AS systolic_avg,
+                       regr_slope(systolic, extract(epoch FROM record_date) / 86400.0) * 30 AS systolic_trend,
+                       COUNT(*) AS reading_count
+                FROM bp
+                WHERE rank <= %(readings)s
+                GROUP BY patient_id
+            ),
+            weight_summary AS (
+                SELECT DISTINCT ON (patient_id) patient_id, weight AS last_weight,
+                       weight - LAG(weight) OVER (PARTITION BY patient_id ORDER BY record_date) AS weight_change
+                FROM readings
+                WHERE weight IS NOT NULL
+                ORDER BY patient_id, record_date DESC
+            ),
+            summary AS (
+                SELECT pat.id,
+                       last_record.vitals_date,
+                       bp.last_systolic, bp.last_diastolic, bp.systolic_avg, bp.systolic_trend,
+                       COALESCE(bp.reading_count >= %(min_readings)s
+                                AND bp.systolic_trend >= %(slope)s
+                                AND bp.last_systolic >= %(min_systolic)s, FALSE) AS bp_rising,
+                       w.last_weight, w.weight_change
+                FROM medical_patient pat
+                LEFT JOIN (SELECT patient_id, MAX(record_date) AS vitals_date
+                           FROM readings GROUP BY patient_id) AS last_record ON last_record.patient_id = pat.id
+                LEFT JOIN bp_summary bp ON bp.patient_id = pat.id
+                LEFT JOIN weight_summary w ON w.patient_id = pat.id
+                {patient_where}
+            )
+            UPDATE medical_patient p
+            SET ({', '.join(columns)}) = (
+                s.vitals_date, s.last_systolic, s.last_diastolic, s.systolic_avg,
+                s.systolic_trend, s.bp_rising, s.last_weight, s.weight_change)
+            FROM summary s
+            WHERE p.id = s.id
+              AND ({', '.join(f'p.{column}' for column in columns)}) IS DISTINCT FROM (
+                s.vitals_date, s.last_systolic, s.last_diastolic, s.systolic_avg,
+                s.systolic_trend, s.bp_rising, s.last_weight, s.weight_change)
+        """, {
+            'ids': list(patient_ids or []),
+            'readings': TREND_READINGS,
+            'min_readings': RISING_BP_MIN_READINGS,
+            'slope': RISING_BP_SLOPE,
+            'min_systolic': RISING_BP_MIN_SYSTOLIC,
+        })
+        self.invalidate_model(columns)
+
+    @api.model
+    def _cron_refresh_ages(self):
+        """Age the patients whose birthday fell since the previous run."""
+        Param = self.env['ir.config_parameter'].sudo()
+        today = fields.Date.today()
+        last_run = fields.Date.to_date(Param.get_param(AGE_REFRESH_PARAM))
+        if not last_run or (today - last_run).days > 366:
+            self._refresh_ages()
+        elif last_run < today:
+            days = [last_run + timedelta(days=offset) for offset in range(1, (today - last_run).days + 1)]
+            birthdays = {(day.month, day.day) for day in days}
+            if (3, 1) in birthdays:
+                # Leap-day birthdays are celebrated on March 1st in common years
+                birthdays.add((2, 29))
+            self._refresh_ages(birthdays)
+        Param.set_param(AGE_REFRESH_PARAM, fields.Date.to_string(today))
+
+    @profiled
+    def _compute_counts(self):
+        # One grouped query per model for the whole batch, the relations are not loaded
+        patients = self._origin
+        for field_name, model_name in (
+            ('appointment_count', 'medical.appointment'),
+            ('record_count', 'medical.record'),
+            ('prescription_count', 'medical.prescription'),
+            ('archived_appointment_count', 'medical.appointment.archive'),
+            ('archived_record_count', 'medical.record.archive'),
+        ):
+            counts = dict(self.env[model_name]._read_group(
+                [('patient_id', 'in', patients.ids)], ['patient_id'], ['__count'])) if patients else {}
+            for patient in self:
+                patient[field_name] = counts.get(patient._origin, 0)
+
+    @profiled
+    def get_timeline(self, limit=20, cursor=None):
+        """Return one page of the patient's history, newest first.
+
+        Appointments, medical records and prescriptions are merged by a single
+        UNION query, each branch reading at most one page through its
+        ``(patient_id, date DESC)`` index. Pages are keyset-paginated on
+        ``(date, type, id)``: pass the ``next_cursor`` of a page to get the
+        next one, which costs the same however deep the history is. Archived
+        appointments and records are included; rows hidden by record rules
+        are left out of the page.
+
+        :return: ``{'items': [{'type', 'id', 'date', 'name', 'doctor', 'state', 'summary'}, ...],
+            'next_cursor': cursor of the next page or False}``
+        """
+        self.ensure_one()
+        params = {'patient': self.id, 'limit': limit + 1}
+        if cursor:
+            cursor_date, cursor_type, cursor_id = cursor.split('|')
+            params.update(cursor_date=cursor_date, cursor_type=cursor_type, cursor_id=int(cursor_id))
+        branches = []
+        for kind, model_name, date_field, state, summary in TIMELINE_SOURCES:
+            Model = self.env[model_name]
+            if not Model.check_access_rights('read', raise_exception=False):
+                continue
+            Model.flush_model(['patient_id', 'doctor_id', 'name', date_field])
+            keyset = ""
+            if cursor:
+                # The plain bound prunes the index range, the row comparison breaks ties
+                keyset = f"""
+                    AND t.{date_field} <= %(cursor_date)s
+                    AND (t.{date_field}::timestamp, '{kind}', t.id) < (%(cursor_date)s::timestamp, %(cursor_type)s, %(cursor_id)s)
+                """
+            branches.append(f"""
+                (SELECT t.{date_field}::timestamp AS date, '{kind}' AS kind, t.id, t.name,
+                        d.name AS doctor, {state} AS state, {summary} AS summary
+                 FROM {Model._table} t
+                 LEFT JOIN medical_doctor d ON d.id = t.doctor_id
+                 WHERE t.patient_id = %(patient)s {keyset}
+                 ORDER BY t.{date_field} DESC, t.id DESC
+                 LIMIT %(limit)s)
+            """)
+        if not branches:
+            return {'items': [], 'next_cursor': False}
+        self.env.cr.execute(f"""
+            SELECT * FROM ({" UNION ALL ".join(branches)}) AS timeline
+            ORDER BY date DESC, kind DESC, id DESC
+            LIMIT %(limit)s
+        """, params)
+        rows = self.env.cr.fetchall()
+        next_cursor = False
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_date, last_kind, last_id = rows[-1][:3]
+            next_cursor = f"{fields.Datetime.to_string(last_date)}|{last_kind}|{last_id}"
+
+        # Apply access rules while keeping the order
+        allowed = {kind: set() for kind, *_source in TIMELINE_SOURCES}
+        for kind, model_name, *_columns in TIMELINE_SOURCES:
+            ids = [row[2] for row in rows if row[1] == kind]
+            if ids and self.env[model_name].check_access_rights('read', raise_exception=False):
+                allowed[kind].update(self.env[model_name]._search([('id', 'in', ids)]))
+        items = [{
+            'type': kind,
+            'id': record_id,
+            'date': fields.Datetime.to_string(date),
+            'name': name,
+            'doctor': doctor,
+            'state': state,
+            'summary': summary,
+        } for date, kind, record_id, name, doctor, state, summary in rows if record_id in allowed[kind]]
+        return {'items': items, 'next_cursor': next_cursor}
+
+    @api.model_create_multi
+    @profiled
+    def create(self, vals_list):
+        # Reserve the references of the whole batch in one sequence call
+        to_number = [vals for vals in vals_list if vals.get('patient_id', 'New') == 'New']
+        numbers = self.env['ir.sequence']._next_batch_by_code('medical.patient', len(to_number))
+        for vals, number in zip(to_number, numbers):
+            vals['patient_id'] = number or 'New'
+        return super().create(vals_list)
+
+    @api.model
+    @profiled
+    def _quick_search_ids(self, term, limit=8):
+        """Return the ids of the patients best matching ``term``, best first.
+
+        ``term`` is matched, ignoring case and accents, against the name, the
+        patient reference, the insurance number and the phone numbers (digits
+        only). Name prefixes rank first, then trigram similarity.
+        """
+        term = (term or '').strip()
+        if not term:
+            return []
+        if not self.env.registry.has_trigram:
+            return list(self._search([('name', 'ilike', term)], limit=limit))
+        self.flush_model(['name', 'patient_id', 'insurance_number', 'phone', 'mobile'])
+        cr = self.env.cr
+        cr.execute("SELECT medical_unaccent(%s)", (term,))
+        folded = cr.fetchone()[0]
+        pattern = re.sub(r'([\\%_])', r'\\\1', folded)
+        params = {'folded': folded, 'prefix': pattern + '%', 'limit': limit}
+        if len(folded) < 3:
+            # Too short for trigrams: name prefix only (btree index)
+            where = f"{NAME_SEARCH_EXPR} LIKE %(prefix)s"
+        else:
+            params['contains'] = '%' + pattern + '%'
+            conditions = [
+                f"{NAME_SEARCH_EXPR} LIKE %(contains)s",
+                "lower(patient_id) LIKE %(contains)s",
+                "(insurance_number IS NOT NULL AND lower(insurance_number) LIKE %(contains)s)",
+            ]
+            digits = re.sub(r'\D', '', term)
+            if len(digits) >= 3:
+                params['digits'] = '%' + digits + '%'
+                conditions.append(f"{PHONE_SEARCH_EXPR} LIKE %(digits)s")
+            where = " OR ".join(conditions)
+        cr.execute(f"""
+            SELECT id FROM medical_patient
+            WHERE {where}
+            ORDER BY {NAME_SEARCH_EXPR} LIKE %(prefix)s DESC,
+                     similarity({NAME_SEARCH_EXPR}, %(folded)s) DESC,
+                     name, id
+            LIMIT %(limit)s
+        """, params)
+        ids = [row[0] for row in cr.fetchall()]
+        # Apply access rules while keeping the ranking
+        allowed = set(self._search([('id', 'in', ids)])) if ids else set()
+        return [patient_id for patient_id in ids if patient_id in allowed]
 
-    @api.depends('appointment_ids')
-    def _compute_appointment_count(self):
-        for patient in self:
-            patient.appointment_count = len(patient.appointment_ids)
+    @api.model
+    def quick_search(self, term, limit=8):
+        """Ranked typeahead: ``[{'id', 'name', 'patient_id', 'phone'}, ...]``."""
+        patients = self.browse(self._quick_search_ids(term, limit=limit))
+        return patients.read(['name', 'patient_id', 'phone'])
 
     @api.model
-    def create(self, vals):
-        if vals.get('patient_id', 'New') == 'New':
-            vals['patient_id'] = self.env['ir.sequence'].next_by_code('medical.patient') or 'New'
-        return super().create(vals)
+    @profiled
+    def _name_search(self, name, domain=None, operator='ilike', limit=None, order=None):
+        # name_search always passes the default order: the ranking replaces it
+        if not name or operator != 'ilike' or (order and order != self._order):
+            return super()._name_search(name, domain, operator, limit, order)
+        if not domain:
+            return self._quick_search_ids(name, limit=limit)
+        # Over-fetch ranked candidates, then keep those matching the domain
+        ids = self._quick_search_ids(name, limit=limit * 4 if limit else None)
+        allowed = set(self._search(domain + [('id', 'in', ids)])) if ids else set()
+        return [patient_id for patient_id in ids if patient_id in allowed][:limit]
 
     def action_view_appointments(self):
         return {
@@ -93,4 +493,51 @@ class MedicalPatient(models.Model):
             'res_model': 'medical.appointment',
             'domain': [('patient_id', '=', self.id)],
             'context': {'default_patient_id': self.id}
+        }
+
+    def action_view_records(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Patient Medical Records',
+            'view_mode': 'tree,form',
+            'res_model': 'medical.record',
+            'domain': [('patient_id', '=', self.id)],
+            'context': {'default_patient_id': self.id}
+        }
+
+    def action_view_archived_appointments(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Archived Appointments',
+            'view_mode': 'tree,form',
+            'res_model': 'medical.appointment.archive',
+            'domain': [('patient_id', '=', self.id)],
+        }
+
+    def action_view_archived_records(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Archived Medical Records',
+            'view_mode': 'tree,form',
+            'res_model': 'medical.record.archive',
+            'domain': [('patient_id', '=', self.id)],
+        }
+
+    def action_view_vital_trend(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Vitals Trend',
+            'view_mode': 'graph,tree',
+            'res_model': 'medical.vital.trend',
+            'domain': [('patient_id', '=', self.id)],
+        }
+
+    def action_view_prescriptions(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Patient Prescriptions',
+            'view_mode': 'tree,form',
+            'res_model': 'medical.prescription',
+            'domain': [('patient_id', '=', self.id)],
+            'context': {'default_patient_id': self.id}
         }
\ No newline at end of file
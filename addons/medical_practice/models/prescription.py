@@ -1,10 +1,29 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from .sql_utils import ensure_indexes
+from .medical_drug import normalize
+from .medical_drug_interaction import SEVERITIES, BLOCKING_SEVERITIES
+from .medical_perf import profiled
+from collections import defaultdict
+import re
+
+# Prescriptions whose medications the patient is currently taking
+ACTIVE_STATES = ('prescribed', 'dispensed')
 
 class MedicalPrescription(models.Model):
     _name = 'medical.prescription'
     _description = 'Medical Prescription'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = [
+        'mail.thread', 'mail.activity.mixin', 'medical.dashboard.stat.mixin', 'medical.state.transition.mixin',
+    ]
     _rec_name = 'name'
+    _stat_column = 'prescription_count'
+    _stat_date_field = 'prescription_date'
+    _state_transitions = {
+        'prescribed': ('draft',),
+        'dispensed': ('prescribed',),
+        'completed': ('dispensed',),
+    }
 
     name = fields.Char(
         string='Prescription Reference', 
@@ -14,10 +33,11 @@ class MedicalPrescription(models.Model):
         default='New'
     )
     
+    # patient_id and doctor_id are covered by the composite indexes of init()
     patient_id = fields.Many2one('medical.patient', string='Patient', required=True)
     doctor_id = fields.Many2one('medical.doctor', string='Prescribing Doctor', required=True)
-    appointment_id = fields.Many2one('medical.appointment', string='Appointment')
-    prescription_date = fields.Date(string='Prescription Date', default=fields.Date.today, required=True)
+    appointment_id = fields.Many2one('medical.appointment', string='Appointment', index='btree_not_null')
+    prescription_date = fields.Date(string='Prescription Date', default=fields.Date.today, required=True, index=True)
     
     state = fields.Selection([
         ('draft', 'Draft'),
@@ -28,20 +48,145 @@ class MedicalPrescription(models.Model):
     
     prescription_line_ids = fields.One2many('medical.prescription.line', 'prescription_id', string='Medications')
     notes = fields.Text(string='Additional Instructions')
+    interaction_warning = fields.Text(string='Interaction Warnings', readonly=True, copy=False)
+
+    def init(self):
+        ensure_indexes(self.env.cr, self._table, [
+            ('medical_prescription_patient_date_idx', ['patient_id', 'prescription_date DESC'], None),
+            ('medical_prescription_doctor_date_idx', ['doctor_id', 'prescription_date DESC'], None),
+            # Prescriptions still to be handled
+            ('medical_prescription_open_date_idx', ['prescription_date'], "state IN ('draft', 'prescribed')"),
+        ])
+
+    @api.model_create_multi
+    @profiled
+    def create(self, vals_list):
+        # Reserve the references of the whole batch in one sequence call
+        to_number = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        numbers = self.env['ir.sequence']._next_batch_by_code('medical.prescription', len(to_number))
+        for vals, number in zip(to_number, numbers):
+            vals['name'] = number or 'New'
+        return super().create(vals_list)
+
+    @profiled
+    def _get_safety_issues(self):
+        """Check the medications against the patient's allergies and treatments.
+
+        The whole batch is checked with a fixed number of queries: the lines
+        and allergies are prefetched, the drugs of the patients' active
+        prescriptions come from one query and every pair is looked up at once
+        in ``medical.drug.interaction``.
+
+        Only the structured ``allergy_drug_ids`` block; a drug named as a
+        whole word in the free-text allergies gives a warning.
+
+        :return: ``{prescription: [(blocking, message), ...]}`` for the
+            prescriptions with at least one issue
+        """
+        Drug = self.env['medical.drug']
+        # Drugs of each prescription; free-text lines are matched on the catalog
+        drugs = {}
+        for prescription in self:
+            drug_ids = set()
+            for line in prescription.prescription_line_ids:
+                drug_id = line.medication_id.id or Drug._catalog_resolve(line.medication_name)
+                if drug_id:
+                    drug_ids.add(drug_id)
+            drugs[prescription] = drug_ids
+        every_drug = set().union(*drugs.values()) if drugs else set()
+        if not every_drug:
+            return {}
+
+        # Current treatments: the active prescriptions, free-text lines
+        # included, and the medications noted on the patient's file
+        self.env['medical.prescription.line'].flush_model(['prescription_id', 'medication_id', 'medication_name'])
+        self.flush_model(['patient_id', 'state'])
+        self.env.cr.execute("""
+            SELECT rx.patient_id, l.medication_id, l.medication_name, rx.name
+            FROM medical_prescription_line l
+            JOIN medical_prescription rx ON rx.id = l.prescription_id
+            WHERE rx.patient_id IN %s AND rx.state IN %s AND rx.id NOT IN %s
+        """, (tuple(self.patient_id.ids), ACTIVE_STATES, tuple(self.ids)))
+        current = defaultdict(dict)
+        for patient_id, drug_id, medication_name, reference in self.env.cr.fetchall():
+            drug_id = drug_id or Drug._catalog_resolve(medication_name)
+            if drug_id:
+                current[patient_id].setdefault(drug_id, reference)
+        for patient in self.patient_id:
+            for drug_id in Drug._catalog_resolve_list(patient.current_medications):
+                current[patient.id].setdefault(drug_id, _("patient file"))
+
+        interactions = self.env['medical.drug.interaction']._find(
+            every_drug, set().union(*(set(taken) for taken in current.values())))
+        severity_labels = dict(SEVERITIES)
+        drug_names = {drug.id: drug.name for drug in Drug.browse(every_drug | set(
+            drug_id for taken in current.values() for drug_id in taken))}
+
+        issues = {}
+        for prescription, drug_ids in drugs.items():
+            patient = prescription.patient_id
+            found = []
+            allergy_ids = set(patient.allergy_drug_ids.ids)
+            allergy_text = normalize(patient.allergies)
+            for drug_id in sorted(drug_ids, key=drug_names.get):
+                if drug_id in allergy_ids:
+                    found.append((True, _("%(patient)s is allergic to %(drug)s.",
+                                          patient=patient.name, drug=drug_names[drug_id])))
+                elif allergy_text and re.search(
+                        r'\b%s\b' % re.escape(normalize(drug_names[drug_id])), allergy_text):
+                    # The free-text allergies only warn: "sulfamides" must
+                    # not block every drug named after one of its words
+                    found.append((False, _("%(patient)s's allergies mention %(drug)s.",
+                                           patient=patient.name, drug=drug_names[drug_id])))
+            taken = current.get(patient.id, {})
+            pairs = {tuple(sorted((first, second)))
+                     for first in drug_ids for second in drug_ids | set(taken) if first != second}
+            for pair in sorted(pairs):
+                if pair not in interactions:
+                    continue
+                severity, description = interactions[pair]
+                first, second = pair
+                # Reference of the active prescription the other drug comes from
+                source = next((taken[drug_id] for drug_id in pair if drug_id not in drug_ids), None)
+                message = _("%(severity)s interaction: %(first)s + %(second)s", severity=severity_labels[severity],
+                            first=drug_names[first], second=drug_names[second])
+                if source:
+                    message += _(" (current treatment: %s)", source)
+                if description:
+                    message += f" - {description}"
+                found.append((severity in BLOCKING_SEVERITIES, message))
+            if found:
+                issues[prescription] = found
+        return issues
+
+    def action_prescribe(self):
+        issues = self._get_safety_issues()
+        blocking = {prescription: [message for block, message in found if block]
+                    for prescription, found in issues.items()}
+        blocking = {prescription: messages for prescription, messages in blocking.items() if messages}
+        if blocking:
+            raise UserError("\n\n".join(
+                f"{prescription.name}:\n" + "\n".join(f"- {message}" for message in messages)
+                for prescription, messages in blocking.items()
+            ))
+        for prescription in self:
+            found = issues.get(prescription, [])
+            prescription.interaction_warning = "\n".join(message for _block, message in found) or False
+        self._transition('prescribed')
+
+    def action_dispense(self):
+        self._transition('dispensed')
 
-    @api.model
-    def create(self, vals):
-        if vals.get('name', 'New') == 'New':
-            vals['name'] = self.env['ir.sequence'].next_by_code('medical.prescription') or 'New'
-        return super().create(vals)
+    def action_complete(self):
+        self._transition('completed')
 
 class MedicalPrescriptionLine(models.Model):
     _name = 'medical.prescription.line'
     _description = 'Prescription Line'
     _rec_name = 'medication_name'
 
-    prescription_id = fields.Many2one('medical.prescription', string='Prescription', required=True, ondelete='cascade')
-    medication_id = fields.Many2one('medical.drug', string='Medication (product)')
+    prescription_id = fields.Many2one('medical.prescription', string='Prescription', required=True, ondelete='cascade', index=True)
+    medication_id = fields.Many2one('medical.drug', string='Medication (product)', index='btree_not_null')
     medication_name = fields.Char(string='Medication Name', required=True)
     dosage = fields.Char(string='Dosage', required=True)
     frequency = fields.Char(string='Frequency', required=True)
@@ -50,12 +195,15 @@ class MedicalPrescriptionLine(models.Model):
     quantity = fields.Float(string='Quantity', default=1.0)
 
     @api.onchange('medication_id')
+    @profiled
     def _onchange_medication_id(self):
         if self.medication_id:
-            self.medication_name = self.medication_id.name
-            if self.medication_id.default_dosage:
-                self.dosage = self.medication_id.default_dosage
-            if self.medication_id.default_frequency:
-                self.frequency = self.medication_id.default_frequency
-            if self.medication_id.default_duration:
-                self.duration = self.medication_id.default_duration
\ No newline at end of file
+            # Served from the drug catalog cache, archived drugs are read
+            drug = self.env['medical.drug']._catalog_entry(self.medication_id.id) or self.medication_id
+            self.medication_name = drug.name
+            if drug.default_dosage:
+                self.dosage = drug.default_dosage
+            if drug.default_frequency:
+                self.frequency = drug.default_frequency
+            if drug.default_duration:
+                self.duration = drug.default_duration
\ No newline at end of file
@@ -0,0 +1,92 @@
+from odoo.tools import sql
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def ensure_indexes(cr, table, indexes):
+    """Create the missing indexes of ``table``.
+
+    ``indexes`` is a list of ``(name, expressions, where)`` or
+    ``(name, expressions, where, method)`` tuples, where ``expressions`` are
+    SQL index expressions (e.g. ``'record_date DESC'``), ``where`` an
+    optional predicate turning the index into a partial one and ``method``
+    the index access method (btree by default).
+    """
+    for name, expressions, where, *method in indexes:
+        if not sql.index_exists(cr, name):
+            sql.create_index(cr, name, table, expressions, method=method[0] if method else 'btree', where=where or '')
+
+
+def ensure_extension(cr, name):
+    """Create the PostgreSQL extension ``name`` if possible, return whether it is installed."""
+    try:
+        with cr.savepoint():
+            cr.execute(f'CREATE EXTENSION IF NOT EXISTS "{name}"')
+        return True
+    except Exception:
+        _logger.warning("PostgreSQL extension %s is not available", name)
+        return False
+
+
+def ensure_unaccent_function(cr):
+    """Create ``medical_unaccent(text)``: lowercase and strip accents.
+
+    The function is IMMUTABLE so it can be used in index expressions. It
+    relies on the ``unaccent`` extension when available and falls back to
+    ``translate()`` over the Latin accented letters otherwise.
+    """
+    cr.execute("SELECT 1 FROM pg_proc WHERE proname = 'medical_unaccent'")
+    if cr.fetchone():
+        return
+    if ensure_extension(cr, 'unaccent'):
+        body = "SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1))"
+    else:
+        body = ("SELECT translate(lower($1), 'àáâãäåçèéêëìíîïñòóôõöùúûüýÿœæ', "
+                "'aaaaaaceeeeiiiinooooouuuuyyoa')")
+    cr.execute(f"""
+        CREATE FUNCTION medical_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $$ {body} $$
+    """)
+
+
+def table_columns(cr, table):
+    """Return ``{column: SQL type}`` of ``table``, in column order."""
+    cr.execute("""
+        SELECT attname, format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """, (table,))
+    return dict(cr.fetchall())
+
+
+def ensure_archive_table(cr, table, date_column):
+    """Create or update ``<table>_archive``, partitioned by year on ``date_column``.
+
+    The archive has every column of ``table``, including the ones added to
+    it later, but none of its constraints, so archived rows keep their ids
+    and references. Partitions are added by ``ensure_archive_partition``.
+    """
+    archive = f'{table}_archive'
+    if not sql.table_exists(cr, archive):
+        cr.execute(f'CREATE TABLE "{archive}" (LIKE "{table}") PARTITION BY RANGE ("{date_column}")')
+        cr.execute(f'CREATE INDEX "{archive}_id_idx" ON "{archive}" (id)')
+        cr.execute(f'CREATE INDEX "{archive}_patient_date_idx" ON "{archive}" (patient_id, "{date_column}" DESC)')
+        _logger.info("Archive table %s created", archive)
+    archive_columns = table_columns(cr, archive)
+    for column, column_type in table_columns(cr, table).items():
+        if column not in archive_columns:
+            cr.execute(f'ALTER TABLE "{archive}" ADD COLUMN "{column}" {column_type}')
+    return archive
+
+
+def ensure_archive_partition(cr, archive, year):
+    """Create the partition of ``archive`` holding the rows of ``year``."""
+    partition = f'{archive}_{year}'
+    if not sql.table_exists(cr, partition):
+        cr.execute(
+            f'CREATE TABLE "{partition}" PARTITION OF "{archive}" FOR VALUES FROM (%s) TO (%s)',
+            (f'{year}-01-01', f'{year + 1}-01-01'))
+    return partition
@@ -0,0 +1,12 @@
+from . import test_appointment_overlap
+from . import test_sequence_batch
+from . import test_doctor_patient
+from . import test_benchmark
+from . import test_export
+from . import test_state_transition
+from . import test_drug_catalog
+from . import test_prescription_safety
+from . import test_job
+from . import test_dashboard
+from . import test_patient_search
+from . import test_reminder
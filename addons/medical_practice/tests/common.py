@@ -0,0 +1,26 @@
+from odoo.tests.common import TransactionCase
+from datetime import datetime
+
+
+class MedicalTestCase(TransactionCase):
+    """Doctors and a patient shared by the medical_practice tests."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+        cls.doctor = cls.env['medical.doctor'].create({'name': 'Dr. House'})
+        cls.other_doctor = cls.env['medical.doctor'].create({'name': 'Dr. Watson'})
+        cls.patient = cls.env['medical.patient'].create({'name': 'Jean Dupont', 'birth_date': '1980-01-01'})
+        # A Monday far enough in the future to be free
+        cls.monday = datetime(2035, 1, 1, 9, 0)
+
+    @classmethod
+    def _book(cls, start, duration=1.0, doctor=None, **vals):
+        return cls.env['medical.appointment'].create(dict({
+            'patient_id': cls.patient.id,
+            'doctor_id': (doctor or cls.doctor).id,
+            'appointment_date': start,
+            'duration': duration,
+            'appointment_type': 'consultation',
+        }, **vals))
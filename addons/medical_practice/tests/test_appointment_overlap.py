@@ -0,0 +1,72 @@
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+from odoo.tools import mute_logger, sql
+from datetime import timedelta
+from psycopg2 import IntegrityError
+from psycopg2.errors import ExclusionViolation
+from .common import MedicalTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestAppointmentOverlap(MedicalTestCase):
+
+    def test_overlap_rejected(self):
+        self._book(self.monday)
+        with self.assertRaises(ValidationError):
+            self._book(self.monday + timedelta(minutes=30))
+
+    def test_adjacent_and_other_doctor_allowed(self):
+        self._book(self.monday)
+        self._book(self.monday + timedelta(hours=1))
+        self._book(self.monday, doctor=self.other_doctor)
+
+    def test_overlap_within_batch(self):
+        with self.assertRaises(ValidationError):
+            self.env['medical.appointment'].create([{
+                'patient_id': self.patient.id,
+                'doctor_id': self.doctor.id,
+                'appointment_date': self.monday + timedelta(minutes=offset),
+                'appointment_type': 'consultation',
+            } for offset in (0, 30)])
+
+    def test_cancelled_frees_the_slot(self):
+        appointment = self._book(self.monday)
+        appointment.action_cancel()
+        self._book(self.monday)
+
+    def test_move_onto_booked_slot(self):
+        self._book(self.monday)
+        later = self._book(self.monday + timedelta(hours=2))
+        with self.assertRaises(ValidationError):
+            later.write({'appointment_date': self.monday + timedelta(minutes=15)})
+
+    def test_concurrent_booking(self):
+        """The database refuses a double booking the ORM check did not see.
+
+        A concurrent transaction cannot see the other one's uncommitted
+        row; inserting behind the ORM's back stands in for it here.
+        """
+        if not sql.constraint_definition(self.env.cr, 'medical_appointment', 'medical_appointment_doctor_period_excl'):
+            self.skipTest("btree_gist is not available")
+        self._book(self.monday)
+        self.env.flush_all()
+        with self.assertRaises(ExclusionViolation), mute_logger('odoo.sql_db'), self.env.cr.savepoint():
+            self.env.cr.execute("""
+                INSERT INTO medical_appointment
+                    (name, patient_id, doctor_id, appointment_date, duration, end_time, state, appointment_type)
+                VALUES ('CONCURRENT', %s, %s, %s, 1.0, %s, 'scheduled', 'consultation')
+            """, (self.patient.id, self.doctor.id, self.monday + timedelta(minutes=30),
+                  self.monday + timedelta(minutes=90)))
+
+    def test_negative_duration(self):
+        with self.assertRaises(IntegrityError), mute_logger('odoo.sql_db'), self.env.cr.savepoint():
+            self._book(self.monday, duration=-1.0)
+            self.env.flush_all()
+
+    def test_find_free_slots(self):
+        self._book(self.monday + timedelta(hours=1))
+        slots = self.env['medical.appointment'].find_free_slots(
+            [self.doctor.id], (self.monday, self.monday + timedelta(hours=4)), 1.0)
+        self.assertEqual([start for start, _end in slots[self.doctor.id]], [
+            self.monday, self.monday + timedelta(hours=2), self.monday + timedelta(hours=3),
+        ])
@@ -0,0 +1,42 @@
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('medical_benchmark', '-standard', 'post_install', '-at_install')
+class TestMedicalBenchmark(TransactionCase):
+    """Load benchmark run by the test runner: ``--test-tags medical_benchmark``.
+
+    Drives the cases of ``medical.benchmark`` against the baselines stored
+    in the database. A database with little data is seeded first, in the
+    test transaction, so nothing is left behind.
+    """
+    # Dataset seeded when the database holds fewer appointments
+    dataset = {
+        'patients': 2000,
+        'doctors': 20,
+        'appointments': 20000,
+        'records': 4000,
+        'prescriptions': 10000,
+    }
+    repeat = 5
+    tolerance = 0.25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if cls.env['medical.appointment'].search_count([]) < cls.dataset['appointments'] // 2:
+            cls.env['medical.data.generator'].generate(**cls.dataset)
+
+    def test_benchmark(self):
+        results = self.env['medical.benchmark'].run(repeat=self.repeat, tolerance=self.tolerance)
+        for result in results:
+            with self.subTest(case=result['case']):
+                self.assertFalse(result['regression'], "%(case)s took %(median_ms)s ms, baseline %(baseline_ms)s ms" % result)
+
+    def test_upcoming_agenda(self):
+        """The seeded agenda has upcoming appointments for the reminder and free-slot cases."""
+        upcoming = self.env['medical.appointment'].search_count([
+            ('appointment_date', '>', fields.Datetime.now()), ('state', 'in', ('scheduled', 'confirmed')),
+        ])
+        self.assertTrue(upcoming)
@@ -0,0 +1,47 @@
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import new_test_user
+from datetime import date
+from .common import MedicalTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestDashboard(MedicalTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Dashboard = cls.env['medical.dashboard']
+        cls.alice = new_test_user(cls.env, login='medical_dashboard_alice')
+        cls.bob = new_test_user(cls.env, login='medical_dashboard_bob')
+
+    def test_series_parameters(self):
+        series = self.Dashboard.get_series(date_from='2035-01-01', date_to='2035-03-31', bucket='week')
+        self.assertEqual((series['date_from'], series['date_to'], series['bucket']),
+                         ('2035-01-01', '2035-03-31', 'week'))
+        with self.assertRaises(UserError):
+            self.Dashboard.get_series(bucket='year')
+        with self.assertRaises(UserError):
+            self.Dashboard.get_series(date_from='2035-02-01', date_to='2035-01-01')
+
+    def test_series_see_uncommitted_changes(self):
+        def count(series):
+            return sum(row['count'] for row in series['blood_types'] if row['blood_type'] == 'AB-')
+
+        before = count(self.Dashboard.get_series())
+        self.env['medical.patient'].create({'name': 'Marie Curie', 'birth_date': '1967-11-07', 'blood_type': 'AB-'})
+        self.assertFalse(self.env['medical.cache.version'].get(['medical.patient'])[1])
+        self.assertEqual(count(self.Dashboard.get_series()), before + 1)
+
+    def test_range_is_per_user(self):
+        Chart = self.env['medical.dashboard.chart']
+        Chart.with_user(self.alice).create({
+            'chart': 'patients_date', 'date_from': '2035-01-01', 'date_to': '2035-06-30', 'bucket': 'week',
+        })
+        alice = Chart.with_user(self.alice).create({'chart': 'patients_date'})
+        self.assertEqual((alice.date_from, alice.bucket), (date(2035, 1, 1), 'week'))
+        bob = Chart.with_user(self.bob).create({'chart': 'patients_date'})
+        self.assertEqual((bob.date_from, bob.bucket), (False, 'month'))
+        action = alice.action_open()
+        self.assertEqual(action['domain'], [('date', '>=', date(2035, 1, 1)), ('date', '<=', date(2035, 6, 30))])
+        self.assertEqual(action['context'], {'graph_groupbys': ['date:week']})
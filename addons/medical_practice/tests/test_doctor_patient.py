@@ -0,0 +1,20 @@
+from odoo.tests import tagged
+from datetime import timedelta
+from .common import MedicalTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestDoctorPatientLinks(MedicalTestCase):
+
+    def test_patient_count(self):
+        first = self._book(self.monday)
+        second = self._book(self.monday + timedelta(hours=1))
+        self.assertEqual(self.doctor.patient_count, 1)
+        link = self.env['medical.doctor.patient'].search([('doctor_id', '=', self.doctor.id)])
+        self.assertEqual(link.appointment_count, 2)
+        first.unlink()
+        self.assertEqual(self.doctor.patient_count, 1)
+        second.write({'doctor_id': self.other_doctor.id})
+        self.assertEqual(self.doctor.patient_count, 0)
+        self.assertEqual(self.other_doctor.patient_count, 1)
+        self.assertFalse(link.exists())
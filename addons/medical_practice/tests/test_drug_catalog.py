@@ -0,0 +1,33 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestDrugCatalog(TransactionCase):
+
+    def test_changes_seen_by_their_transaction(self):
+        Drug = self.env['medical.drug']
+        drug = Drug.create({'name': 'Amoxicilline acide clavulanique', 'code': 'AMC-1'})
+        self.assertIn(drug.id, [drug_id for drug_id, _name in Drug.name_search('clav')])
+        self.assertEqual(Drug._catalog_resolve('amc-1'), drug.id)
+        drug.write({'name': 'Augmentin'})
+        self.assertEqual(Drug._catalog_resolve('augmentin'), drug.id)
+        drug.active = False
+        self.assertIsNone(Drug._catalog_entry(drug.id))
+
+    def test_dirty_transaction_not_cached(self):
+        Version = self.env['medical.cache.version']
+        self.assertTrue(Version.get(['medical.drug'])[1] or self.env.cr.postcommit.data)
+        self.env['medical.drug'].create({'name': 'Placebo'})
+        self.assertFalse(Version.get(['medical.drug'])[1])
+
+    def test_name_search_substring_fallback(self):
+        Drug = self.env['medical.drug']
+        amoxicillin = Drug.create({'name': 'Amoxicillin'})
+        word_start = Drug.create({'name': 'Cillin-Amox'})
+        results = [drug_id for drug_id, _name in Drug.name_search('cillin')]
+        # Word starts first, then the other substrings, without duplicates
+        self.assertEqual(results[:1], [word_start.id])
+        self.assertIn(amoxicillin.id, results)
+        self.assertEqual(len(results), len(set(results)))
+        self.assertEqual(len(Drug.name_search('cillin', limit=1)), 1)
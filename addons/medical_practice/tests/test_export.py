@@ -0,0 +1,64 @@
+from odoo.exceptions import UserError, ValidationError
+from odoo.tests import tagged
+from datetime import timedelta
+from .common import MedicalTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestIncrementalExport(MedicalTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.appointments = cls._book(cls.monday) | cls._book(cls.monday + timedelta(hours=1))
+
+    def _export(self, **kwargs):
+        Export = self.env['medical.export']
+        self.env.flush_all()
+        columns, chunks = Export.iter_chunks('appointments', incremental=True, **kwargs)
+        id_index = columns.index('id')
+        return {row[id_index] for rows in chunks for row in rows}
+
+    def _set_write_date(self, records, write_date):
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE medical_appointment SET write_date = %s WHERE id IN %s",
+                            (write_date, tuple(records.ids)))
+        records.invalidate_recordset(['write_date'])
+
+    def test_rows_exported_once(self):
+        self.assertTrue(set(self.appointments.ids) <= self._export())
+        self.assertFalse(self._export() & set(self.appointments.ids))
+
+    def test_changed_rows_exported_again(self):
+        self._export()
+        changed = self.appointments[0]
+        # Written again by a later transaction
+        self.env.cr.execute("SELECT (now() AT TIME ZONE 'UTC') + interval '1 second'")
+        self._set_write_date(changed, self.env.cr.fetchone()[0])
+        self.assertEqual(self._export() & set(self.appointments.ids), {changed.id})
+
+    def test_late_commit_not_skipped(self):
+        """A row committed after an export, dated before its newest row, is still exported."""
+        self._export()
+        late = self._book(self.monday + timedelta(hours=3))
+        # Dated at the start of the oldest transaction open during the export
+        self._set_write_date(late, self.env['medical.export'].get_watermark('appointments'))
+        self.assertIn(late.id, self._export())
+
+    def test_range_not_incremental(self):
+        """A date range cannot move the dataset watermark past the rows outside of it."""
+        outside = self._book(self.monday + timedelta(days=7))
+        with self.assertRaises(UserError):
+            self._export(date_from=self.monday.date(), date_to=self.monday.date())
+        with self.assertRaises(ValidationError):
+            self.env['medical.export.wizard'].create({
+                'dataset': 'appointments', 'incremental': True, 'date_from': self.monday.date(),
+            })
+        self.assertLessEqual(set((self.appointments | outside).ids), self._export())
+
+    def test_attachment_streamed(self):
+        result = self.env['medical.export']._export_attachment('appointments')
+        attachment = self.env['ir.attachment'].browse(result['attachment_id'])
+        self.assertEqual(attachment.file_size, len(attachment.raw))
+        self.assertTrue(attachment.raw.startswith(b'id,name,appointment_date'))
+        self.assertEqual(attachment.raw.count(b'\n') - 1, self.env['medical.appointment'].search_count([]))
@@ -0,0 +1,90 @@
+from odoo import fields
+from odoo.exceptions import AccessError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase, new_test_user
+from psycopg2 import errorcodes
+from datetime import timedelta
+from unittest.mock import patch
+
+
+class SerializationFailure(Exception):
+    pgcode = errorcodes.SERIALIZATION_FAILURE
+
+
+@tagged('post_install', '-at_install')
+class TestJob(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Job = cls.env['medical.job']
+        cls.user = new_test_user(cls.env, login='medical_job_user', groups='medical_practice.group_medical_user')
+        cls.manager = new_test_user(cls.env, login='medical_job_manager',
+                                    groups='medical_practice.group_medical_manager')
+
+    def _enqueue(self, **kwargs):
+        return self.Job.with_user(self.user).enqueue(self.env['medical.dashboard.stat'], '_rebuild', **kwargs).sudo()
+
+    def _fail(self, job, error):
+        job.write({'state': 'running', 'attempts': job.attempts + 1})
+        try:
+            raise error
+        except Exception as caught:
+            job._handle_failure(caught)
+
+    def test_only_listed_methods(self):
+        with self.assertRaises(AccessError):
+            self.Job.with_user(self.user).enqueue(self.env['res.users'], 'write', {'active': False})
+        with self.assertRaises(AccessError):
+            self.Job.enqueue(self.env['medical.dashboard.stat'], 'unlink')
+        job = self._enqueue()
+        self.assertEqual(job.user_id, self.user)
+
+    def test_call_is_immutable(self):
+        job = self._enqueue()
+        with self.assertRaises(AccessError):
+            job.write({'user_id': self.env.ref('base.user_root').id})
+        with self.assertRaises(AccessError):
+            job.write({'method_name': 'unlink'})
+
+    def test_manager_cannot_write(self):
+        job = self._enqueue()
+        with self.assertRaises(AccessError):
+            job.with_user(self.manager).write({'state': 'cancelled'})
+        job.with_user(self.manager).action_cancel()
+        self.assertEqual(job.state, 'cancelled')
+        with self.assertRaises(AccessError):
+            job.with_user(self.user).action_requeue()
+        job.with_user(self.manager).action_requeue()
+        self.assertEqual(job.state, 'pending')
+
+    def test_retry_counts_attempts(self):
+        job = self._enqueue(max_attempts=2)
+        self._fail(job, SerializationFailure())
+        self.assertEqual((job.state, job.attempts), ('pending', 1))
+        self._fail(job, SerializationFailure())
+        self.assertEqual((job.state, job.attempts), ('failed', 2))
+
+    def test_last_attempt_fails(self):
+        job = self._enqueue(max_attempts=1)
+        self._fail(job, ValueError("boom"))
+        self.assertEqual(job.state, 'failed')
+        self.assertIn("boom", job.error)
+
+    def test_heartbeat_keeps_long_job(self):
+        old = fields.Datetime.now() - timedelta(hours=2)
+        alive, stale = self._enqueue(), self._enqueue()
+        (alive | stale).write({'state': 'running', 'attempts': 1, 'date_started': old})
+        alive.write({'date_heartbeat': fields.Datetime.now()})
+        self.Job._requeue_stale()
+        self.assertEqual((alive.state, stale.state), ('running', 'pending'))
+
+    def test_archive_job_queues_the_rest(self):
+        Archive = self.env['medical.archive']
+        jobs = self.Job.search_count([])
+        with patch.object(type(Archive), '_has_backlog', lambda self: True):
+            Archive._job_archive()
+        queued = self.Job.search([], limit=1)
+        self.assertEqual(self.Job.search_count([]), jobs + 1)
+        self.assertEqual(queued.method_name, '_job_archive')
+
@@ -0,0 +1,43 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestPatientSearch(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Patient = cls.env['medical.patient']
+        cls.helene = Patient.create({'name': 'Hélène Lefèvre', 'phone': '06 12 34 56 78'})
+        cls.helen = Patient.create({'name': 'Helen Smith'})
+        cls.other = Patient.create({'name': 'Marc Dupont', 'mobile': '+33 7 98 76 54 32'})
+
+    def setUp(self):
+        super().setUp()
+        if not self.env.registry.has_trigram:
+            self.skipTest("The ranked patient search needs pg_trgm")
+
+    def _name_search(self, term, **kwargs):
+        return [patient_id for patient_id, _name in self.env['medical.patient'].name_search(term, **kwargs)]
+
+    def test_name_search_ignores_accents_and_case(self):
+        self.assertEqual(self._name_search('helene')[0], self.helene.id)
+        self.assertIn(self.helene.id, self._name_search('LEFEVRE'))
+        self.assertNotIn(self.other.id, self._name_search('helene'))
+
+    def test_name_search_phone_and_reference(self):
+        self.assertEqual(self._name_search('0612')[:1], [self.helene.id])
+        self.assertIn(self.other.id, self._name_search('987654'))
+        self.assertEqual(self._name_search(self.other.patient_id)[:1], [self.other.id])
+
+    def test_name_search_domain_and_limit(self):
+        domain = [('id', 'in', (self.helen | self.other).ids)]
+        self.assertEqual(self._name_search('hel', args=domain), [self.helen.id])
+        self.assertEqual(len(self._name_search('hel', limit=1)), 1)
+        self.assertLessEqual({self.helene.id, self.helen.id}, set(self._name_search('hel', limit=None)))
+
+    def test_quick_search(self):
+        results = self.env['medical.patient'].quick_search('hélène')
+        self.assertEqual(results[0]['id'], self.helene.id)
+        self.assertEqual(self.env['medical.patient'].quick_search('06 12 34')[0]['id'], self.helene.id)
@@ -0,0 +1,89 @@
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from .common import MedicalTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestPrescriptionSafety(MedicalTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Drug = cls.env['medical.drug']
+        cls.warfarin = Drug.create({'name': 'Warfarine'})
+        cls.aspirin = Drug.create({'name': 'Aspirine'})
+        cls.paracetamol = Drug.create({'name': 'Paracétamol'})
+        cls.ibuprofen = Drug.create({'name': 'Ibuprofène'})
+        Interaction = cls.env['medical.drug.interaction']
+        Interaction.create({'drug_a_id': cls.warfarin.id, 'drug_b_id': cls.aspirin.id,
+                            'severity': 'contraindicated'})
+        Interaction.create({'drug_a_id': cls.ibuprofen.id, 'drug_b_id': cls.aspirin.id,
+                            'severity': 'moderate'})
+
+    def _prescription(self, *drugs, patient=None):
+        return self.env['medical.prescription'].create({
+            'patient_id': (patient or self.patient).id,
+            'doctor_id': self.doctor.id,
+            'prescription_line_ids': [(0, 0, {
+                'medication_id': drug.id, 'medication_name': drug.name,
+                'dosage': '1', 'frequency': '1/j', 'duration': '7 j',
+            }) for drug in drugs],
+        })
+
+    def test_contraindication_blocks(self):
+        prescription = self._prescription(self.warfarin, self.aspirin)
+        with self.assertRaises(UserError):
+            prescription.action_prescribe()
+        self.assertEqual(prescription.state, 'draft')
+
+    def test_interaction_with_current_treatment(self):
+        current = self._prescription(self.warfarin)
+        current.action_prescribe()
+        with self.assertRaises(UserError):
+            self._prescription(self.aspirin).action_prescribe()
+
+    def test_interaction_with_free_text_treatment(self):
+        current = self._prescription()
+        current.write({'prescription_line_ids': [(0, 0, {
+            'medication_name': 'warfarine', 'dosage': '5 mg', 'frequency': '1/j', 'duration': '30 j',
+        })]})
+        current.action_prescribe()
+        with self.assertRaises(UserError):
+            self._prescription(self.aspirin).action_prescribe()
+
+    def test_interaction_with_current_medications(self):
+        self.patient.current_medications = "Ibuprofène 400 mg\nOméprazole"
+        prescription = self._prescription(self.aspirin)
+        prescription.action_prescribe()
+        self.assertIn("patient file", prescription.interaction_warning)
+
+    def test_moderate_interaction_warns(self):
+        prescription = self._prescription(self.ibuprofen, self.aspirin)
+        prescription.action_prescribe()
+        self.assertEqual(prescription.state, 'prescribed')
+        self.assertIn('Ibuprofène', prescription.interaction_warning)
+
+    def test_structured_allergy_blocks(self):
+        self.patient.allergy_drug_ids = self.paracetamol
+        with self.assertRaises(UserError):
+            self._prescription(self.paracetamol).action_prescribe()
+
+    def test_free_text_allergy_matches_whole_words(self):
+        self.patient.allergies = "Allergie à l'aspirine. Intolérance : warfarine-like"
+        prescription = self._prescription(self.aspirin)
+        prescription.action_prescribe()
+        self.assertEqual(prescription.state, 'prescribed')
+        self.assertIn('Aspirine', prescription.interaction_warning)
+        # "Paracétamol" is not a word of "paracetamolique"
+        self.patient.allergies = "paracetamolique"
+        other = self._prescription(self.paracetamol)
+        other.action_prescribe()
+        self.assertFalse(other.interaction_warning)
+
+    def test_warning_reset_for_whole_batch(self):
+        warned = self._prescription(self.ibuprofen, self.aspirin)
+        clean = self._prescription(self.paracetamol)
+        clean.interaction_warning = "Stale warning"
+        (warned | clean).action_prescribe()
+        self.assertTrue(warned.interaction_warning)
+        self.assertFalse(clean.interaction_warning)
@@ -0,0 +1,40 @@
+from odoo import fields
+from odoo.tests import tagged
+from datetime import timedelta
+from .common import MedicalTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestReminder(MedicalTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('medical_practice.reminder_offsets', '24')
+        cls.patient.email = 'jean.dupont@example.com'
+        cls.now = fields.Datetime.now().replace(microsecond=0)
+        cls.appointment = cls._book(cls.now + timedelta(hours=30))
+        cls.Reminder = cls.env['medical.reminder']
+
+    def _reminder(self):
+        return self.Reminder.search([('appointment_id', '=', self.appointment.id)])
+
+    def test_queued_reminder_follows_the_date(self):
+        self.Reminder.generate()
+        self.appointment.appointment_date = self.now + timedelta(hours=40)
+        self.assertEqual(self._reminder().date_scheduled, self.now + timedelta(hours=16))
+
+    def test_sent_reminder_not_repeated(self):
+        self.Reminder.generate()
+        reminder = self._reminder()
+        reminder.write({'state': 'sent', 'date_sent': self.now})
+        # Same date, then a send time already passed: nothing to send again
+        self.appointment.appointment_date = self.appointment.appointment_date
+        self.appointment.appointment_date = self.now + timedelta(hours=20)
+        self.assertEqual(self._reminder(), reminder)
+        self.assertEqual(self.Reminder.generate(), 0)
+        # Its new send time is to come: sent again then
+        self.appointment.appointment_date = self.now + timedelta(hours=40)
+        self.assertFalse(self._reminder())
+        self.assertEqual(self.Reminder.generate(), 1)
+        self.assertEqual(self._reminder().state, 'queued')
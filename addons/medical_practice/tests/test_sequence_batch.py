@@ -0,0 +1,40 @@
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestSequenceBatch(TransactionCase):
+
+    def _sequence(self, code, **vals):
+        return self.env['ir.sequence'].create(dict({
+            'name': code,
+            'code': code,
+            'prefix': 'T/',
+            'padding': 3,
+            'number_next': 1,
+            'number_increment': 2,
+        }, **vals))
+
+    def test_standard(self):
+        self._sequence('medical.test.standard', implementation='standard')
+        Sequence = self.env['ir.sequence']
+        self.assertEqual(Sequence._next_batch_by_code('medical.test.standard', 3), ['T/001', 'T/003', 'T/005'])
+        self.assertEqual(Sequence.next_by_code('medical.test.standard'), 'T/007')
+
+    def test_no_gap(self):
+        sequence = self._sequence('medical.test.no_gap', implementation='no_gap')
+        Sequence = self.env['ir.sequence']
+        self.assertEqual(Sequence._next_batch_by_code('medical.test.no_gap', 3), ['T/001', 'T/003', 'T/005'])
+        self.assertEqual(sequence.number_next, 7)
+        self.assertEqual(Sequence.next_by_code('medical.test.no_gap'), 'T/007')
+
+    def test_date_range(self):
+        self._sequence('medical.test.range', implementation='no_gap', use_date_range=True, number_increment=1)
+        Sequence = self.env['ir.sequence']
+        self.assertEqual(Sequence._next_batch_by_code('medical.test.range', 3), ['T/001', 'T/002', 'T/003'])
+        self.assertEqual(Sequence.next_by_code('medical.test.range'), 'T/004')
+
+    def test_empty_and_unknown(self):
+        Sequence = self.env['ir.sequence']
+        self.assertEqual(Sequence._next_batch_by_code('medical.test.standard', 0), [])
+        self.assertEqual(Sequence._next_batch_by_code('medical.test.unknown', 2), [False, False])
@@ -0,0 +1,65 @@
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from datetime import datetime, time, timedelta
+from .common import MedicalTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestStateTransition(MedicalTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Within the capacity window
+        cls.day = fields.Date.today() + timedelta(days=7)
+        start = datetime.combine(cls.day, time(9, 0))
+        cls.appointments = cls.env['medical.appointment'].concat(*(
+            cls._book(start + timedelta(hours=hour)) for hour in range(3)
+        ))
+        cls.Log = cls.env['medical.state.transition.log']
+
+    def _booked_hours(self):
+        capacity = self.env['medical.doctor.capacity'].search([
+            ('doctor_id', '=', self.doctor.id), ('date', '=', self.day),
+        ])
+        return capacity.booked_hours
+
+    def test_single_record(self):
+        logs = self.Log.search_count([])
+        self.appointments[0].action_confirm()
+        self.assertEqual(self.appointments[0].state, 'confirmed')
+        self.assertEqual(self.Log.search_count([]), logs, "A single record is tracked, not logged")
+
+    def test_batch(self):
+        self.appointments[0].action_confirm()
+        self.appointments.action_cancel()
+        self.assertEqual(set(self.appointments.mapped('state')), {'cancelled'})
+        log = self.Log.search([('res_model', '=', 'medical.appointment')], limit=1)
+        self.assertEqual(log.record_count, 3)
+        self.assertIn('Scheduled: 2', log.from_states)
+        self.assertIn('Confirmed: 1', log.from_states)
+
+    def test_batch_runs_write_overrides(self):
+        self.assertEqual(self._booked_hours(), 3.0)
+        self.appointments.action_confirm()
+        self.assertEqual(self._booked_hours(), 3.0)
+        self.appointments[:2].action_cancel()
+        self.assertEqual(self._booked_hours(), 1.0)
+
+    def test_invalid_transition(self):
+        self.appointments[0].action_cancel()
+        with self.assertRaises(UserError):
+            self.appointments.action_confirm()
+        self.assertEqual(self.appointments[1].state, 'scheduled')
+
+    def test_unknown_state(self):
+        with self.assertRaises(UserError):
+            self.appointments._transition('archived')
+
+    def test_no_show_without_duration(self):
+        past = fields.Datetime.now() - timedelta(days=1)
+        zero, hour = self._book(past, duration=0.0), self._book(past + timedelta(hours=2))
+        self.assertFalse(zero.end_time)
+        self.env['medical.appointment']._cron_mark_no_show()
+        self.assertEqual((zero.state, hour.state), ('no_show', 'no_show'))
@@ -0,0 +1,121 @@
+"""Front-desk load test of the medical_practice appointment and patient flows.
+
+Run it against the development profile (docker-compose.yml, one process)
+and against the production profile (docker-compose.prod.yml) with the same
+user count to compare the throughput::
+
+    pip install locust
+    locust -f loadtest/locustfile.py --headless -u 50 -r 5 -t 5m --host http://localhost:8069
+    locust -f loadtest/locustfile.py --headless -u 50 -r 5 -t 5m --host http://localhost
+
+The database should be seeded first (``odoo-bin medical_seed -d <db>``).
+Credentials come from the ODOO_DB, ODOO_LOGIN and ODOO_PASSWORD variables.
+"""
+import itertools
+import os
+import random
+from datetime import datetime, timedelta
+
+from locust import HttpUser, between, task
+
+DB = os.environ.get('ODOO_DB', 'medical_cabinet')
+LOGIN = os.environ.get('ODOO_LOGIN', 'admin')
+PASSWORD = os.environ.get('ODOO_PASSWORD', 'admin')
+
+SEARCH_TERMS = ['mar', 'dup', 'ben', 'lef', 'mou', 'ali', 'ber', 'gar', 'pet', 'rob']
+_request_ids = itertools.count(1)
+
+
+class FrontDeskUser(HttpUser):
+    """A receptionist: looks patients up, checks agendas, books appointments."""
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        self.rpc('/web/session/authenticate', {'db': DB, 'login': LOGIN, 'password': PASSWORD}, name='login')
+        self.doctor_ids = self.call('medical.doctor', 'search', [[]], {'limit': 50}) or []
+        self.patient_ids = self.call('medical.patient', 'search', [[]], {'limit': 500}) or []
+
+    # ------------------------------------------------------------------
+    # JSON-RPC helpers
+    # ------------------------------------------------------------------
+
+    def rpc(self, url, params, name=None):
+        payload = {'jsonrpc': '2.0', 'method': 'call', 'id': next(_request_ids), 'params': params}
+        with self.client.post(url, json=payload, name=name or url, catch_response=True) as response:
+            data = response.json() if response.ok else {}
+            if 'error' in data:
+                error = data['error'].get('data', {})
+                # Two receptionists racing for the same slot is expected
+                if error.get('name') == 'odoo.exceptions.ValidationError':
+                    response.success()
+                else:
+                    response.failure(error.get('message') or data['error'].get('message'))
+                return None
+            return data.get('result')
+
+    def call(self, model, method, args, kwargs=None, name=None):
+        return self.rpc(f'/web/dataset/call_kw/{model}/{method}', {
+            'model': model, 'method': method, 'args': args, 'kwargs': kwargs or {},
+        }, name=name or f'{model}.{method}')
+
+    # ------------------------------------------------------------------
+    # Patient flow
+    # ------------------------------------------------------------------
+
+    @task(5)
+    def patient_lookup(self):
+        self.call('medical.patient', 'name_search', [random.choice(SEARCH_TERMS)], {'limit': 8})
+
+    @task(3)
+    def patient_list(self):
+        self.call('medical.patient', 'web_search_read', [], {
+            'domain': [], 'limit': 80, 'offset': random.randrange(0, 400),
+            'specification': {'patient_id': {}, 'name': {}, 'doctor_id': {'fields': {'display_name': {}}},
+                              'age': {}, 'gender': {}, 'phone': {}, 'city': {}},
+        })
+
+    @task(3)
+    def patient_form(self):
+        if not self.patient_ids:
+            return
+        patient_id = random.choice(self.patient_ids)
+        self.call('medical.patient', 'web_read', [[patient_id]], {
+            'specification': {'name': {}, 'patient_id': {}, 'age': {}, 'appointment_count': {},
+                              'record_count': {}, 'prescription_count': {}},
+        })
+        self.call('medical.patient', 'get_timeline', [[patient_id]], {'limit': 20})
+
+    # ------------------------------------------------------------------
+    # Appointment flow
+    # ------------------------------------------------------------------
+
+    @task(4)
+    def appointment_calendar(self):
+        monday = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        monday -= timedelta(days=monday.weekday())
+        self.call('medical.appointment', 'search_read', [[
+            ('appointment_date', '>=', monday.strftime('%Y-%m-%d %H:%M:%S')),
+            ('appointment_date', '<', (monday + timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')),
+        ]], {'fields': ['patient_id', 'appointment_type', 'doctor_id', 'appointment_date', 'end_time', 'state']})
+
+    @task(2)
+    def book_appointment(self):
+        if not self.doctor_ids or not self.patient_ids:
+            return
+        doctor_id = random.choice(self.doctor_ids)
+        day = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=random.randint(1, 60))
+        slots = self.call('medical.appointment', 'find_free_slots', [
+            [doctor_id], (day.strftime('%Y-%m-%d %H:%M:%S'), (day + timedelta(hours=10)).strftime('%Y-%m-%d %H:%M:%S')),
+            0.5,
+        ]) or {}
+        free = slots.get(str(doctor_id)) or slots.get(doctor_id) or []
+        if not free:
+            return
+        start, _end = random.choice(free)
+        self.call('medical.appointment', 'create', [{
+            'patient_id': random.choice(self.patient_ids),
+            'doctor_id': doctor_id,
+            'appointment_date': start,
+            'duration': 0.5,
+            'appointment_type': 'consultation',
+        }])